@@ -0,0 +1,78 @@
+# age_index.py
+from bisect import bisect_left
+
+import partitions
+from repository import get_repository, TICKETS_FILE
+from user_index import get_user_index
+
+class AgeIndex:
+    """Tickets ouverts triés par date_creation (global et par type), tenus à jour à chaque mutation"""
+
+    def __init__(self):
+        self._all = None      # [(date_creation, ticket_id)] trié
+        self._by_type = None  # type -> [(date_creation, ticket_id)] trié
+
+    def rebuild(self, tickets):
+        self._all = sorted((t["date_creation"], tid) for tid, t in tickets.items())
+        self._by_type = {}
+        for key in self._all:
+            self._by_type.setdefault(tickets[key[1]]["type"], []).append(key)
+
+    # ÉCOUTE DU REPOSITORY
+    def on_reset(self, filename, data):
+        if filename == TICKETS_FILE:
+            self.rebuild(data)
+
+    def on_ticket_changed(self, ticket_id, old, new):
+        if self._all is None:
+            return
+        if old is not None:
+            key = (old["date_creation"], ticket_id)
+            for entries in (self._all, self._by_type.get(old["type"], [])):
+                i = bisect_left(entries, key)
+                if i < len(entries) and entries[i] == key:
+                    del entries[i]
+        if new is not None:
+            key = (new["date_creation"], ticket_id)
+            for entries in (self._all, self._by_type.setdefault(new["type"], [])):
+                entries.insert(bisect_left(entries, key), key)
+
+    def on_archived(self, ticket_id, ticket):
+        pass
+
+    # LECTURE
+    def oldest(self, k, offset=0, user_id=None, type_ticket=None):
+        """Les k tickets ouverts les plus anciens à partir de `offset`.
+
+        Renvoie ([(ticket_id, ticket)], total) ; O(k) sans filtre utilisateur.
+        """
+        tickets = get_repository().tickets  # recharge (et reconstruit) si modifié sur disque
+        if self._all is None:
+            self.rebuild(tickets)
+
+        if user_id is not None:
+            # Liste de l'utilisateur déjà triée par date dans l'index par utilisateur
+            entries = get_user_index().open_entries(user_id)
+            if type_ticket is not None:
+                entries = [e for e in entries if tickets[e[1]]["type"] == type_ticket]
+        elif type_ticket is not None:
+            entries = self._by_type.get(type_ticket, [])
+        else:
+            entries = self._all
+
+        return [(tid, tickets[tid]) for _, tid in entries[offset:offset + k]], len(entries)
+
+    def created_before(self, date):
+        """Tickets ouverts créés avant `date` (ISO), du plus ancien au plus récent."""
+        tickets = get_repository().tickets
+        if self._all is None:
+            self.rebuild(tickets)
+        end = bisect_left(self._all, (date,))
+        return [(tid, tickets[tid]) for _, tid in self._all[:end]]
+
+def _create():
+    index = AgeIndex()
+    get_repository().subscribe(index)
+    return index
+
+get_age_index = partitions.scoped(_create)
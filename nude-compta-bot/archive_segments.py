@@ -0,0 +1,304 @@
+# archive_segments.py
+import gzip
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import snapshot_codecs
+
+# Disposition sur disque (backend json, COMPTA_ARCHIVE_LAYOUT=segments) :
+#   data/archives/manifest.json    segments scellés : nombre de tickets, plages de dates et d'IDs
+#   data/archives/2026-10.jsonl    segment du mois en cours, une ligne par ticket clos
+#   data/archives/2026-09.jsonl.gz segments des mois passés, compressés au scellement
+
+MANIFEST = "manifest.json"
+CACHE_SIZE = 3  # segments scellés gardés décompressés en mémoire
+_TICKET_ID = re.compile(r"^([a-z]+)(\d+)$")
+
+def _month(ticket):
+    return (ticket.get("date_cloture") or ticket.get("date_creation") or "")[:7]
+
+def _id_ranges(ids):
+    """Plage de numéros par préfixe : {"a": [12, 480], ...} (comme les segments de events.log)."""
+    ranges = {}
+    for tid in ids:
+        match = _TICKET_ID.match(tid)
+        if match:
+            prefix, num = match.group(1), int(match.group(2))
+            bounds = ranges.setdefault(prefix, [num, num])
+            bounds[0], bounds[1] = min(bounds[0], num), max(bounds[1], num)
+    return ranges
+
+def _may_contain(segment, ticket_id):
+    """Le segment peut-il contenir `ticket_id` ? (sans l'ouvrir)"""
+    if ticket_id in segment.get("superseded", ()):
+        return False
+    match = _TICKET_ID.match(ticket_id)
+    if not match:
+        # ID hors format : pas de plage, seul le segment peut répondre
+        return True
+    bounds = segment["tickets"].get(match.group(1))
+    return bounds is not None and bounds[0] <= int(match.group(2)) <= bounds[1]
+
+def _read_lines(f):
+    for line in f:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # Dernière ligne tronquée par un crash
+            break
+        yield record["id"], record["ticket"]
+
+class SegmentArchiveStore(Mapping):
+    """Archives découpées par mois : clôturer un ticket ajoute une ligne au segment courant.
+
+    Se lit comme un dict ticket_id -> ticket ; les segments scellés ne sont chargés
+    qu'au besoin (recherche d'un ID ou parcours d'une période). Le manifeste ne garde par
+    segment que son nombre de tickets et ses plages d'IDs, plus les IDs "superseded" :
+    archivés de nouveau dans un segment scellé plus tard (doublon après crash).
+    """
+
+    def __init__(self, directory, legacy_file=None):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()  # mois -> {ticket_id: ticket}
+        os.makedirs(directory, exist_ok=True)
+
+        self._manifest = self._load_manifest()
+        self._open_month, self._open = self._load_open_segment()
+
+        if legacy_file and os.path.exists(legacy_file):
+            self._migrate(legacy_file)
+
+    # FICHIERS
+    def _file(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load_manifest(self):
+        path = self._file(MANIFEST)
+        if not os.path.exists(path):
+            return {"segments": {}}
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if any("ids" in seg for seg in manifest["segments"].values()):
+            self._manifest = manifest
+            self._upgrade_manifest()
+        return manifest
+
+    def _upgrade_manifest(self):
+        """Ancien manifeste (liste complète des IDs par segment) -> plages d'IDs."""
+        last = {}  # ticket_id -> dernier segment scellé le contenant (celui que retenait l'ancien index)
+        segments = self._manifest["segments"]
+        for month, seg in segments.items():
+            ids = seg.pop("ids")
+            seg["tickets"] = _id_ranges(ids)
+            for tid in ids:
+                if tid in last:
+                    segments[last[tid]].setdefault("superseded", []).append(tid)
+                last[tid] = month
+        self._save_manifest()
+
+    def _save_manifest(self):
+        path = self._file(MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def _load_open_segment(self):
+        opened = sorted(n for n in os.listdir(self.directory) if n.endswith(".jsonl"))
+        if not opened:
+            return None, {}
+        # Plusieurs segments ouverts : crash pendant un scellement, on scelle les plus anciens
+        for name in opened[:-1]:
+            month = name[:-len(".jsonl")]
+            self._open_month, self._open = month, self._read_segment(month)
+            self._seal()
+        month = opened[-1][:-len(".jsonl")]
+        return month, self._read_segment(month)
+
+    def _read_segment(self, month):
+        path = self._file(f"{month}.jsonl")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return dict(_read_lines(f))
+        with gzip.open(self._file(f"{month}.jsonl.gz"), "rt", encoding="utf-8") as f:
+            return dict(_read_lines(f))
+
+    def _append(self, month, tickets):
+        with open(self._file(f"{month}.jsonl"), "a", encoding="utf-8") as f:
+            f.writelines(
+                json.dumps({"id": tid, "ticket": t}, ensure_ascii=False) + "\n"
+                for tid, t in tickets.items()
+            )
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _seal(self):
+        """Compresse le segment ouvert et l'inscrit au manifeste."""
+        month, tickets = self._open_month, self._open
+        gz_path = self._file(f"{month}.jsonl.gz")
+        if month in self._manifest["segments"]:
+            # Mois déjà scellé (horloge reculée, import) : on fusionne
+            tickets = {**self._read_segment_sealed(month), **tickets}
+
+        with gzip.open(gz_path + ".tmp", "wt", encoding="utf-8") as f:
+            for tid, ticket in tickets.items():
+                f.write(json.dumps({"id": tid, "ticket": ticket}, ensure_ascii=False) + "\n")
+        os.replace(gz_path + ".tmp", gz_path)
+
+        segments = self._manifest["segments"]
+        fresh = self._open  # seuls les tickets du segment ouvert sont plus récents que les segments scellés
+        superseded = [tid for tid in segments.get(month, {}).get("superseded", ()) if tid not in fresh]
+        for other, seg in segments.items():
+            # Tickets déjà archivés dans un autre mois : cette version les remplace
+            candidates = [tid for tid in fresh if _may_contain(seg, tid)] if other != month else []
+            if candidates:
+                sealed = self._sealed(other)
+                replaced = [tid for tid in candidates if tid in sealed]
+                if replaced:
+                    seg["superseded"] = seg.get("superseded", []) + replaced
+
+        dates = sorted(t.get("date_cloture") or "" for t in tickets.values())
+        segments[month] = {
+            "count": len(tickets),
+            "first": dates[0] if dates else None,
+            "last": dates[-1] if dates else None,
+            "tickets": _id_ranges(tickets),
+        }
+        if superseded:
+            segments[month]["superseded"] = superseded
+        self._save_manifest()
+        # Le manifeste référence le .gz : le segment ouvert peut disparaître
+        if os.path.exists(self._file(f"{month}.jsonl")):
+            os.remove(self._file(f"{month}.jsonl"))
+
+        self._cache.pop(month, None)
+        self._open_month, self._open = None, {}
+
+    def _read_segment_sealed(self, month):
+        with gzip.open(self._file(f"{month}.jsonl.gz"), "rt", encoding="utf-8") as f:
+            return dict(_read_lines(f))
+
+    def _migrate(self, legacy_file):
+        """Découpe un archives.json existant en segments mensuels (une seule fois)."""
+        with open(legacy_file, "rb") as f:
+            legacy = snapshot_codecs.decode(f.read())
+
+        by_month = {}
+        for tid, ticket in legacy.items():
+            if tid not in self:
+                by_month.setdefault(_month(ticket), {})[tid] = ticket
+        months = sorted(by_month)
+
+        with self._lock:
+            if self._open_month is None and not self._manifest["segments"] and months:
+                # Store vide : mois passés scellés directement, dernier mois écrit d'un bloc
+                for month in months[:-1]:
+                    self._open_month, self._open = month, by_month[month]
+                    self._seal()
+                last = months[-1]
+                with open(self._file(f"{last}.jsonl"), "w", encoding="utf-8") as f:
+                    f.writelines(
+                        json.dumps({"id": tid, "ticket": t}, ensure_ascii=False) + "\n"
+                        for tid, t in by_month[last].items()
+                    )
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._open_month, self._open = last, by_month[last]
+            else:
+                for month in months:
+                    for tid, ticket in by_month[month].items():
+                        self.put(tid, ticket)
+
+        os.replace(legacy_file, legacy_file + ".migrated")
+
+    def _sealed(self, month):
+        if month in self._cache:
+            self._cache.move_to_end(month)
+            return self._cache[month]
+        tickets = self._read_segment_sealed(month)
+        self._cache[month] = tickets
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return tickets
+
+    # ÉCRITURE
+    def put(self, ticket_id, ticket):
+        self.put_many({ticket_id: ticket})
+
+    def put_many(self, items):
+        """Archive plusieurs tickets : une écriture (et un fsync) par mois concerné."""
+        by_month = {}
+        for tid, ticket in items.items():
+            by_month.setdefault(_month(ticket), {})[tid] = ticket
+        with self._lock:
+            for month, tickets in by_month.items():
+                if self._open_month is not None and month != self._open_month:
+                    self._seal()
+                self._append(month, tickets)
+                self._open_month = month
+                self._open.update(tickets)
+
+    # LECTURE (interface dict)
+    def _find_sealed(self, ticket_id):
+        """Version scellée courante de `ticket_id` (verrou tenu par l'appelant), None si absente."""
+        for month, seg in self._manifest["segments"].items():
+            if _may_contain(seg, ticket_id):
+                ticket = self._sealed(month).get(ticket_id)
+                if ticket is not None:
+                    return ticket
+        return None
+
+    def __getitem__(self, ticket_id):
+        with self._lock:
+            if ticket_id in self._open:
+                return self._open[ticket_id]
+            ticket = self._find_sealed(ticket_id)
+        if ticket is None:
+            raise KeyError(ticket_id)
+        return ticket
+
+    def __contains__(self, ticket_id):
+        with self._lock:
+            return ticket_id in self._open or self._find_sealed(ticket_id) is not None
+
+    def __iter__(self):
+        return (tid for tid, _ in self.items())
+
+    def __len__(self):
+        with self._lock:
+            sealed = sum(seg["count"] - len(seg.get("superseded", ())) for seg in self._manifest["segments"].values())
+            # Tickets du segment ouvert qui remplacent une version scellée (même mois après un crash...)
+            replaced = sum(1 for tid in self._open if self._find_sealed(tid) is not None)
+            return sealed + len(self._open) - replaced
+
+    def items(self, since=None, until=None):
+        """Parcours segment par segment, limité aux mois [since, until] (format "AAAA-MM")."""
+        with self._lock:
+            months = sorted(set(self._manifest["segments"]) | {self._open_month} - {None})
+        for month in months:
+            if (since and month < since) or (until and month > until):
+                continue
+            with self._lock:
+                # Mois scellé et ouvert à la fois (crash pendant un scellement) : contenus fusionnés
+                seg = self._manifest["segments"].get(month)
+                tickets = {}
+                if seg is not None:
+                    superseded = set(seg.get("superseded", ()))
+                    tickets = {
+                        tid: t for tid, t in self._read_segment_sealed(month).items() if tid not in superseded
+                    }
+                if month == self._open_month:
+                    tickets.update(self._open)
+                else:
+                    # Réarchivés depuis dans le segment ouvert : rendus avec ce dernier
+                    for tid in self._open.keys() & tickets.keys():
+                        del tickets[tid]
+            yield from tickets.items()
+
+    def values(self, since=None, until=None):
+        for _, ticket in self.items(since, until):
+            yield ticket
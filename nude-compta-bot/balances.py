@@ -0,0 +1,96 @@
+# balances.py
+import partitions
+from repository import get_repository, TICKETS_FILE
+from ticket_model import debtor_parts
+
+class BalanceIndex:
+    """Matrice débiteur -> créditeur -> centimes des tickets ouverts, tenue à jour à chaque mutation"""
+
+    def __init__(self):
+        self._dettes = {}    # debiteur -> {crediteur: [centimes, nb_parts]}
+        self._creances = {}  # crediteur -> {debiteur: même liste que dans _dettes}
+        self._reste = {}     # crediteur -> somme des reste_du de ses tickets
+        self._ready = False
+
+    # MISE À JOUR
+    def _apply(self, ticket, sign):
+        crediteur = ticket["crediteur_id"]
+        for uid, part in debtor_parts(ticket):
+            cell = self._dettes.setdefault(uid, {}).get(crediteur)
+            if cell is None:
+                cell = [0, 0]
+                self._dettes[uid][crediteur] = cell
+                self._creances.setdefault(crediteur, {})[uid] = cell
+            cell[0] += sign * part
+            cell[1] += sign
+            if cell[1] == 0:
+                del self._dettes[uid][crediteur]
+                del self._creances[crediteur][uid]
+        self._reste[crediteur] = self._reste.get(crediteur, 0) + sign * ticket["reste_du"]
+
+    def rebuild(self, tickets):
+        """Reconstruit la matrice depuis zéro."""
+        self._dettes, self._creances, self._reste = {}, {}, {}
+        for ticket in tickets.values():
+            self._apply(ticket, 1)
+        self._ready = True
+
+    # ÉCOUTE DU REPOSITORY
+    def on_reset(self, filename, data):
+        if filename == TICKETS_FILE:
+            self.rebuild(data)
+
+    def on_ticket_changed(self, ticket_id, old, new):
+        if not self._ready:
+            return
+        if old is not None:
+            self._apply(old, -1)
+        if new is not None:
+            self._apply(new, 1)
+
+    def on_archived(self, ticket_id, ticket):
+        pass
+
+    # LECTURE
+    def solde(self, user_id):
+        """Même résultat que l'ancien parcours complet, en O(nombre de contreparties)."""
+        tickets = get_repository().tickets  # recharge (et reconstruit) si modifié sur disque
+        if not self._ready:
+            self.rebuild(tickets)
+
+        detail = {}
+        total_doit = 0
+        for crediteur, (cents, _) in self._dettes.get(user_id, {}).items():
+            detail.setdefault(crediteur, {"doit": 0, "recoit": 0})["doit"] += cents
+            total_doit += cents
+        for debiteur, (cents, _) in self._creances.get(user_id, {}).items():
+            detail.setdefault(debiteur, {"doit": 0, "recoit": 0})["recoit"] += cents
+
+        total_recoit = self._reste.get(user_id, 0)
+        return {
+            "detail": detail,
+            "doit": total_doit,
+            "recoit": total_recoit,
+            "solde": total_recoit - total_doit
+        }
+
+    def verify(self):
+        """Compare la matrice incrémentale à une reconstruction complète, renvoie les écarts."""
+        fresh = BalanceIndex()
+        fresh.rebuild(get_repository().tickets)
+
+        ecarts = []
+        users = set(self._dettes) | set(fresh._dettes) | set(self._reste) | set(fresh._reste)
+        for uid in sorted(users):
+            if self._dettes.get(uid, {}) != fresh._dettes.get(uid, {}):
+                ecarts.append(f"dettes de {uid} : {self._dettes.get(uid)} != {fresh._dettes.get(uid)}")
+            if self._reste.get(uid, 0) != fresh._reste.get(uid, 0):
+                ecarts.append(f"reste dû à {uid} : {self._reste.get(uid, 0)} != {fresh._reste.get(uid, 0)}")
+        return ecarts
+
+def _create():
+    index = BalanceIndex()
+    get_repository().subscribe(index)
+    return index
+
+get_balance_index = partitions.scoped(_create)
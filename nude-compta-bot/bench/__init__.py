@@ -0,0 +1,2 @@
+# bench/__init__.py
+# Benchmarks hors Discord du registre compta (python -m bench depuis nude-compta-bot/)
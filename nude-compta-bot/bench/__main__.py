@@ -0,0 +1,165 @@
+# bench/__main__.py
+# Latences du registre compta en fonction de sa taille, sans Discord
+# Usage : python -m bench [--sizes 100,1000,10000] [--samples 200] [-o bench_results.json]
+#                         [--backend json|sqlite] [--mode json|journal] [--baseline ancien.json]
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, UTC
+
+import config
+from repository import get_repository
+from tickets import create_ticket, rembourse, close_ticket, calcul_solde
+from utils import generate_ticket_id
+
+from bench.metrics import latency_stats
+from bench.synthetic import generate_ledger, isolated_data_dir
+
+OPERATIONS = ("generate_ticket_id", "create_ticket", "rembourse", "close_ticket", "calcul_solde")
+
+# MESURE
+def _timed(func, *args):
+    start = time.perf_counter_ns()
+    result = func(*args)
+    return time.perf_counter_ns() - start, result
+
+def run_size(size, users, archives, debtors, samples, seed):
+    """Mesure chaque opération sur un registre de `size` tickets ouverts."""
+    rng = random.Random(seed)
+    with isolated_data_dir():
+        start = time.perf_counter()
+        user_ids = generate_ledger(users, size, archives, debtors, seed)
+        repo = get_repository()
+        # Premier chargement (parsing + index) mesuré à part
+        load_ms = _timed(lambda: (repo.tickets, repo.archives, calcul_solde(user_ids[0])))[0] / 1e6
+        setup_s = time.perf_counter() - start
+
+        durations = {op: [] for op in OPERATIONS}
+
+        for _ in range(samples):
+            type_ticket = rng.choice(("p2p", "groupe"))
+            d, _ = _timed(generate_ticket_id, type_ticket)
+            durations["generate_ticket_id"].append(d)
+
+        created = []
+        for _ in range(samples):
+            crediteur = rng.choice(user_ids)
+            debiteur = rng.choice([u for u in user_ids if u != crediteur])
+            tid = generate_ticket_id("p2p")
+            d, _ = _timed(create_ticket, tid, "p2p", crediteur,
+                          [{"user_id": debiteur, "part": 1000}], crediteur, 1000, "bench")
+            durations["create_ticket"].append(d)
+            created.append(tid)
+
+        # Remboursements partiels : le ticket reste ouvert, la taille ne bouge pas
+        open_ids = list(repo.tickets)
+        for tid in rng.sample(open_ids, min(samples, len(open_ids))):
+            ticket = repo.tickets[tid]
+            if ticket["reste_du"] > 1:
+                d, _ = _timed(rembourse, tid, 1, ticket["debiteurs"][0]["user_id"])
+                durations["rembourse"].append(d)
+
+        # Clôture des tickets créés pendant la mesure : retour à la taille initiale
+        for tid in created:
+            d, _ = _timed(close_ticket, tid, "bench")
+            durations["close_ticket"].append(d)
+
+        for _ in range(samples):
+            d, _ = _timed(calcul_solde, rng.choice(user_ids))
+            durations["calcul_solde"].append(d)
+
+        return {
+            "open_tickets": size,
+            "archives": archives,
+            "users": users,
+            "debtors_per_ticket": debtors,
+            "setup_s": round(setup_s, 3),
+            "load_ms": round(load_ms, 3),
+            "operations": {op: latency_stats(values) for op, values in durations.items()},
+        }
+
+# COMPARAISON
+def compare(results, baseline_path, threshold=1.5):
+    """Lignes de régression : p50 plus de `threshold` fois plus lent que la référence."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["open_tickets"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        old = baseline.get(result["open_tickets"])
+        if old is None:
+            continue
+        for op, stats in result["operations"].items():
+            before = old["operations"].get(op, {}).get("p50_ms")
+            after = stats.get("p50_ms")
+            if before and after and after > before * threshold:
+                regressions.append(
+                    f"{op} @ {result['open_tickets']} tickets : p50 {before} → {after} ms"
+                )
+    return regressions
+
+def _print_table(result):
+    print(f"\n{result['open_tickets']} tickets ouverts, {result['archives']} archives "
+          f"(chargement {result['load_ms']} ms)")
+    print(f"   {'opération':<20}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)")
+    for op, s in result["operations"].items():
+        if s["n"]:
+            print(f"   {op:<20}{s['p50_ms']:>10}{s['p90_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+
+# CLI
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du registre compta (hors Discord)")
+    parser.add_argument("--sizes", default="100,1000,5000", help="tailles de registre (tickets ouverts)")
+    parser.add_argument("--archives", type=float, default=2.0, help="archives par ticket ouvert")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--debtors", type=int, default=3, help="débiteurs par ticket généré")
+    parser.add_argument("--samples", type=int, default=200, help="appels mesurés par opération")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=("json", "sqlite"), default=config.STORAGE_BACKEND)
+    parser.add_argument("--mode", choices=("json", "journal"), default=config.STORAGE_MODE)
+    parser.add_argument("--layout", choices=("file", "segments"), default=config.ARCHIVE_LAYOUT)
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="résultats précédents à comparer (sortie en erreur si régression)")
+    args = parser.parse_args()
+
+    # Surcharge de la configuration du bot pour ce processus uniquement
+    config.STORAGE_BACKEND = args.backend
+    config.STORAGE_MODE = args.mode
+    config.ARCHIVE_LAYOUT = args.layout
+    config.SQLITE_PATH = None
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        result = run_size(size, args.users, int(size * args.archives), args.debtors, args.samples, args.seed)
+        _print_table(result)
+        results.append(result)
+
+    report = {
+        "date": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "backend": args.backend,
+            "mode": args.mode,
+            "layout": args.layout,
+            "events_durability": config.EVENTS_DURABILITY,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Résultats écrits dans {os.path.abspath(args.output)}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline)
+        for r in regressions:
+            print(f"   ❌ {r}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
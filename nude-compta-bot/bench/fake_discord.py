@@ -0,0 +1,137 @@
+# bench/fake_discord.py
+# Stand-ins en mémoire de Interaction, InteractionResponse, followup, Guild et Member :
+# les callbacks de main.py s'exécutent tels quels, sans gateway ni HTTP.
+import asyncio
+import itertools
+import time
+from types import SimpleNamespace
+
+import discord
+
+DEADLINE = 3.0  # délai Discord pour accuser réception d'une interaction (s)
+
+class FakeMember:
+    def __init__(self, guild, user_id, name, administrator=False):
+        self.guild = guild
+        self.id = user_id
+        self.display_name = name
+        self.name = name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.roles = []
+        self.avatar = self.guild_avatar = None
+        self.guild_permissions = SimpleNamespace(administrator=administrator)
+
+class FakeGuild:
+    """Guild avec membres en mémoire ; chaque appel « réseau » coûte `latency` secondes."""
+
+    def __init__(self, guild_id=1, name="bench", members=0, latency=0.05):
+        self.id = guild_id
+        self.name = name
+        self.latency = latency
+        self._members = {}
+        for i in range(members):
+            self.add_member(10**17 + i, f"membre{i}")
+
+    def add_member(self, user_id, name, administrator=False):
+        member = FakeMember(self, user_id, name, administrator)
+        self._members[user_id] = member
+        return member
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    def get_member(self, user_id):
+        # Cache local vide comme sur un gros serveur : force le chemin query_members
+        return None
+
+    async def query_members(self, user_ids=None, limit=5, cache=True):
+        await asyncio.sleep(self.latency)
+        return [self._members[uid] for uid in user_ids or () if uid in self._members]
+
+    async def fetch_member(self, user_id):
+        await asyncio.sleep(self.latency)
+        if user_id not in self._members:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Member")
+        return self._members[user_id]
+
+class InteractionRecord:
+    """Chronologie d'une interaction : accusé de réception, réponses, anomalies."""
+
+    def __init__(self, command):
+        self.command = command
+        self.start = time.perf_counter()
+        self.ack = None        # première réponse (send_message / defer / edit_message)
+        self.done = None       # fin du callback
+        self.messages = []     # (kind, content | titre d'embed)
+        self.errors = []       # réponses en double, followup sans réponse, exceptions...
+
+    @property
+    def ack_latency(self):
+        return None if self.ack is None else self.ack - self.start
+
+    @property
+    def deadline_missed(self):
+        return self.ack is None or self.ack_latency > DEADLINE
+
+    def message(self, kind, content=None, embed=None, **kwargs):
+        self.messages.append((kind, content if embed is None else embed.title))
+
+class FakeInteractionResponse:
+    def __init__(self, interaction, latency):
+        self._interaction = interaction
+        self._latency = latency
+        self._responded = False
+
+    def is_done(self):
+        return self._responded
+
+    async def _respond(self, kind, **kwargs):
+        record = self._interaction.record
+        if self._responded:
+            record.errors.append(f"réponse en double ({kind})")
+            # Même comportement que discord.py : la seconde réponse échoue
+            raise discord.InteractionResponded(self._interaction)
+        self._responded = True
+        await asyncio.sleep(self._latency)
+        record.ack = time.perf_counter()
+        if record.ack_latency > DEADLINE:
+            # Discord a déjà invalidé le token : « Unknown interaction »
+            record.errors.append(f"accusé de réception après {record.ack_latency:.2f}s")
+        record.message(kind, **kwargs)
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond("send_message", content=content, **kwargs)
+
+    async def defer(self, **kwargs):
+        await self._respond("defer")
+
+    async def edit_message(self, content=None, **kwargs):
+        await self._respond("edit_message", content=content, **kwargs)
+
+class FakeFollowup:
+    def __init__(self, interaction, latency):
+        self._interaction = interaction
+        self._latency = latency
+
+    async def send(self, content=None, **kwargs):
+        record = self._interaction.record
+        if not self._interaction.response.is_done():
+            record.errors.append("followup avant toute réponse")
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Webhook")
+        await asyncio.sleep(self._latency)
+        record.message("followup", content=content, **kwargs)
+
+class FakeInteraction:
+    _ids = itertools.count(1)
+
+    def __init__(self, command, user, guild, latency=0.05):
+        self.id = next(self._ids)
+        self.record = InteractionRecord(command)
+        self.user = user
+        self.type = discord.InteractionType.application_command
+        self.guild = guild
+        self.guild_id = guild.id if guild is not None else None  # None : DM
+        self.response = FakeInteractionResponse(self, latency)
+        self.followup = FakeFollowup(self, latency)
@@ -0,0 +1,175 @@
+# bench/interactions.py
+# Test de charge des commandes slash de main.py avec de fausses interactions Discord
+# Usage : python -m bench.interactions [--requests 1000] [--concurrency 100] [--latency 0.05]
+#                                      [--mix p2p_ticket:3,rembourse:3,solde:2,...] [-o interactions_results.json]
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, UTC
+
+# main.py refuse de se charger sans ces variables ; le bot n'est jamais lancé
+os.environ.setdefault("NUDE_COMPTA_TOKEN", "bench")
+os.environ.setdefault("GUILD_ID", "1")
+
+import config
+import event_log
+import main
+from repository import get_repository
+
+from bench.fake_discord import DEADLINE, FakeGuild, FakeInteraction
+from bench.metrics import latency_stats
+from bench.synthetic import generate_ledger, isolated_data_dir
+
+DEFAULT_MIX = "p2p_ticket:3,split_ticket:1,rembourse:3,solde:2,close_ticket:1,earliest:1,historique:1"
+
+# SCÉNARIOS : (callback, arguments) tirés au hasard sur l'état courant du registre
+def _pick_open_ticket(rng):
+    tickets = get_repository().tickets
+    return rng.choice(list(tickets)) if tickets else "a0000"
+
+async def _open_ticket(rng):
+    # Lu dans le thread du registre, comme les commandes (jamais depuis la boucle)
+    return await main.get_ledger().run(_pick_open_ticket, rng)
+
+async def _scenario(command, rng, guild, members):
+    a, b = rng.sample(members, 2)
+    if command == "p2p_ticket":
+        return main.p2p_ticket.callback, (a, b, rng.randint(1, 5000) / 100, "bench")
+    if command == "split_ticket":
+        debiteurs = rng.sample(members, rng.randint(2, 5))
+        return main.split_ticket.callback, (" ".join(m.mention for m in debiteurs), b, rng.randint(100, 10000) / 100, "bench")
+    if command == "rembourse":
+        return main.rembourse_cmd.callback, (await _open_ticket(rng), 0.01)
+    if command == "solde":
+        return main.solde.callback, (a,)
+    if command == "close_ticket":
+        return main.close_ticket_cmd.callback, (await _open_ticket(rng),)
+    if command == "earliest":
+        return main.earliest_tickets.callback, (None, None, 5)
+    if command == "historique":
+        return main.audit.callback, (a,)
+    raise ValueError(f"commande inconnue : {command}")
+
+async def _invoke(command, callback, args, user, guild, latency):
+    interaction = FakeInteraction(command, user, guild, latency)
+    record = interaction.record
+    try:
+        await callback(interaction, *args)
+    except Exception as e:
+        # discord.py se contenterait de journaliser l'exception ; l'utilisateur ne voit rien
+        record.errors.append(f"exception : {type(e).__name__}: {e}")
+    record.done = time.perf_counter()
+    if record.ack is None:
+        record.errors.append("aucune réponse envoyée")
+    return record
+
+async def run_load(guild, members, mix, requests, concurrency, latency, seed):
+    rng = random.Random(seed)
+    commands, weights = zip(*mix.items())
+    semaphore = asyncio.Semaphore(concurrency)
+    event_log.attach_loop(asyncio.get_running_loop())
+
+    async def one():
+        async with semaphore:
+            command = rng.choices(commands, weights)[0]
+            callback, args = await _scenario(command, rng, guild, members)
+            return await _invoke(command, callback, args, rng.choice(members), guild, latency)
+
+    start = time.perf_counter()
+    records = await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    event_log.attach_loop(None)
+    event_log.flush_all()
+    return records, elapsed
+
+# RAPPORT
+def summarize(records, elapsed):
+    by_command = {}
+    for record in records:
+        by_command.setdefault(record.command, []).append(record)
+
+    def stats(group):
+        return {
+            "ack": latency_stats([int(r.ack_latency * 1e9) for r in group if r.ack is not None]),
+            "total": latency_stats([int((r.done - r.start) * 1e9) for r in group]),
+            "deadline_missed": sum(r.deadline_missed for r in group),
+            "errors": sum(bool(r.errors) for r in group),
+        }
+
+    anomalies = {}
+    for record in records:
+        for error in record.errors:
+            kind = error.split(" : ")[0] if error.startswith("exception") else error.split(" après")[0]
+            anomalies[kind] = anomalies.get(kind, 0) + 1
+
+    return {
+        "requests": len(records),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(records) / elapsed, 1) if elapsed else None,
+        "deadline_s": DEADLINE,
+        "overall": stats(records),
+        "commands": {command: stats(group) for command, group in sorted(by_command.items())},
+        "anomalies": anomalies,
+        "examples": [
+            {"command": r.command, "errors": r.errors} for r in records if r.errors
+        ][:20],
+    }
+
+def _print_summary(summary):
+    print(f"{summary['requests']} interactions en {summary['elapsed_s']}s "
+          f"({summary['throughput_rps']} /s)")
+    print(f"   {'commande':<16}{'ack p50':>10}{'ack p99':>10}{'total p99':>11}{'> 3s':>7}{'erreurs':>9}")
+    for command, s in summary["commands"].items():
+        print(f"   {command:<16}{s['ack'].get('p50_ms', '-'):>10}{s['ack'].get('p99_ms', '-'):>10}"
+              f"{s['total'].get('p99_ms', '-'):>11}{s['deadline_missed']:>7}{s['errors']:>9}")
+    for kind, count in summary["anomalies"].items():
+        print(f"   ⚠️  {kind} : {count}")
+
+# CLI
+def main_cli():
+    parser = argparse.ArgumentParser(description="Charge simulée sur les commandes slash du bot compta")
+    parser.add_argument("--requests", type=int, default=1000, help="nombre total d'interactions")
+    parser.add_argument("--concurrency", type=int, default=100, help="interactions simultanées")
+    parser.add_argument("--latency", type=float, default=0.05, help="latence simulée d'un appel Discord (s)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="commande:poids séparés par des virgules")
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--tickets", type=int, default=1000, help="tickets ouverts au départ")
+    parser.add_argument("--archives", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="interactions_results.json")
+    args = parser.parse_args()
+
+    mix = {}
+    for entry in args.mix.split(","):
+        command, _, weight = entry.partition(":")
+        mix[command.strip()] = float(weight or 1)
+
+    guild = FakeGuild(members=0, latency=args.latency)
+    with isolated_data_dir():
+        user_ids = generate_ledger(args.members, args.tickets, args.archives, seed=args.seed)
+        members = [guild.add_member(int(uid), f"membre{i}") for i, uid in enumerate(user_ids)]
+        records, elapsed = asyncio.run(
+            run_load(guild, members, mix, args.requests, args.concurrency, args.latency, args.seed)
+        )
+        main.get_ledger().shutdown()
+
+    summary = summarize(records, elapsed)
+    summary["date"] = datetime.now(UTC).isoformat()
+    summary["config"] = {
+        "backend": config.STORAGE_BACKEND,
+        "mode": config.STORAGE_MODE,
+        "concurrency": args.concurrency,
+        "latency_s": args.latency,
+        "mix": mix,
+        "tickets": args.tickets,
+    }
+    _print_summary(summary)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Résultats écrits dans {os.path.abspath(args.output)}")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,82 @@
+# bench/memory.py
+# Mémoire résidente et vitesse de parcours : tickets en dicts JSON vs tickets compacts (ticket_model.py)
+# Usage : python -m bench.memory [--tickets 100000] [--users 200] [--debtors 3] [--repeat 5]
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+
+import snapshot_codecs
+import storage
+from balances import BalanceIndex
+from settlement import net_balances
+from ticket_model import compact
+
+from bench.synthetic import generate_ledger, isolated_data_dir
+
+def _measure(build):
+    """(objet construit, octets alloués restant en mémoire)"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+def _best_of(repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+def run(tickets, users, debtors, repeat, seed):
+    with isolated_data_dir():
+        generate_ledger(users, tickets, 0, debtors, seed)
+        with open(os.path.join(storage.DATA_DIR, "tickets.json"), "rb") as f:
+            raw = f.read()
+
+    # Chaque ID lu depuis le snapshot est une chaîne distincte, comme au chargement réel
+    as_dicts, dict_bytes = _measure(lambda: snapshot_codecs.decode(raw))
+    as_compact, compact_bytes = _measure(lambda: {tid: compact(t) for tid, t in snapshot_codecs.decode(raw).items()})
+
+    lossless = all(as_compact[tid].to_dict() == t for tid, t in as_dicts.items())
+
+    def rebuild(data):
+        BalanceIndex().rebuild(data)
+
+    result = {"tickets": tickets, "users": users, "debtors": debtors, "lossless": lossless}
+    for name, data, size in (("dict", as_dicts, dict_bytes), ("compact", as_compact, compact_bytes)):
+        result[name] = {
+            "bytes": size,
+            "bytes_per_ticket": round(size / tickets, 1),
+            "balances_rebuild_ms": round(_best_of(repeat, rebuild, data), 2),
+            "net_balances_ms": round(_best_of(repeat, net_balances, data), 2),
+        }
+    result["memory_ratio"] = round(compact_bytes / dict_bytes, 3)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Mémoire et parcours : tickets dicts vs compacts")
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--debtors", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    r = run(args.tickets, args.users, args.debtors, args.repeat, args.seed)
+    print(f"{r['tickets']} tickets, {r['users']} utilisateurs, {r['debtors']} débiteurs par ticket")
+    print(f"   {'':10} {'Mo':>8} {'o/ticket':>9} {'soldes ms':>10} {'net ms':>8}")
+    for name in ("dict", "compact"):
+        m = r[name]
+        print(f"   {name:10} {m['bytes'] / 2**20:8.1f} {m['bytes_per_ticket']:9.0f} "
+              f"{m['balances_rebuild_ms']:10.1f} {m['net_balances_ms']:8.1f}")
+    print(f"   mémoire compacte / dicts : {r['memory_ratio']:.2f} - conversion sans perte : {'oui' if r['lossless'] else 'NON'}")
+
+if __name__ == "__main__":
+    main()
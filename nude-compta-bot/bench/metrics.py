@@ -0,0 +1,20 @@
+# bench/metrics.py
+
+def latency_stats(durations_ns):
+    """n, moyenne et percentiles (ms) d'une liste de durées en nanosecondes."""
+    durations = sorted(d / 1e6 for d in durations_ns)
+    n = len(durations)
+    if not n:
+        return {"n": 0}
+
+    def pct(p):
+        return round(durations[min(n - 1, int(p / 100 * n))], 4)
+
+    return {
+        "n": n,
+        "mean_ms": round(sum(durations) / n, 4),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": round(durations[-1], 4),
+    }
@@ -0,0 +1,78 @@
+# bench/serialization.py
+# Codecs des snapshots (snapshot_codecs.py) : temps d'encodage, de décodage et taille sur disque
+# Usage : python -m bench.serialization [--tickets 20000] [--archives 100000] [--users 200] [--repeat 3]
+#         python -m bench.serialization --data data   (mesure sur les fichiers réels, sans les modifier)
+import argparse
+import os
+import time
+
+import snapshot_codecs
+import storage
+
+from bench.synthetic import generate_ledger, isolated_data_dir
+
+FILES = ("tickets.json", "archives.json")
+
+def _best_of(repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+def _read(directory):
+    documents = {}
+    for name in FILES:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                documents[name] = snapshot_codecs.decode(f.read())
+    return documents
+
+def run(documents, repeat):
+    """{fichier: {codec: {encode_ms, decode_ms, bytes, lossless}}}"""
+    result = {}
+    for name, data in documents.items():
+        result[name] = {"entries": len(data)}
+        for codec in snapshot_codecs.CODECS.values():
+            raw, encode_ms = _best_of(repeat, codec.encode, data)
+            decoded, decode_ms = _best_of(repeat, snapshot_codecs.decode, raw)
+            result[name][codec.name] = {
+                "encode_ms": round(encode_ms, 1),
+                "decode_ms": round(decode_ms, 1),
+                "bytes": len(raw),
+                "lossless": decoded == data,
+            }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Codecs des snapshots : encodage, décodage, taille")
+    parser.add_argument("--data", help="répertoire de données réel à mesurer (lecture seule)")
+    parser.add_argument("--tickets", type=int, default=20000)
+    parser.add_argument("--archives", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--debtors", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.data:
+        documents = _read(args.data)
+    else:
+        with isolated_data_dir():
+            generate_ledger(args.users, args.tickets, args.archives, args.debtors, args.seed)
+            documents = _read(storage.DATA_DIR)
+
+    for name, codecs in run(documents, args.repeat).items():
+        entries = codecs.pop("entries")
+        reference = codecs[snapshot_codecs.DEFAULT]["bytes"]
+        print(f"{name} : {entries} entrées")
+        print(f"   {'':13} {'encodage ms':>12} {'décodage ms':>12} {'Mo':>8} {'taille':>7}  sans perte")
+        for codec, m in codecs.items():
+            print(f"   {codec:13} {m['encode_ms']:12.1f} {m['decode_ms']:12.1f} {m['bytes'] / 2**20:8.2f} "
+                  f"{m['bytes'] / reference:7.2f}  {'oui' if m['lossless'] else 'NON'}")
+
+if __name__ == "__main__":
+    main()
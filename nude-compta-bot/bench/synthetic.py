@@ -0,0 +1,77 @@
+# bench/synthetic.py
+import random
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import event_log
+import sqlite_backend
+import storage
+from repository import get_repository
+from sequences import get_sequence
+from utils import now_iso
+
+# ISOLATION
+@contextmanager
+def isolated_data_dir():
+    """Répertoire de données temporaire : les vraies données du bot ne sont jamais touchées."""
+    previous = storage.DATA_DIR
+    directory = tempfile.mkdtemp(prefix="compta-bench-")
+    storage.DATA_DIR = directory
+    _reset_state()
+    try:
+        yield directory
+    finally:
+        event_log.close_all()
+        storage.DATA_DIR = previous
+        _reset_state()
+        shutil.rmtree(directory, ignore_errors=True)
+
+def _reset_state():
+    sqlite_backend.close_all()
+    storage._journal_counts.clear()
+    get_repository().invalidate()
+    get_sequence()._counters = None
+
+# REGISTRE SYNTHÉTIQUE
+
+def _ticket(rng, users, debtors):
+    crediteur = rng.choice(users)
+    others = [u for u in users if u != crediteur]
+    debiteurs = rng.sample(others, min(debtors, len(others)))
+    parts = [rng.randint(100, 5000) for _ in debiteurs]
+    return {
+        "type": "p2p" if len(debiteurs) == 1 else "groupe",
+        "createur_id": crediteur,
+        "debiteurs": [{"user_id": uid, "part": part} for uid, part in zip(debiteurs, parts)],
+        "crediteur_id": crediteur,
+        "motif": f"bench {rng.randint(0, 10**6)}",
+        "montant_total": sum(parts),
+        "reste_du": sum(parts),
+        "date_creation": now_iso()
+    }
+
+def generate_ledger(users=50, open_tickets=1000, archives=2000, debtors=3, seed=0):
+    """Écrit un registre synthétique (tickets.json, archives.json) dans storage.DATA_DIR.
+
+    Écrit en une fois par fichier : seul l'état initial est généré, les opérations
+    mesurées passent ensuite par tickets.py. Renvoie la liste des user_id.
+    """
+    rng = random.Random(seed)
+    user_ids = [str(10**17 + i) for i in range(users)]
+
+    tickets = {}
+    for i in range(open_tickets):
+        ticket = _ticket(rng, user_ids, debtors)
+        tickets[f"{'a' if ticket['type'] == 'p2p' else 'b'}{i + 1:04d}"] = ticket
+
+    archived = {}
+    for i in range(archives):
+        ticket = _ticket(rng, user_ids, debtors)
+        ticket["reste_du"] = 0
+        ticket["date_cloture"] = ticket["date_creation"]
+        archived[f"z{i + 1:04d}"] = ticket
+
+    storage.save_json("tickets.json", tickets)
+    storage.save_json("archives.json", archived)
+    return user_ids
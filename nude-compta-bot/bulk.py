@@ -0,0 +1,212 @@
+# bulk.py
+# Import en masse (CSV / JSONL) et export en flux des tickets, archives et événements
+# Usage : python bulk.py import fichier.csv --createur ID
+#         python bulk.py export tickets|archives|events [--format csv|jsonl] [-o fichier]
+import argparse
+import csv
+import io
+import json
+import sys
+
+import partitions
+import storage
+from repository import get_repository
+from tickets import create_tickets
+from utils import euros_to_cents
+
+# IMPORT
+# Colonnes : debiteurs, crediteur_id, montant (€), motif, [type], [createur_id]
+#   debiteurs : IDs ou mentions séparés par des espaces, "id:montant" pour une part explicite
+#   sans part explicite le montant est partagé comme /split_ticket (centime restant au premier)
+IMPORT_COLUMNS = ("debiteurs", "crediteur_id", "montant", "motif")
+
+def _user_id(raw):
+    uid = raw.strip().strip("<@!>")
+    if not uid.isdigit():
+        raise ValueError(f"identifiant invalide : {raw!r}")
+    return uid
+
+def _parse_debiteurs(raw, montant_c):
+    if isinstance(raw, list):
+        entries = raw
+    else:
+        entries = str(raw).split()
+    if not entries:
+        raise ValueError("au moins un débiteur est requis")
+
+    explicit = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            explicit.append({"user_id": _user_id(str(entry["user_id"])), "part": int(entry["part"])})
+        elif ":" in str(entry):
+            uid, part = str(entry).split(":", 1)
+            explicit.append({"user_id": _user_id(uid), "part": euros_to_cents(float(part))})
+        else:
+            explicit.append({"user_id": _user_id(str(entry)), "part": None})
+
+    if all(d["part"] is None for d in explicit):
+        parts = montant_c // len(explicit)
+        reste = montant_c - parts * len(explicit)
+        return [
+            {"user_id": d["user_id"], "part": parts + (reste if idx == 0 else 0)}
+            for idx, d in enumerate(explicit)
+        ]
+    if any(d["part"] is None for d in explicit):
+        raise ValueError("parts explicites pour tous les débiteurs ou pour aucun")
+    if sum(d["part"] for d in explicit) != montant_c:
+        raise ValueError("la somme des parts ne correspond pas au montant")
+    return explicit
+
+def parse_row(row, createur_id):
+    """Transforme une ligne CSV/JSONL en spec pour tickets.create_tickets."""
+    for col in IMPORT_COLUMNS:
+        if row.get(col) in (None, "") and not (col == "montant" and "montant_centimes" in row):
+            raise ValueError(f"colonne {col} manquante")
+
+    if "montant_centimes" in row:
+        montant_c = int(row["montant_centimes"])
+    else:
+        montant_c = euros_to_cents(float(row["montant"]))
+    if montant_c <= 0:
+        raise ValueError("le montant doit être positif")
+
+    crediteur_id = _user_id(str(row["crediteur_id"]))
+    debiteurs = _parse_debiteurs(row["debiteurs"], montant_c)
+    type_ticket = row.get("type") or ("p2p" if len(debiteurs) == 1 else "groupe")
+    if type_ticket not in ("p2p", "groupe"):
+        raise ValueError(f"type inconnu : {type_ticket}")
+    if type_ticket == "p2p" and (len(debiteurs) != 1 or debiteurs[0]["user_id"] == crediteur_id):
+        raise ValueError("un ticket p2p a un seul débiteur, différent du créditeur")
+
+    return {
+        "type_ticket": type_ticket,
+        "createur_id": str(row.get("createur_id") or createur_id),
+        "debiteurs": debiteurs,
+        "crediteur_id": crediteur_id,
+        "montant_centimes": montant_c,
+        "motif": str(row["motif"]),
+    }
+
+def read_rows(text, filename):
+    """(numéro de ligne, dict) pour un contenu CSV ou JSONL (détecté par l'extension)."""
+    if filename.lower().endswith((".jsonl", ".ndjson", ".json")):
+        for num, line in enumerate(text.splitlines(), start=1):
+            if line.strip():
+                yield num, json.loads(line)
+    else:
+        # Ligne 1 = en-tête
+        for num, row in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+            yield num, row
+
+def import_tickets(text, filename, createur_id):
+    """Valide toutes les lignes puis crée les tickets en une seule écriture.
+
+    Renvoie (ids, erreurs) : si une seule ligne est invalide rien n'est écrit.
+    """
+    specs, erreurs = [], []
+    try:
+        for num, row in read_rows(text, filename):
+            try:
+                specs.append(parse_row(row, createur_id))
+            except (ValueError, KeyError, TypeError) as e:
+                erreurs.append(f"ligne {num} : {e}")
+    except (csv.Error, json.JSONDecodeError) as e:
+        erreurs.append(f"fichier illisible : {e}")
+
+    if erreurs or not specs:
+        return [], erreurs or ["aucune ligne à importer"]
+    return create_tickets(specs), []
+
+# EXPORT
+TICKET_FIELDS = (
+    "ticket_id", "type", "createur_id", "crediteur_id", "montant_total",
+    "reste_du", "motif", "date_creation", "date_cloture", "debiteurs"
+)
+EVENT_FIELDS = ("timestamp", "event", "ticket_id", "montant", "auteur_id", "payload")
+
+def _ticket_rows(items):
+    for tid, t in items:
+        yield {
+            **{k: t.get(k) for k in TICKET_FIELDS[1:-1]},
+            "ticket_id": tid,
+            "debiteurs": " ".join(f"{d['user_id']}:{d['part']}" for d in t["debiteurs"]),
+        }, {"ticket_id": tid, **t}
+
+def _event_rows(events):
+    for event in events:
+        row = {k: event.get(k) for k in EVENT_FIELDS[:-1]}
+        row["payload"] = json.dumps(event, ensure_ascii=False)
+        yield row, event
+
+def export(kind, out, fmt="csv", since=None, until=None, ticket_id=None):
+    """Écrit tickets ouverts / archives / événements dans `out`, ligne par ligne.
+
+    Événements : filtres optionnels par date ISO et ID de ticket (seuls les segments concernés sont lus).
+    """
+    repo = get_repository()
+    if kind == "tickets":
+        # Copie des paires seulement : les tickets sont déjà résidents
+        rows, fields = _ticket_rows(list(repo.tickets.items())), TICKET_FIELDS
+    elif kind == "archives":
+        # En segments, parcours mois par mois sans tout décompresser d'un coup
+        rows, fields = _ticket_rows(repo.archives.items()), TICKET_FIELDS
+    elif kind == "events":
+        rows, fields = _event_rows(storage.iter_events(since, until, ticket_id)), EVENT_FIELDS
+    else:
+        raise ValueError(f"export inconnu : {kind}")
+
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=fields)
+        writer.writeheader()
+        for row, _ in rows:
+            writer.writerow(row)
+            count += 1
+    elif fmt == "jsonl":
+        for _, record in rows:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    else:
+        raise ValueError(f"format inconnu : {fmt}")
+    return count
+
+# CLI
+def main():
+    parser = argparse.ArgumentParser(description="Import / export en masse du registre compta")
+    parser.add_argument("--guild", type=int, help="registre d'un autre serveur (data/guilds/<id>/)")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    p_import = sub.add_parser("import", help="importer un fichier CSV ou JSONL")
+    p_import.add_argument("fichier")
+    p_import.add_argument("--createur", required=True, help="ID Discord enregistré comme créateur")
+
+    p_export = sub.add_parser("export", help="exporter tickets, archives ou événements")
+    p_export.add_argument("kind", choices=("tickets", "archives", "events"))
+    p_export.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    p_export.add_argument("-o", "--output", help="fichier de sortie (défaut : stdout)")
+    p_export.add_argument("--since", help="événements : date ISO de début (ex. 2026-01-01)")
+    p_export.add_argument("--until", help="événements : date ISO de fin")
+    p_export.add_argument("--ticket", help="événements : un seul ticket")
+
+    args = parser.parse_args()
+    partitions.select(args.guild)
+
+    if args.action == "import":
+        with open(args.fichier, "r", encoding="utf-8-sig") as f:
+            ids, erreurs = import_tickets(f.read(), args.fichier, args.createur)
+        if erreurs:
+            print("❌ Import annulé :", file=sys.stderr)
+            for e in erreurs:
+                print(f"   {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ {len(ids)} tickets importés : {', '.join(ids[:10])}{' …' if len(ids) > 10 else ''}")
+    else:
+        if args.output:
+            with open(args.output, "w", encoding="utf-8", newline="") as f:
+                count = export(args.kind, f, args.format, args.since, args.until, args.ticket)
+            print(f"✅ {count} lignes exportées dans {args.output}")
+        else:
+            export(args.kind, sys.stdout, args.format, args.since, args.until, args.ticket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# config.py
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Modules partagés avec le bot core (dossier shared/ à la racine du projet)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# Chargé ici pour que les modules de stockage voient var.env dès leur import
+load_dotenv(dotenv_path="../var.env")
+
+# STOCKAGE
+# Backend : "json" (fichiers data/*.json) ou "sqlite" (base indexée, voir migrate_sqlite.py)
+STORAGE_BACKEND = os.getenv("COMPTA_STORAGE_BACKEND", "json")
+SQLITE_PATH = os.getenv("COMPTA_SQLITE_PATH")  # défaut : data/compta.db
+
+# Mode d'écriture du backend "json" :
+# "json"    : chaque mutation réécrit le fichier complet (comportement historique)
+# "journal" : chaque mutation ajoute un enregistrement, compaction périodique
+STORAGE_MODE = os.getenv("COMPTA_STORAGE_MODE", "json")
+
+# Nombre d'enregistrements journalisés avant réécriture du snapshot
+JOURNAL_COMPACT_EVERY = int(os.getenv("COMPTA_JOURNAL_COMPACT_EVERY", "500"))
+
+# Format des snapshots du backend "json" : "json-pretty", "json-compact", "jsonl" ou "binary"
+# (reconnu à la lecture : changer de codec ne demande pas de migration, voir snapshot_codecs.py)
+STORAGE_CODEC = os.getenv("COMPTA_STORAGE_CODEC", "json-pretty")
+
+# Archives du backend "json" : "file" (archives.json unique) ou "segments" (un segment par mois)
+ARCHIVE_LAYOUT = os.getenv("COMPTA_ARCHIVE_LAYOUT", "file")
+
+# EVENTS.LOG
+# Durabilité du journal d'audit : "none", "batch" (fsync par lot) ou "event" (fsync par événement)
+EVENTS_DURABILITY = os.getenv("COMPTA_EVENTS_DURABILITY", "batch")
+
+# Rotation du segment actif (backend json) : taille en Mo et âge en jours du premier événement ; 0 = désactivé
+EVENTS_ROTATE_BYTES = int(float(os.getenv("COMPTA_EVENTS_ROTATE_MB", "16")) * 1024 * 1024)
+EVENTS_ROTATE_DAYS = float(os.getenv("COMPTA_EVENTS_ROTATE_DAYS", "30"))
+# Rétention des segments clos : âge maximum (jours) et nombre maximum ; 0 = tout garder
+EVENTS_RETENTION_DAYS = float(os.getenv("COMPTA_EVENTS_RETENTION_DAYS", "0"))
+EVENTS_RETENTION_SEGMENTS = int(os.getenv("COMPTA_EVENTS_RETENTION_SEGMENTS", "0"))
+
+# Contrôle de cohérence events.log / état stocké au démarrage (reprise au dernier checkpoint)
+REPLAY_ON_STARTUP = os.getenv("COMPTA_REPLAY_ON_STARTUP", "1") == "1"
+
+# Agrégats des archives (stats.json) enregistrés au plus tard N secondes après une clôture
+STATS_FLUSH_SECONDS = float(os.getenv("COMPTA_STATS_FLUSH_SECONDS", "30"))
+
+# MULTI-SERVEUR
+# Un registre par serveur (data/guilds/<id>/, le serveur principal GUILD_ID garde data/)
+PARTITION_BY_GUILD = os.getenv("COMPTA_PARTITION_BY_GUILD", "0") == "1"
+# Éviction des registres inactifs : délai (minutes) et nombre maximum gardés en mémoire ; 0 = sans limite
+PARTITION_IDLE_SECONDS = float(os.getenv("COMPTA_PARTITION_IDLE_MINUTES", "30")) * 60
+PARTITION_MAX_RESIDENT = int(os.getenv("COMPTA_PARTITION_MAX_RESIDENT", "8"))
+# Enregistrement des commandes : "guild" (GUILD_ID + COMPTA_GUILD_IDS) ou "global" (tous les serveurs)
+COMMAND_SCOPE = os.getenv("COMPTA_COMMAND_SCOPE", "guild")
+EXTRA_GUILD_IDS = [int(g) for g in os.getenv("COMPTA_GUILD_IDS", "").replace(",", " ").split()]
+
+# RELANCES
+# Âge (jours) à partir duquel une dette ouverte est relancée par DM ; 0 = relances désactivées
+REMINDER_AGE_DAYS = float(os.getenv("COMPTA_REMINDER_AGE_DAYS", "0"))
+# Jours entre deux relances d'un même débiteur
+REMINDER_INTERVAL_DAYS = float(os.getenv("COMPTA_REMINDER_INTERVAL_DAYS", "7"))
+# Secondes minimum entre deux DM (la file s'arrête en plus le temps demandé par un 429)
+REMINDER_SPACING = float(os.getenv("COMPTA_REMINDER_SPACING", "1.0"))
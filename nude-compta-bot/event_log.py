@@ -0,0 +1,149 @@
+# event_log.py
+import atexit
+import json
+import os
+import threading
+
+import config
+
+class EventAppender:
+    """Fichier events.log gardé ouvert ; les événements d'un même tour de boucle sont écrits ensemble.
+
+    Durabilité (COMPTA_EVENTS_DURABILITY) :
+    "none"  : écriture bufferisée, pas de fsync
+    "batch" : un fsync par lot écrit
+    "event" : écriture + fsync immédiats à chaque événement
+    """
+
+    def __init__(self, path, durability="batch"):
+        self.path = path
+        self.durability = durability
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._buffer = []
+        self._file = None
+        self._loop = None
+        self._scheduled = False
+
+    def attach_loop(self, loop):
+        """Active le regroupement par tour de boucle (sinon chaque événement est écrit aussitôt)."""
+        self._loop = loop
+
+    def append(self, event):
+        self.extend((event,))
+
+    def extend(self, events):
+        """Plusieurs événements écrits dans le même lot (une écriture, un fsync)."""
+        lines = [json.dumps(event, ensure_ascii=False) + "\n" for event in events]
+        with self._lock:
+            self._buffer.extend(lines)
+            if self._scheduled:
+                return
+            batch = self.durability != "event" and self._loop is not None
+            self._scheduled = batch
+
+        if batch:
+            try:
+                # Le lot est vidé au prochain tour de boucle, l'écriture se fait dans un thread
+                self._loop.call_soon_threadsafe(self._submit, self._loop)
+                return
+            except RuntimeError:
+                # Boucle fermée (arrêt du bot) : écriture directe
+                self._loop = None
+        self.flush()
+
+    def _submit(self, loop):
+        future = loop.run_in_executor(None, self.flush)
+        future.add_done_callback(self._flushed)
+
+    def _flushed(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            # Lot remis dans le buffer : réécrit avec le prochain événement ou à la fermeture
+            print(f"Erreur d'écriture de {self.path} : {future.exception()}")
+
+    def flush(self):
+        # _io_lock sérialise les écritures, _lock ne protège que le buffer (append ne bloque pas sur fsync)
+        with self._io_lock:
+            self._write_buffer()
+
+    def _write_buffer(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+            self._scheduled = False
+        if not lines:
+            return
+        size = None
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            size = self._file.tell()
+            self._file.write("".join(lines))
+            self._file.flush()
+            if self.durability != "none":
+                os.fsync(self._file.fileno())
+        except Exception:
+            with self._lock:
+                self._buffer[:0] = lines
+            self._reset_file(size)
+            raise
+
+    def _reset_file(self, size):
+        """Après un échec : fichier rouvert à la prochaine écriture, ramené à sa taille d'avant
+        le lot (pas de ligne partielle ni de doublon quand le lot sera réécrit)."""
+        file, self._file = self._file, None
+        if file is None:
+            return
+        try:
+            file.close()
+        except OSError:
+            pass
+        if size is not None:
+            try:
+                os.truncate(self.path, size)
+            except OSError:
+                pass
+
+    def close(self):
+        self.detach(lambda: None)
+
+    def detach(self, callback):
+        """Vide le buffer, ferme le fichier et appelle `callback()` avant toute nouvelle écriture
+        (rotation : le fichier peut être renommé, le suivant sera recréé)."""
+        with self._io_lock:
+            self._write_buffer()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            callback()
+
+_appenders = {}
+_loop = None
+
+def get_appender(path):
+    if path not in _appenders:
+        _appenders[path] = EventAppender(path, config.EVENTS_DURABILITY)
+        _appenders[path].attach_loop(_loop)
+    return _appenders[path]
+
+def release(path):
+    """Vide et oublie l'appender de `path` (registre évincé de la mémoire)."""
+    appender = _appenders.pop(path, None)
+    if appender is not None:
+        appender.close()
+
+def attach_loop(loop):
+    """À appeler depuis la boucle du bot (on_ready)."""
+    global _loop
+    _loop = loop
+    for appender in _appenders.values():
+        appender.attach_loop(loop)
+
+def flush_all():
+    for appender in _appenders.values():
+        appender.flush()
+
+def close_all():
+    for appender in _appenders.values():
+        appender.close()
+
+atexit.register(close_all)
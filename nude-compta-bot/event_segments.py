@@ -0,0 +1,298 @@
+# event_segments.py
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+import config
+import event_log
+
+# Disposition sur disque (backend json) :
+#   data/events.log                 segment actif, seul fichier où l'on écrit
+#   data/events/000001.log.gz       segments clos, numérotés et compressés à la rotation
+#   data/events/manifest.json       pour chaque segment : position, taille, plage de dates et d'IDs
+#
+# Les positions sont globales (octets non compressés depuis le tout premier événement) :
+# un checkpoint de replay.py reste valable après une rotation ou une purge.
+
+MANIFEST = "manifest.json"
+_TICKET_ID = re.compile(r"^([a-z]+)(\d+)$")
+
+def _segment_file(seg_id, compressed=True):
+    return f"{seg_id:06d}.log" + (".gz" if compressed else "")
+
+def _scan(f):
+    """Statistiques d'un segment : taille, nombre d'événements, plages de dates et d'IDs par préfixe."""
+    stats = {"size": 0, "events": 0, "first_ts": None, "last_ts": None, "tickets": {}}
+    for line in f:
+        stats["size"] += len(line)
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        stats["events"] += 1
+        ts = event.get("timestamp")
+        if ts:
+            stats["first_ts"] = min(stats["first_ts"] or ts, ts)
+            stats["last_ts"] = max(stats["last_ts"] or ts, ts)
+        match = _TICKET_ID.match(event.get("ticket_id") or "")
+        if match:
+            prefix, num = match.group(1), int(match.group(2))
+            bounds = stats["tickets"].setdefault(prefix, [num, num])
+            bounds[0], bounds[1] = min(bounds[0], num), max(bounds[1], num)
+    return stats
+
+def _matches(segment, since, until, ticket_id):
+    """Le segment peut-il contenir des événements du filtre ? (sans l'ouvrir)"""
+    if since and segment["last_ts"] and segment["last_ts"] < since:
+        return False
+    if until and segment["first_ts"] and segment["first_ts"] > until:
+        return False
+    if ticket_id:
+        match = _TICKET_ID.match(ticket_id)
+        if match:
+            bounds = segment["tickets"].get(match.group(1))
+            if bounds is None or not bounds[0] <= int(match.group(2)) <= bounds[1]:
+                return False
+    return True
+
+def _keep(event, since, until, ticket_id):
+    ts = event.get("timestamp") or ""
+    if (since and ts < since) or (until and ts > until):
+        return False
+    return ticket_id is None or event.get("ticket_id") == ticket_id
+
+class EventSegments:
+    """events.log découpé en segments numérotés.
+
+    Rotation du segment actif quand il dépasse `rotate_bytes` ou que son premier événement a plus
+    de `rotate_days` jours ; le segment clos est compressé et décrit dans le manifeste. Lectures
+    et replays n'ouvrent que les segments utiles (position de reprise, dates, ID de ticket).
+    """
+
+    def __init__(self, data_dir, rotate_bytes=0, rotate_days=0):
+        self.data_dir = data_dir
+        self.directory = os.path.join(data_dir, "events")
+        self.active_path = os.path.join(data_dir, "events.log")
+        self.rotate_bytes = rotate_bytes
+        self.rotate_days = rotate_days
+        self._lock = threading.RLock()
+        self._manifest = None
+        self._active_first_ts = None  # date du premier événement du segment actif (cache)
+
+    # MANIFESTE
+    def _load(self):
+        if self._manifest is not None:
+            return self._manifest
+        path = os.path.join(self.directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._manifest = json.load(f)
+        else:
+            self._manifest = {"segments": [], "next_id": 1, "active_start": 0, "pruned_until": 0}
+        self._recover()
+        return self._manifest
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _recover(self):
+        """Termine une rotation interrompue par un crash."""
+        m = self._manifest
+        # Segment actif renommé mais pas encore inscrit au manifeste
+        orphan = os.path.join(self.directory, _segment_file(m["next_id"], compressed=False))
+        if os.path.exists(orphan):
+            self._register(orphan)
+        # Compression pas terminée : la version non compressée fait foi
+        for segment in m["segments"]:
+            raw = os.path.join(self.directory, _segment_file(segment["id"], compressed=False))
+            if os.path.exists(raw):
+                self._compress(segment, raw)
+
+    def _register(self, raw_path):
+        m = self._manifest
+        with open(raw_path, "rb") as f:
+            stats = _scan(f)
+        segment = {"id": m["next_id"], "file": os.path.basename(raw_path), "start": m["active_start"], **stats}
+        m["segments"].append(segment)
+        m["next_id"] += 1
+        m["active_start"] += stats["size"]
+        self._save()
+        return segment
+
+    def _compress(self, segment, raw_path):
+        gz_path = os.path.join(self.directory, _segment_file(segment["id"]))
+        with open(raw_path, "rb") as src, gzip.open(gz_path + ".tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(gz_path + ".tmp", gz_path)
+        segment["file"] = os.path.basename(gz_path)
+        self._save()
+        os.remove(raw_path)
+
+    # ROTATION
+    def _active_size(self):
+        try:
+            return os.path.getsize(self.active_path)
+        except FileNotFoundError:
+            return 0
+
+    def _active_age_exceeded(self):
+        if not self.rotate_days:
+            return False
+        if self._active_first_ts is None:
+            try:
+                with open(self.active_path, "r", encoding="utf-8") as f:
+                    first = f.readline()
+            except FileNotFoundError:
+                return False
+            if not first.endswith("\n"):
+                return False
+            self._active_first_ts = json.loads(first).get("timestamp") or ""
+        limit = (datetime.utcnow() - timedelta(days=self.rotate_days)).isoformat()
+        return self._active_first_ts < limit
+
+    def maybe_rotate(self):
+        """À appeler après chaque événement : rotation si le segment actif est trop gros ou trop vieux."""
+        if self.rotate_bytes and self._active_size() >= self.rotate_bytes:
+            self.rotate()
+        elif self._active_age_exceeded():
+            self.rotate()
+
+    def rotate(self):
+        """Clôt le segment actif : renommé, inscrit au manifeste puis compressé."""
+        with self._lock:
+            m = self._load()
+            raw_path = os.path.join(self.directory, _segment_file(m["next_id"], compressed=False))
+            os.makedirs(self.directory, exist_ok=True)
+            moved = []
+
+            def move():
+                # Appelé appender vidé et fermé : aucune écriture ne peut viser l'ancien fichier
+                if os.path.exists(self.active_path) and os.path.getsize(self.active_path):
+                    os.replace(self.active_path, raw_path)
+                    moved.append(raw_path)
+
+            event_log.get_appender(self.active_path).detach(move)
+            self._active_first_ts = None
+            if not moved:
+                return None
+            segment = self._register(raw_path)
+            self._compress(segment, raw_path)
+            return segment
+
+    # LECTURE
+    def segments(self):
+        with self._lock:
+            return list(self._load()["segments"])
+
+    def size(self):
+        """Position globale de fin : segments (même purgés) + segment actif."""
+        with self._lock:
+            return self._load()["active_start"] + self._active_size()
+
+    def start(self):
+        """Position globale du plus ancien événement conservé."""
+        with self._lock:
+            return self._load()["pruned_until"]
+
+    def _open(self, segment):
+        path = os.path.join(self.directory, segment["file"])
+        return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+    def iter_from(self, position=0):
+        """(position globale suivante, événement) à partir d'une position de reprise."""
+        event_log.get_appender(self.active_path).flush()
+        with self._lock:
+            segments = [s for s in self._load()["segments"] if s["start"] + s["size"] > position]
+            active_start = self._manifest["active_start"]
+        for segment in segments:
+            with self._open(segment) as f:
+                offset = max(position - segment["start"], 0)
+                f.seek(offset)
+                pos = segment["start"] + offset
+                for line in f:
+                    pos += len(line)
+                    if line.strip():
+                        yield pos, json.loads(line)
+        if not os.path.exists(self.active_path):
+            return
+        with open(self.active_path, "rb") as f:
+            offset = max(position - active_start, 0)
+            f.seek(offset)
+            pos = active_start + offset
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Ligne en cours d'écriture : reprise au même endroit la prochaine fois
+                    break
+                pos += len(line)
+                if line.strip():
+                    yield pos, json.loads(line)
+
+    def iter_events(self, since=None, until=None, ticket_id=None):
+        """Événements filtrés par date (ISO) et ID de ticket ; seuls les segments concernés sont ouverts."""
+        event_log.get_appender(self.active_path).flush()
+        for segment in self.segments():
+            if not _matches(segment, since, until, ticket_id):
+                continue
+            with self._open(segment) as f:
+                for line in f:
+                    if line.strip():
+                        event = json.loads(line)
+                        if _keep(event, since, until, ticket_id):
+                            yield event
+        if not os.path.exists(self.active_path):
+            return
+        with open(self.active_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    event = json.loads(line)
+                    if _keep(event, since, until, ticket_id):
+                        yield event
+
+    # RÉTENTION
+    def expired(self, retention_days=0, retention_segments=0):
+        """Plus anciens segments hors de la politique de rétention (toujours un préfixe de la liste)."""
+        segments = self.segments()
+        limit = (datetime.utcnow() - timedelta(days=retention_days)).isoformat() if retention_days else None
+        expired = []
+        for i, segment in enumerate(segments):
+            too_many = retention_segments and len(segments) - i > retention_segments
+            too_old = limit and (segment["last_ts"] or "") < limit
+            if not (too_many or too_old):
+                break
+            expired.append(segment)
+        return expired
+
+    def drop_until(self, position):
+        """Supprime les segments entièrement avant `position`, renvoie leur nombre."""
+        with self._lock:
+            m = self._load()
+            dropped = [s for s in m["segments"] if s["start"] + s["size"] <= position]
+            if not dropped:
+                return 0
+            m["segments"] = [s for s in m["segments"] if s["start"] + s["size"] > position]
+            m["pruned_until"] = max(m["pruned_until"], dropped[-1]["start"] + dropped[-1]["size"])
+            self._save()
+            for segment in dropped:
+                path = os.path.join(self.directory, segment["file"])
+                if os.path.exists(path):
+                    os.remove(path)
+            return len(dropped)
+
+_instances = {}
+
+def get_segments(data_dir):
+    if data_dir not in _instances:
+        _instances[data_dir] = EventSegments(
+            data_dir, config.EVENTS_ROTATE_BYTES, config.EVENTS_ROTATE_DAYS
+        )
+    return _instances[data_dir]
+
+def release(data_dir):
+    _instances.pop(data_dir, None)
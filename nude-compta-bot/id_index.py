@@ -0,0 +1,167 @@
+# id_index.py
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+import partitions
+from repository import get_repository, TICKETS_FILE
+from ticket_model import debtor_parts
+
+def _words(motif):
+    return set((motif or "").lower().split())
+
+def _prefix_range(entries, prefix):
+    """Tranche [début, fin) des entrées triées qui commencent par `prefix`."""
+    start = bisect_left(entries, prefix)
+    end = bisect_left(entries, prefix + "\uffff") if prefix else len(entries)
+    return start, end
+
+class TicketIdIndex:
+    """IDs des tickets ouverts triés (recherche par préfixe), mots des motifs et tickets de chaque
+    utilisateur, pour l'autocomplétion.
+
+    Lu depuis la boucle asyncio à chaque frappe, écrit dans le thread du registre : un verrou
+    protège les deux, aucune lecture ne touche au disque.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = None    # [ticket_id en minuscules] trié
+        self._tickets = {}  # ticket_id en minuscules -> (ticket_id, ticket, mots du motif)
+        self._words = []    # [(mot du motif, ticket_id en minuscules)] trié
+        self._roles = {"crediteur": {}, "debiteur": {}}  # rôle -> user_id -> {ticket_id en minuscules}
+
+    # MISE À JOUR (verrou tenu par l'appelant)
+    @staticmethod
+    def _involved(ticket):
+        crediteur = ticket["crediteur_id"]
+        yield "crediteur", crediteur
+        for uid, _ in debtor_parts(ticket):
+            if uid != crediteur:
+                yield "debiteur", uid
+
+    def _add(self, ticket_id, ticket):
+        key = ticket_id.lower()
+        if key not in self._tickets:
+            insort(self._ids, key)
+        words = _words(ticket["motif"])
+        self._tickets[key] = (ticket_id, ticket, words)
+        for word in words:
+            insort(self._words, (word, key))
+        for role, uid in self._involved(ticket):
+            self._roles[role].setdefault(uid, set()).add(key)
+
+    def _remove(self, ticket_id, ticket):
+        key = ticket_id.lower()
+        if self._tickets.pop(key, None) is None:
+            return
+        i = bisect_left(self._ids, key)
+        if i < len(self._ids) and self._ids[i] == key:
+            del self._ids[i]
+        for word in _words(ticket["motif"]):
+            i = bisect_left(self._words, (word, key))
+            if i < len(self._words) and self._words[i] == (word, key):
+                del self._words[i]
+        for role, uid in self._involved(ticket):
+            self._roles[role].get(uid, set()).discard(key)
+
+    def rebuild(self, tickets):
+        ids = sorted(tid.lower() for tid in tickets)
+        entries = {tid.lower(): (tid, t, _words(t["motif"])) for tid, t in tickets.items()}
+        words = sorted((w, key) for key, (_, _, ws) in entries.items() for w in ws)
+        roles = {"crediteur": {}, "debiteur": {}}
+        for tid, t in tickets.items():
+            for role, uid in self._involved(t):
+                roles[role].setdefault(uid, set()).add(tid.lower())
+        with self._lock:
+            self._ids, self._tickets, self._words, self._roles = ids, entries, words, roles
+
+    # ÉCOUTE DU REPOSITORY
+    def on_reset(self, filename, data):
+        if filename == TICKETS_FILE:
+            self.rebuild(data)
+
+    def on_ticket_changed(self, ticket_id, old, new):
+        with self._lock:
+            if self._ids is None:
+                return
+            if old is not None:
+                self._remove(ticket_id, old)
+            if new is not None:
+                self._add(ticket_id, new)
+
+    def on_archived(self, ticket_id, ticket):
+        pass
+
+    # LECTURE (verrou tenu par l'appelant)
+    def _match(self, key, prefix, keywords):
+        if not key.startswith(prefix):
+            return False
+        if not keywords:
+            return True
+        words = self._tickets[key][2]
+        for k in keywords:
+            # Mot complet : test direct, sinon début d'un des mots du motif
+            if k not in words and not any(w.startswith(k) for w in words):
+                return False
+        return True
+
+    def _candidates(self, prefix, keywords):
+        """(taille, clés à examiner) : tranche de l'index des mots du mot-clé le plus sélectif,
+        ou tranche des IDs si elle est plus petite."""
+        start, end = _prefix_range(self._ids, prefix)
+        if keywords:
+            ranges = [
+                (bisect_left(self._words, (k,)), bisect_left(self._words, (k + "\uffff",)))
+                for k in keywords
+            ]
+            w_start, w_end = min(ranges, key=lambda r: r[1] - r[0])
+            if w_end - w_start < end - start:
+                return w_end - w_start, (self._words[i][1] for i in range(w_start, w_end))
+        return end - start, (self._ids[i] for i in range(start, end))
+
+    def suggest(self, text, user_id=None, limit=25, prefer="debiteur"):
+        """Tickets ouverts pour l'autocomplétion : [(ticket_id, ticket)], au plus `limit`.
+
+        `text` : début d'ID puis mots-clés du motif (« a12 resto ») ; si aucun ID ne commence par
+        le premier mot, tous les mots sont cherchés dans les motifs. Tickets de `user_id` en tête
+        (ceux où il a le rôle `prefer` d'abord), puis les autres. Coût en O(limit + tickets de
+        l'utilisateur), indépendant du nombre total de tickets ouverts.
+        """
+        words = text.lower().split()
+        with self._lock:
+            if self._ids is None:
+                return []
+            prefix, keywords = (words[0], words[1:]) if words else ("", [])
+            start, end = _prefix_range(self._ids, prefix)
+            if start == end and words:
+                prefix, keywords = "", words
+
+            size, candidates = self._candidates(prefix, keywords)
+            result = []
+            other = "crediteur" if prefer == "debiteur" else "debiteur"
+            for role in (prefer, other):
+                keys = self._roles[role].get(user_id, ())
+                if size < len(keys):
+                    # Peu de candidats : on part d'eux plutôt que de tous les tickets de l'utilisateur
+                    _, few = self._candidates(prefix, keywords)
+                    keys = {k for k in few if k in keys}
+                if prefix or keywords:
+                    keys = (k for k in keys if self._match(k, prefix, keywords))
+                result += heapq.nsmallest(limit - len(result), keys)
+
+            seen = set(result)
+            for key in candidates:
+                if len(result) >= limit:
+                    break
+                if key not in seen and self._match(key, prefix, keywords):
+                    seen.add(key)
+                    result.append(key)
+            return [self._tickets[key][:2] for key in result]
+
+def _create():
+    index = TicketIdIndex()
+    get_repository().subscribe(index)
+    return index
+
+get_id_index = partitions.scoped(_create)
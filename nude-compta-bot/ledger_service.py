@@ -0,0 +1,160 @@
+# ledger_service.py
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import partitions
+import replay
+import storage
+from id_index import get_id_index
+from tickets import create_ticket, rembourse, close_ticket, calcul_solde
+from settlement import settlement_plan, apply_settlement
+import bulk
+from user_index import get_user_index
+from age_index import get_age_index
+from stats import get_stats, STATS_FILE
+from utils import generate_ticket_id
+
+class LedgerService:
+    """Opérations du registre exécutées hors de la boucle asyncio, une à la fois.
+
+    L'unique thread de l'exécuteur sert de file d'écriture : les opérations passent dans
+    l'ordre d'arrivée, aucune mise à jour n'est perdue et une lecture voit les écritures
+    soumises avant elle. Chaque opération s'exécute dans la partition (registre du serveur)
+    de la tâche qui l'a soumise ; les partitions inactives sont évincées entre deux opérations.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger")
+        self._stats_flush = {}  # clé de partition -> enregistrement différé de stats.json
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Contexte copié : la partition active de la tâche suit l'opération dans le thread du registre
+        call = functools.partial(self._call, func, *args, **kwargs)
+        result = await loop.run_in_executor(self._executor, contextvars.copy_context().run, call)
+        self._schedule_stats_flush(loop)
+        return result
+
+    def _call(self, func, *args, **kwargs):
+        partition = partitions.current()
+        partition.touch()
+        if not partition.opened:
+            self._open(partition)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if config.PARTITION_BY_GUILD:
+                self._evict(keep=(partition.key,))
+
+    # PARTITIONS (thread du registre)
+    def _open(self, partition):
+        """Premier accès au registre d'un serveur : reprise des journaux, contrôle events.log
+        (la partition racine est contrôlée au lancement, voir main.py), agrégats et index."""
+        if partition.key is not None:
+            storage.recover_journals()
+            if config.REPLAY_ON_STARTUP:
+                print(f"Registre du serveur {partition.key} :")
+                replay.startup_check()
+        get_stats().load()  # charge aussi les tickets
+        get_id_index()      # autocomplétion prête dès le chargement
+        partition.opened = True
+
+    def _evict(self, keep=()):
+        for partition in partitions.idle(config.PARTITION_IDLE_SECONDS, config.PARTITION_MAX_RESIDENT, keep):
+            with partitions.using(partition.key):
+                get_stats().flush()
+                storage.release()
+            partitions.drop(partition.key)
+
+    # AGRÉGATS
+    def _schedule_stats_flush(self, loop):
+        """Clôtures en attente dans stats.json : enregistrées STATS_FLUSH_SECONDS plus tard,
+        une fois pour toutes celles survenues entre-temps (sinon rattrapage complet au démarrage)."""
+        key = partitions.current().key
+        if key in self._stats_flush or not get_stats().dirty:
+            return
+
+        def flush():
+            del self._stats_flush[key]
+            future = loop.run_in_executor(self._executor, self._flush_stats, (key,))
+            future.add_done_callback(_report_stats_flush)
+
+        self._stats_flush[key] = loop.call_later(config.STATS_FLUSH_SECONDS, flush)
+
+    def _flush_stats(self, keys=None):
+        # Partitions résidentes seulement : une partition évincée a déjà été enregistrée
+        for partition in partitions.resident():
+            if keys is None or partition.key in keys:
+                with partitions.using(partition.key):
+                    get_stats().flush()
+
+    async def evict_idle(self):
+        """Éviction périodique, sans attendre la prochaine opération ni charger de registre."""
+        if config.PARTITION_BY_GUILD:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self._evict)
+
+    async def open(self):
+        """Charge le registre de la partition active (on_ready, autocomplétion à froid)."""
+        await self.run(lambda: None)
+
+    # ÉCRITURES
+    async def create_ticket(self, type_ticket, createur_id, debiteurs, crediteur_id, montant_centimes, motif):
+        """Attribue l'ID et crée le ticket dans la même opération, renvoie l'ID."""
+        def job():
+            ticket_id = generate_ticket_id(type_ticket)
+            create_ticket(ticket_id, type_ticket, createur_id, debiteurs, crediteur_id, montant_centimes, motif)
+            return ticket_id
+        return await self.run(job)
+
+    async def rembourse(self, ticket_id, montant_centimes, auteur_id):
+        await self.run(rembourse, ticket_id, montant_centimes, auteur_id)
+
+    async def close_ticket(self, ticket_id, auteur_id):
+        await self.run(close_ticket, ticket_id, auteur_id)
+
+    async def apply_settlement(self, auteur_id):
+        return await self.run(apply_settlement, auteur_id)
+
+    async def import_tickets(self, text, filename, createur_id):
+        return await self.run(bulk.import_tickets, text, filename, createur_id)
+
+    # LECTURES
+    async def solde(self, user_id):
+        return await self.run(calcul_solde, user_id)
+
+    async def settlement_plan(self):
+        return await self.run(settlement_plan)
+
+    async def historique_page(self, user_id, page, size):
+        return await self.run(get_user_index().page, user_id, page, size)
+
+    async def oldest_tickets(self, k, offset=0, user_id=None, type_ticket=None):
+        return await self.run(get_age_index().oldest, k, offset, user_id, type_ticket)
+
+    async def stats(self, months=12, top=5):
+        return await self.run(get_stats().summary, months, top)
+
+    async def export(self, kind, out, fmt="csv"):
+        return await self.run(bulk.export, kind, out, fmt)
+
+    def shutdown(self):
+        """Arrêt du bot : agrégats de toutes les partitions enregistrés après la dernière opération."""
+        for handle in self._stats_flush.values():
+            handle.cancel()
+        self._stats_flush.clear()
+        self._executor.submit(self._flush_stats)
+        self._executor.shutdown(wait=True)
+
+def _report_stats_flush(future):
+    if not future.cancelled() and future.exception() is not None:
+        # Réessayé au prochain enregistrement (agrégats toujours marqués modifiés)
+        print(f"Erreur d'enregistrement de {STATS_FILE} : {future.exception()}")
+
+_service = LedgerService()
+
+def get_ledger():
+    return _service
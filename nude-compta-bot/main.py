@@ -1,14 +1,27 @@
+import asyncio
 import discord
 import os
+import tempfile
 
 from discord import app_commands, Embed, Interaction
 from discord.ext import commands
 from discord import AllowedMentions
+from discord.ui import View, Button
 from dotenv import load_dotenv
 from datetime import datetime, UTC
-from tickets import create_ticket, rembourse, calcul_solde, close_ticket
-from utils import generate_ticket_id, cents_to_euros, euros_to_cents, embed_color
-from storage import load_json
+from utils import cents_to_euros, euros_to_cents, embed_color
+from storage import recover_journals
+from ledger_service import get_ledger
+from member_directory import get_member_directory
+import event_log
+import config
+import partitions
+import replay
+import storage
+from shared.member_snapshot import MemberSnapshotWriter
+from shared import outbound
+from reminders import ReminderScheduler
+from id_index import get_id_index
 
 version = "v.0.0.0-test - 2025-12-23 - 16:30"
 
@@ -24,7 +37,13 @@ if not GUILD_ID_STR:
     raise ValueError("La variable GUILD_ID n'est pas définie dans var.env")
 
 GUILD_ID = int(GUILD_ID_STR)
-guild_obj = discord.Object(id=GUILD_ID)
+# Registre de GUILD_ID dans data/, ceux des autres serveurs dans data/guilds/<id>/ (COMPTA_PARTITION_BY_GUILD)
+partitions.configure(GUILD_ID)
+
+# Commandes enregistrées sur GUILD_ID et COMPTA_GUILD_IDS, ou globalement (liste vide)
+COMMAND_GUILDS = [] if config.COMMAND_SCOPE == "global" else [
+    discord.Object(id=g) for g in dict.fromkeys([GUILD_ID, *config.EXTRA_GUILD_IDS])
+]
 
 LOG_CHANNEL_ID = int(LOG_CHANNEL_ID_STR) if LOG_CHANNEL_ID_STR else None
 
@@ -32,20 +51,128 @@ LOG_CHANNEL_ID = int(LOG_CHANNEL_ID_STR) if LOG_CHANNEL_ID_STR else None
 INTENTS = discord.Intents.default()
 INTENTS.message_content = True
 INTENTS.members = True
-bot = commands.Bot(command_prefix="!", intents=INTENTS)
+
+class LedgerTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        if interaction.guild is None:
+            # Commandes déclarées serveur uniquement ; refus pour les clients qui les proposeraient encore en DM
+            if interaction.type is not discord.InteractionType.autocomplete:
+                await outbound.respond(interaction, "Cette commande doit être utilisée sur un serveur.", ephemeral=True)
+            return False
+        # Chaque interaction a sa tâche : commande et autocomplétion voient le registre de leur serveur
+        partitions.use(interaction.guild_id)
+        return True
+
+# Registre, membres et permissions n'ont de sens que sur un serveur, y compris en portée globale
+bot = commands.Bot(
+    command_prefix="!",
+    intents=INTENTS,
+    tree_cls=LedgerTree,
+    allowed_contexts=app_commands.AppCommandContext(guild=True, dm_channel=False, private_channel=False)
+)
+
+# Seul bot avec l'intent members : il publie l'annuaire lu par le bot core (shared/member_snapshot.py)
+member_snapshot = MemberSnapshotWriter()
 
 # ON_READY
 @bot.event
 async def on_ready():
+    event_log.attach_loop(asyncio.get_running_loop())
     guild = bot.get_guild(GUILD_ID)
     if guild is None:
         print("Erreur : le bot n'a pas accès à la guild")
         return
-    await bot.tree.sync(guild=guild)
-    print(f"Bot connecté : {bot.user} - commandes synchronisées sur la guild {guild.name}")
+    member_snapshot.attach(guild, asyncio.get_running_loop())
+    await start_reminders()
+    # Registre principal (agrégats de /stats, index) chargé avant les premières commandes ;
+    # ceux des autres serveurs à leur première interaction
+    await get_ledger().open()
+    if config.PARTITION_BY_GUILD and not partition_eviction:
+        partition_eviction.append(asyncio.create_task(evict_partitions()))
+
+    if COMMAND_GUILDS:
+        for g in COMMAND_GUILDS:
+            await bot.tree.sync(guild=g)
+        print(f"Bot connecté : {bot.user} - commandes synchronisées sur {len(COMMAND_GUILDS)} serveur(s)")
+    else:
+        await bot.tree.sync()
+        print(f"Bot connecté : {bot.user} - commandes globales synchronisées (propagation jusqu'à une heure)")
+
+# PARTITIONS
+PARTITION_EVICT_EVERY = 60  # secondes
+
+partition_eviction = []  # tâche unique (on_ready peut être rappelé après une reconnexion)
+
+async def evict_partitions():
+    while True:
+        await asyncio.sleep(PARTITION_EVICT_EVERY)
+        await get_ledger().evict_idle()
+
+# RELANCES
+REMINDER_MAX_FIELDS = 20
+
+async def send_reminder(user_id, debts):
+    """Un seul DM par débiteur, récapitulant toutes ses dettes en retard."""
+    user = bot.get_user(int(user_id)) or await bot.fetch_user(int(user_id))
+    total = sum(share for _, _, share in debts)
+    embed = discord.Embed(
+        title="Rappel : dettes en attente",
+        description=f"Tu dois encore `{cents_to_euros(total)}` sur {len(debts)} ticket(s).",
+        color=embed_color("rappel")
+    )
+    for tid, t, share in debts[:REMINDER_MAX_FIELDS]:
+        embed.add_field(
+            name=f"{tid} - depuis le {t['date_creation'][:10]}",
+            value=f"`{cents_to_euros(share)}` à <@{t['crediteur_id']}>\nMotif : `{t['motif']}`",
+            inline=False
+        )
+    if len(debts) > REMINDER_MAX_FIELDS:
+        embed.set_footer(text=f"… et {len(debts) - REMINDER_MAX_FIELDS} autres tickets")
+    # Derrière les réponses d'interaction dans la file d'envoi
+    await outbound.get_dispatcher().call(
+        ("dm", user.id),
+        lambda: user.send(embed=embed),
+        priority=outbound.BROADCAST
+    )
+
+# Un planificateur par registre : serveur principal, plus les serveurs ayant déjà un registre sur disque
+reminders = {}
+
+async def start_reminders():
+    if config.REMINDER_AGE_DAYS <= 0:
+        return
+    guilds = [GUILD_ID] + (storage.known_guilds() if config.PARTITION_BY_GUILD else [])
+    for guild_id in guilds:
+        key = partitions.key_for(guild_id)
+        if key in reminders:
+            continue
+        reminders[key] = ReminderScheduler(
+            send_reminder,
+            config.REMINDER_AGE_DAYS,
+            config.REMINDER_INTERVAL_DAYS,
+            spacing=config.REMINDER_SPACING
+        )
+        # Les tâches du planificateur héritent de la partition sélectionnée ici
+        with partitions.using(guild_id):
+            await reminders[key].start()
+
+# ON_MEMBER_UPDATE
+@bot.event
+async def on_member_update(before, after):
+    # Garde l'annuaire des noms à jour sans attendre l'expiration du cache
+    get_member_directory().remember(after)
+    member_snapshot.touch()
+
+@bot.event
+async def on_member_join(member):
+    member_snapshot.touch()
+
+@bot.event
+async def on_raw_member_remove(payload):
+    member_snapshot.touch()
 
 # /p2p_ticket
-@bot.tree.command(name="p2p_ticket", description="Créer un ticket p2p", guild=guild_obj)
+@bot.tree.command(name="p2p_ticket", description="Créer un ticket p2p", guilds=COMMAND_GUILDS)
 @app_commands.describe(
     debiteur="Utilisateur qui doit",
     crediteur="Utilisateur qui reçoit",
@@ -59,20 +186,19 @@ async def p2p_ticket(interaction: discord.Interaction,
                      motif: str):
     await interaction.response.defer()
     if debiteur.id == crediteur.id:
-        await interaction.response.followup.send("Un utilisateur ne peut pas se devoir à lui-même.", ephemeral=False)
+        await outbound.followup(interaction, "Un utilisateur ne peut pas se devoir à lui-même.", ephemeral=False)
         return
     if montant <= 0:
-        await interaction.response.followup.send("Le montant doit être positif.", ephemeral=False)
+        await outbound.followup(interaction, "Le montant doit être positif.", ephemeral=False)
         return
 
     montant_c = euros_to_cents(montant)
-    ticket_id = generate_ticket_id("p2p")
     debiteurs = [{"user_id": str(debiteur.id), "part": montant_c}]
 
     try:
-        create_ticket(ticket_id, "p2p", str(interaction.user.id), debiteurs, str(crediteur.id), montant_c, motif)
+        ticket_id = await get_ledger().create_ticket("p2p", str(interaction.user.id), debiteurs, str(crediteur.id), montant_c, motif)
     except Exception as e:
-        await interaction.response.followup.send(f"Erreur : {e}", ephemeral=False)
+        await outbound.followup(interaction, f"Erreur : {e}", ephemeral=False)
         return
 
     embed = discord.Embed(
@@ -82,13 +208,13 @@ async def p2p_ticket(interaction: discord.Interaction,
     )
     embed.add_field(name="Motif", value=f"`{motif}`", inline=False)
         
-    await interaction.response.followup.send(embed=embed,allowed_mentions=AllowedMentions(users=True))
+    await outbound.followup(interaction, embed=embed,allowed_mentions=AllowedMentions(users=True))
 
 # /split_ticket
 @bot.tree.command(
     name="split_ticket", 
     description="Créer un ticket avec plusieurs débiteurs", 
-    guild=guild_obj
+    guilds=COMMAND_GUILDS
 )
 @app_commands.describe(
     debiteurs="Liste des utilisateurs TOTALES, le premier aura la part du cents en plus",
@@ -107,14 +233,16 @@ async def split_ticket(
 
     mentions = debiteurs.split()
     if not mentions:
-        await interaction.response.followup.send(
+        await outbound.followup(
+            interaction,
             "Vous devez mentionner au moins un débiteur.",
             ephemeral=False
         )
         return
 
     if montant <= 0:
-        await interaction.response.followup.send(
+        await outbound.followup(
+            interaction,
             "Le montant doit être positif.",
             ephemeral=False
         )
@@ -137,10 +265,8 @@ async def split_ticket(
         })
 
     # Création du ticket
-    ticket_id = generate_ticket_id("groupe")
     try:
-        create_ticket(
-            ticket_id,
+        ticket_id = await get_ledger().create_ticket(
             "groupe",
             str(interaction.user.id),
             debiteurs_list,
@@ -149,7 +275,8 @@ async def split_ticket(
             motif
         )
     except Exception as e:
-        await interaction.response.followup.send(
+        await outbound.followup(
+            interaction,
             f"Erreur : {e}",
             ephemeral=False
         )
@@ -216,50 +343,72 @@ async def split_ticket(
         inline=False
     )
 
-    await interaction.followup.send(
+    await outbound.followup(
+        interaction,
         embed=embed,
         allowed_mentions=discord.AllowedMentions(users=True)
     )
 
+# AUTOCOMPLÉTION DES ID DE TICKET
+async def _ticket_choices(current, user_id, prefer):
+    partition = partitions.current()
+    partition.touch()
+    if not partition.opened:
+        # Premier usage du registre de ce serveur (ou registre évincé) : chargé une fois
+        await get_ledger().open()
+    # Index en mémoire lu directement (pas de passage par le thread du registre) : chaque frappe compte
+    choices = []
+    for ticket_id, t in get_id_index().suggest(current, user_id, prefer=prefer):
+        name = f"{ticket_id} - {cents_to_euros(t['reste_du'])} - {t['motif']}"
+        choices.append(app_commands.Choice(name=name[:100], value=ticket_id))
+    return choices
+
+async def rembourse_autocomplete(interaction: discord.Interaction, current: str):
+    return await _ticket_choices(current, str(interaction.user.id), "debiteur")
+
+async def close_autocomplete(interaction: discord.Interaction, current: str):
+    return await _ticket_choices(current, str(interaction.user.id), "crediteur")
+
 # /rembourse
 @bot.tree.command(
     name="rembourse", 
     description="Rembourser un ticket", 
-    guild=guild_obj
+    guilds=COMMAND_GUILDS
 )
 @app_commands.describe(
     ticket_id="ID du ticket", 
     montant="Montant remboursé"
 )
+@app_commands.autocomplete(ticket_id=rembourse_autocomplete)
 async def rembourse_cmd(interaction: discord.Interaction, ticket_id: str, montant: float):
     if montant <= 0:
-        await interaction.response.send_message("Montant invalide.", ephemeral=False)
+        await outbound.respond(interaction, "Montant invalide.", ephemeral=False)
         return
     montant_c = euros_to_cents(montant)
     try:
-        rembourse(ticket_id, montant_c, str(interaction.user.id))
+        await get_ledger().rembourse(ticket_id, montant_c, str(interaction.user.id))
     except Exception as e:
-        await interaction.response.send_message(f"Erreur : {e}", ephemeral=False)
+        await outbound.respond(interaction, f"Erreur : {e}", ephemeral=False)
         return
     embed = discord.Embed(
         title=f"Remboursement sur {ticket_id}",
         description=f"Montant remboursé : {montant:.2f}€",
         color=embed_color("remboursement")
     )
-    await interaction.response.send_message(embed=embed,allowed_mentions=AllowedMentions(users=True))
+    await outbound.respond(interaction, embed=embed,allowed_mentions=AllowedMentions(users=True))
 
 # /solde
 @bot.tree.command(
     name="solde", 
     description="Voir le solde d'un utilisateur", 
-    guild=guild_obj
+    guilds=COMMAND_GUILDS
 )
 @app_commands.describe(
     utilisateur="Utilisateur (optionnel)"
 )
 async def solde(interaction: discord.Interaction, utilisateur: discord.Member | None = None):
     user = utilisateur or interaction.user
-    s = calcul_solde(str(user.id))
+    s = await get_ledger().solde(str(user.id))
 
     embed = discord.Embed(
         title=f"Solde de {user.display_name}",
@@ -269,18 +418,15 @@ async def solde(interaction: discord.Interaction, utilisateur: discord.Member |
     if not s["detail"]:
         embed.description = "Aucune dette ou crédit."
     else:
+        # Tous les noms résolus d'un coup (cache + requête groupée, budget de latence)
+        noms = await get_member_directory().resolve(
+            interaction.guild, [int(uid) for uid in s["detail"]]
+        )
         for uid, vals in s["detail"].items():
-            # Récupère le membre en toute sécurité
-            member = interaction.guild.get_member(int(uid))
-            if not member:
-                try:
-                    member = await interaction.guild.fetch_member(int(uid))
-                except discord.NotFound:
-                    member = None
-
-            # Nom lisible et mention si dispo
-            display_name = member.display_name if member else f"Utilisateur ({uid})"
-            mention = member.mention if member else f"<@{uid}>"
+            # Nom lisible si dispo, la mention reste cliquable dans tous les cas
+            nom = noms.get(int(uid))
+            display_name = nom if nom else f"Utilisateur ({uid})"
+            mention = f"<@{uid}>"
 
             # On met la mention dans le field.value pour qu'elle soit cliquable
             embed.add_field(
@@ -299,7 +445,8 @@ async def solde(interaction: discord.Interaction, utilisateur: discord.Member |
         inline=False
     )
 
-    await interaction.response.send_message(
+    await outbound.respond(
+        interaction,
         embed=embed,
         allowed_mentions=discord.AllowedMentions(users=True)
     )
@@ -308,11 +455,11 @@ async def solde(interaction: discord.Interaction, utilisateur: discord.Member |
 @bot.tree.command(
     name="debug",
     description="Liste tous les membres du serveur pour debug",
-    guild=guild_obj
+    guilds=COMMAND_GUILDS
 )
 async def debug_members(interaction: discord.Interaction):
     if interaction.guild is None:
-        await interaction.response.send_message("Cette commande doit être utilisée sur un serveur.", ephemeral=False)
+        await outbound.respond(interaction, "Cette commande doit être utilisée sur un serveur.", ephemeral=False)
         return
 
     guild = interaction.guild
@@ -332,40 +479,183 @@ async def debug_members(interaction: discord.Interaction):
                 value=f"ID: {m.id}\nMention: {m.mention}",
                 inline=False
             )
+    embed.add_field(
+        name="File d'envoi",
+        value=outbound.get_dispatcher().summary(),
+        inline=False
+    )
+    if config.PARTITION_BY_GUILD:
+        resident = partitions.summary()
+        embed.add_field(
+            name=f"Registres en mémoire ({len(resident)})",
+            value="\n".join(
+                f"{p['guild_id'] or 'principal'} - inactif depuis {p['idle_seconds']} s"
+                for p in resident[:10]
+            ) or "—",
+            inline=False
+        )
     embed.add_field(
         name="Code Version", 
         value=f"{version}\nGit : https://github.com/Trotroni/COMPTA", 
         inline=False
     )
 
-    await interaction.response.send_message(embed=embed, ephemeral=False)
+    await outbound.respond(interaction, embed=embed, ephemeral=False)
 
 # /close_ticket
 @bot.tree.command(
     name="close_ticket", 
     description="Clore un ticket et archiver", 
-    guild=guild_obj
+    guilds=COMMAND_GUILDS
 )
 @app_commands.describe(
     ticket_id="ID du ticket"
 )
+@app_commands.autocomplete(ticket_id=close_autocomplete)
 async def close_ticket_cmd(interaction: discord.Interaction, ticket_id: str):
     try:
-        close_ticket(ticket_id, str(interaction.user.id))
+        await get_ledger().close_ticket(ticket_id, str(interaction.user.id))
     except Exception as e:
-        await interaction.response.send_message(f"Erreur : {e}", ephemeral=False)
+        await outbound.respond(interaction, f"Erreur : {e}", ephemeral=False)
         return
     embed = discord.Embed(
         title=f"Ticket {ticket_id} fermé", 
         color=embed_color("close_ticket")
     )
-    await interaction.response.send_message(embed=embed,allowed_mentions=AllowedMentions(users=True))
+    await outbound.respond(interaction, embed=embed,allowed_mentions=AllowedMentions(users=True))
+
+# /settle
+@bot.tree.command(
+    name="settle",
+    description="Calculer le minimum de virements pour solder toutes les dettes",
+    guilds=COMMAND_GUILDS
+)
+@app_commands.describe(
+    appliquer="Marquer tous les tickets ouverts comme remboursés selon ce plan"
+)
+async def settle_cmd(interaction: discord.Interaction, appliquer: bool = False):
+    # Le plan est consultable par tous, l'appliquer solde le registre entier
+    if appliquer and not interaction.user.guild_permissions.administrator:
+        await outbound.respond(interaction, "Commande réservée aux administrateurs.", ephemeral=True)
+        return
+    await interaction.response.defer()
+    try:
+        if appliquer:
+            plan = await get_ledger().apply_settlement(str(interaction.user.id))
+        else:
+            plan = await get_ledger().settlement_plan()
+    except Exception as e:
+        await outbound.followup(interaction, f"Erreur : {e}", ephemeral=False)
+        return
+
+    embed = discord.Embed(
+        title="Plan de remboursement appliqué" if appliquer else "Plan de remboursement",
+        color=embed_color("settle")
+    )
+
+    if not plan:
+        embed.description = "Aucune dette à solder."
+    else:
+        lignes = [f"<@{d}> → <@{c}> : `{cents_to_euros(m)}`" for d, c, m in plan]
+        # Limite Discord : 4096 caractères de description
+        description = ""
+        for idx, ligne in enumerate(lignes):
+            if len(description) + len(ligne) > 3900:
+                description += f"… et {len(lignes) - idx} autres virements"
+                break
+            description += ligne + "\n"
+        embed.description = description
+        embed.set_footer(text=f"{len(plan)} virement(s)")
+
+    await outbound.followup(interaction, embed=embed, allowed_mentions=AllowedMentions(users=True))
+
+# /import
+@bot.tree.command(
+    name="import",
+    description="Importer des tickets en masse (CSV ou JSONL, admin)",
+    guilds=COMMAND_GUILDS
+)
+@app_commands.describe(
+    fichier="CSV (debiteurs, crediteur_id, montant, motif, [type]) ou JSONL"
+)
+async def import_cmd(interaction: discord.Interaction, fichier: discord.Attachment):
+    if not interaction.user.guild_permissions.administrator:
+        await outbound.respond(interaction, "Commande réservée aux administrateurs.", ephemeral=True)
+        return
+    await interaction.response.defer()
+
+    try:
+        text = (await fichier.read()).decode("utf-8-sig")
+        ids, erreurs = await get_ledger().import_tickets(text, fichier.filename, str(interaction.user.id))
+    except Exception as e:
+        await outbound.followup(interaction, f"Erreur : {e}", ephemeral=False)
+        return
+
+    if erreurs:
+        details = "\n".join(erreurs[:15])
+        if len(erreurs) > 15:
+            details += f"\n… et {len(erreurs) - 15} autres erreurs"
+        embed = discord.Embed(
+            title="Import annulé",
+            description=f"Aucun ticket créé.\n```\n{details}\n```",
+            color=embed_color("alerte")
+        )
+    else:
+        embed = discord.Embed(
+            title="Import terminé",
+            description=f"{len(ids)} tickets créés : " + ", ".join(f"`{i}`" for i in ids[:20]) + (" …" if len(ids) > 20 else ""),
+            color=embed_color("groupe")
+        )
+    await outbound.followup(interaction, embed=embed)
+
+# /export
+@bot.tree.command(
+    name="export",
+    description="Exporter tickets, archives ou événements (admin)",
+    guilds=COMMAND_GUILDS
+)
+@app_commands.describe(
+    contenu="Données à exporter",
+    format="Format du fichier"
+)
+@app_commands.choices(
+    contenu=[
+        app_commands.Choice(name="Tickets ouverts", value="tickets"),
+        app_commands.Choice(name="Archives", value="archives"),
+        app_commands.Choice(name="Événements", value="events"),
+    ],
+    format=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSONL", value="jsonl"),
+    ]
+)
+async def export_cmd(interaction: discord.Interaction, contenu: str, format: str = "csv"):
+    if not interaction.user.guild_permissions.administrator:
+        await outbound.respond(interaction, "Commande réservée aux administrateurs.", ephemeral=True)
+        return
+    await interaction.response.defer()
+
+    # Écrit ligne par ligne dans un fichier temporaire, jamais tout en mémoire
+    with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as out:
+        try:
+            count = await get_ledger().export(contenu, out, format)
+        except Exception as e:
+            await outbound.followup(interaction, f"Erreur : {e}", ephemeral=False)
+            return
+        out.flush()
+        binary = out.buffer
+        binary.seek(0)
+        await outbound.followup(
+            interaction,
+            content=f"{count} lignes exportées",
+            file=discord.File(binary, filename=f"{contenu}.{format}")
+        )
 
 # /set
 @bot.tree.command(
     name="set", 
     description="Définir une dette", 
-    guild=guild_obj
+    guilds=COMMAND_GUILDS
 )
 @app_commands.describe(
     debiteur="Utilisateur qui doit",
@@ -375,14 +665,13 @@ async def close_ticket_cmd(interaction: discord.Interaction, ticket_id: str):
 )
 async def set_cmd(interaction: discord.Interaction, debiteur: discord.Member, crediteur: discord.Member, montant: float, motif: str):
     if montant <= 0:
-        await interaction.response.send_message("Montant invalide.", ephemeral=False)
+        await outbound.respond(interaction, "Montant invalide.", ephemeral=False)
         return
     montant_c = euros_to_cents(montant)
-    ticket_id = generate_ticket_id("p2p")
     try:
-        create_ticket(ticket_id, "p2p", str(interaction.user.id), [{"user_id": str(debiteur.id), "part": montant_c}], str(crediteur.id), montant_c, motif)
+        ticket_id = await get_ledger().create_ticket("p2p", str(interaction.user.id), [{"user_id": str(debiteur.id), "part": montant_c}], str(crediteur.id), montant_c, motif)
     except Exception as e:
-        await interaction.response.send_message(f"Erreur : {e}", ephemeral=False)
+        await outbound.respond(interaction, f"Erreur : {e}", ephemeral=False)
         return
     embed = discord.Embed(
         title=f"Dette définie ({ticket_id})",
@@ -390,81 +679,241 @@ async def set_cmd(interaction: discord.Interaction, debiteur: discord.Member, cr
         color=embed_color("set")
     )
     embed.add_field(name="Motif", value=motif, inline=False)
-    await interaction.response.send_message(embed=embed,allowed_mentions=AllowedMentions(users=True))
+    await outbound.respond(interaction, embed=embed,allowed_mentions=AllowedMentions(users=True))
 
 # /historique
+HISTORIQUE_PAGE_SIZE = 10  # 10 champs par page, loin de la limite Discord de 25
+
+def historique_embed(utilisateur, items, total, page):
+    embed = discord.Embed(
+        title=f"Tickets de {utilisateur.display_name}",
+        color=embed_color("audit")
+    )
+    if total == 0:
+        embed.description = "Aucun ticket trouvé."
+        return embed
+
+    for tid, t, archive in items:
+        debs = ", ".join([f"<@{d['user_id']}>({cents_to_euros(d['part'])})" for d in t["debiteurs"]])
+        embed.add_field(
+            name=f"{tid} - {t['type']}" + (" (clos)" if archive else ""),
+            value=f"Debiteurs : {debs}\nCrediteur : <@{t['crediteur_id']}>\nReste : {cents_to_euros(t['reste_du'])}\nMotif : {t['motif']}",
+            inline=False
+        )
+    pages = (total + HISTORIQUE_PAGE_SIZE - 1) // HISTORIQUE_PAGE_SIZE
+    embed.set_footer(text=f"Page {page + 1}/{pages} - {total} tickets")
+    return embed
+
+class PageView(View):
+    """Boutons précédent / suivant : chaque clic ne rend que la page demandée.
+
+    fetch(page) -> (items, total) et render(items, total, page) -> Embed.
+    Les clics ne passent pas par l'arbre des commandes : fetch est rejoué dans le registre de
+    `guild_id`, le serveur où la vue a été créée.
+    """
+
+    def __init__(self, fetch, render, total, page_size, guild_id):
+        super().__init__(timeout=300)
+        self.fetch = fetch
+        self.guild_id = guild_id
+        self.render = render
+        self.total = total
+        self.page_size = page_size
+        self.page = 0
+        self._update_buttons()
+
+    def _update_buttons(self):
+        pages = (self.total + self.page_size - 1) // self.page_size
+        self.precedent.disabled = self.page <= 0
+        self.suivant.disabled = self.page >= pages - 1
+
+    async def _show(self, interaction):
+        with partitions.using(self.guild_id):
+            items, self.total = await self.fetch(self.page)
+        self._update_buttons()
+        await interaction.response.edit_message(
+            embed=self.render(items, self.total, self.page),
+            view=self
+        )
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def precedent(self, interaction: discord.Interaction, button: Button):
+        self.page = max(self.page - 1, 0)
+        await self._show(interaction)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def suivant(self, interaction: discord.Interaction, button: Button):
+        self.page += 1
+        await self._show(interaction)
+
 @bot.tree.command(
     name="historique", 
     description="Liste complète des tickets d'un utilisateur", 
-    guild=guild_obj
+    guilds=COMMAND_GUILDS
 )
 @app_commands.describe(
     utilisateur="Utilisateur concerné"
 )
 async def audit(interaction: discord.Interaction, utilisateur: discord.Member):
-    tickets = load_json("tickets.json")
-    embed = discord.Embed(
-        title=f"Tickets de {utilisateur.display_name}", 
-        color=embed_color("audit")
-    )
-    count = 0
-    for tid, t in tickets.items():
-        found = False
-        for d in t["debiteurs"]:
-            if d["user_id"] == str(utilisateur.id):
-                found = True
-        if t["crediteur_id"] == str(utilisateur.id):
-            found = True
-        if found:
-            count += 1
-            debs = ", ".join([f"<@{d['user_id']}>({cents_to_euros(d['part'])})" for d in t["debiteurs"]])
-            embed.add_field(
-                name=f"{tid} - {t['type']}",
-                value=f"Debiteurs : {debs}\nCrediteur : <@{t['crediteur_id']}>\nReste : {cents_to_euros(t['reste_du'])}\nMotif : {t['motif']}",
-                inline=False
-            )
-    if count == 0:
-        embed.description = "Aucun ticket trouvé."
-    await interaction.response.send_message(embed=embed,allowed_mentions=AllowedMentions(users=True))
+    # Index par utilisateur (ouverts + archives) : seule la page affichée est lue
+    async def fetch(page):
+        return await get_ledger().historique_page(str(utilisateur.id), page, HISTORIQUE_PAGE_SIZE)
+
+    def render(items, total, page):
+        return historique_embed(utilisateur, items, total, page)
+
+    items, total = await fetch(0)
+    embed = render(items, total, 0)
+
+    if total > HISTORIQUE_PAGE_SIZE:
+        await outbound.respond(
+            interaction,
+            embed=embed,
+            view=PageView(fetch, render, total, HISTORIQUE_PAGE_SIZE, interaction.guild_id),
+            allowed_mentions=AllowedMentions(users=True)
+        )
+    else:
+        await outbound.respond(interaction, embed=embed,allowed_mentions=AllowedMentions(users=True))
 
 # /earliest
-@bot.tree.command(
-    name="earliest",
-    description="Liste le plus ancien ticket actif",
-    guild=guild_obj
-)
-async def earliest_tickets(interaction: Interaction):
-    await interaction.response.defer()
-    tickets = load_json("tickets.json")
-
-    if not tickets:
-        embed = Embed(
+def earliest_embed(items, total, page, nombre):
+    if total == 0:
+        return Embed(
             title="Tickets Actifs",
             description="Aucun ticket actif.",
             color=embed_color("earliest")
         )
-        await interaction.response.send_message(embed=embed,allowed_mentions=AllowedMentions(users=True))
-        return
 
-    for tid, t in tickets.items():
-        deb_names = ",\n ".join([f"<@{d['user_id']}>" for d in t["debiteurs"]])
-        montant_rest = t["reste_du"] / 100
+    embed = Embed(
+        title="Tickets actifs les plus anciens",
+        color=embed_color("earliest")
+    )
+    for tid, t in items:
+        deb_names = ", ".join([f"<@{d['user_id']}>" for d in t["debiteurs"]])
+        embed.add_field(
+            name=f"Ticket {tid} - {t['date_creation'][:10]}",
+            value=(
+                f"Créateur : <@{t['createur_id']}>\n"
+                f"Débiteur(s) : {deb_names}\n"
+                f"Créditeur : <@{t['crediteur_id']}>\n"
+                f"Montant restant : `{cents_to_euros(t['reste_du'])}`\n"
+                f"Motif : `{t['motif']}`"
+            ),
+            inline=False
+        )
+    pages = (total + nombre - 1) // nombre
+    embed.set_footer(text=f"Page {page + 1}/{pages} - {total} tickets actifs")
+    return embed
 
-        embed = Embed(
-            title=f"Ticket {tid}",
-            color=embed_color("earliest")
+@bot.tree.command(
+    name="earliest",
+    description="Liste les plus anciens tickets actifs",
+    guilds=COMMAND_GUILDS
+)
+@app_commands.describe(
+    utilisateur="Seulement les tickets de cet utilisateur (optionnel)",
+    type="Seulement ce type de ticket (optionnel)",
+    nombre="Tickets par page (1 à 10)"
+)
+@app_commands.choices(
+    type=[
+        app_commands.Choice(name="P2P", value="p2p"),
+        app_commands.Choice(name="Groupe", value="groupe"),
+    ]
+)
+async def earliest_tickets(
+    interaction: Interaction,
+    utilisateur: discord.Member | None = None,
+    type: str | None = None,
+    nombre: app_commands.Range[int, 1, 10] = 5
+):
+    user_id = str(utilisateur.id) if utilisateur else None
+
+    # Index trié par date de création : seuls les tickets de la page sont lus
+    async def fetch(page):
+        return await get_ledger().oldest_tickets(nombre, page * nombre, user_id, type)
+
+    def render(items, total, page):
+        return earliest_embed(items, total, page, nombre)
+
+    items, total = await fetch(0)
+    embed = render(items, total, 0)
+
+    if total > nombre:
+        await outbound.respond(
+            interaction,
+            embed=embed,
+            view=PageView(fetch, render, total, nombre, interaction.guild_id),
+            allowed_mentions=AllowedMentions(users=True)
         )
-        embed.add_field(name="Créateur", value=f"<@{t['createur_id']}>", inline=True)
-        embed.add_field(name="Débiteur(s)", value=f"{deb_names}", inline=True)
-        embed.add_field(name="Créditeur", value=f"<@{t['crediteur_id']}>", inline=True)
-        embed.add_field(name="Montant restant", value=f"`{montant_rest:.2f}€`", inline=False)
-        embed.add_field(name="Motif", value=f"`{t['motif']}`", inline=True)
+    else:
+        await outbound.respond(interaction, embed=embed, allowed_mentions=AllowedMentions(users=True))
 
-      # view = View()
-      # view.add_item(Button(label="Rembourser", style=discord.ButtonStyle.green, custom_id=f"remb_{tid}"))
-      # view.add_item(Button(label="Fermer", style=discord.ButtonStyle.danger, custom_id=f"close_{tid}"))
+# /stats
+def _duree(seconds):
+    if seconds is None:
+        return "—"
+    jours, reste = divmod(int(seconds), 86400)
+    return f"{jours} j {reste // 3600} h" if jours else f"{reste // 3600} h {reste % 3600 // 60} min"
+
+@bot.tree.command(
+    name="stats",
+    description="Statistiques du registre (mois, types, plus gros créanciers et débiteurs)",
+    guilds=COMMAND_GUILDS
+)
+@app_commands.describe(
+    mois="Nombre de mois affichés (1 à 24)",
+    top="Taille des classements (1 à 10)"
+)
+async def stats_cmd(
+    interaction: Interaction,
+    mois: app_commands.Range[int, 1, 24] = 6,
+    top: app_commands.Range[int, 1, 10] = 5
+):
+    # Agrégats tenus à jour à chaque mutation : aucune archive relue
+    s = await get_ledger().stats(mois, top)
+
+    embed = Embed(title="📊 Statistiques du registre", color=embed_color("stats"))
+    embed.description = (
+        f"Tickets ouverts : `{s['open']}` - clôturés : `{s['closed']}`\n"
+        f"Total remboursé : `{cents_to_euros(s['repaid'])}`\n"
+        f"Délai moyen de clôture : `{_duree(s['avg_close_seconds'])}`"
+    )
+    embed.add_field(
+        name="Par mois (créés / volume / clôturés)",
+        value="\n".join(
+            f"`{m['month']}` : {m['created']} / {cents_to_euros(m['volume'])} / {m['closed']}"
+            for m in s["monthly"]
+        ) or "Aucun ticket.",
+        inline=False
+    )
+    embed.add_field(
+        name="Par type",
+        value="\n".join(
+            f"{type_ticket} : {v['count']} tickets - {cents_to_euros(v['volume'])}"
+            for type_ticket, v in s["types"].items()
+        ) or "Aucun ticket.",
+        inline=False
+    )
+    embed.add_field(
+        name="Plus gros créanciers",
+        value="\n".join(f"<@{uid}> : {cents_to_euros(c)}" for uid, c in s["top_creditors"]) or "—",
+        inline=True
+    )
+    embed.add_field(
+        name="Plus gros débiteurs",
+        value="\n".join(f"<@{uid}> : {cents_to_euros(c)}" for uid, c in s["top_debtors"]) or "—",
+        inline=True
+    )
 
-    await interaction.followup.send(embed=embed, allowed_mentions=AllowedMentions(users=True))
+    await outbound.respond(interaction, embed=embed, allowed_mentions=AllowedMentions.none())
 
 # LANCEMENT BOT
-bot.run(NUDE_COMPTA_TOKEN)
\ No newline at end of file
+# (importable sans démarrer le bot : bench/interactions.py appelle les commandes directement)
+if __name__ == "__main__":
+    recover_journals()
+    if config.REPLAY_ON_STARTUP:
+        replay.startup_check()
+    bot.run(NUDE_COMPTA_TOKEN)
+    get_ledger().shutdown()
+    event_log.close_all()
\ No newline at end of file
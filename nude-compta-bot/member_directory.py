@@ -0,0 +1,114 @@
+# member_directory.py
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+QUERY_CHUNK = 100  # limite Discord d'IDs par requête query_members
+
+class MemberDirectory:
+    """Noms d'affichage des membres, en cache (TTL + LRU) et résolus par lots.
+
+    Les IDs absents du cache sont demandés en une requête groupée (query_members),
+    ou à défaut par fetch_member en parallèle sous sémaphore. Passé le budget de
+    latence, les IDs non résolus sont rendus à None (l'appelant affiche une mention) ;
+    la résolution continue en arrière-plan et profite à l'appel suivant.
+    """
+
+    def __init__(self, max_size=5000, ttl=600, missing_ttl=60, concurrency=5, budget=1.5):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.budget = budget
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._entries = OrderedDict()  # (guild_id, user_id) -> (expiration, display_name | None)
+        self._pending = set()          # tâches de résolution encore en cours
+
+    # CACHE
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires, name = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, name
+
+    def _put(self, key, name):
+        ttl = self.ttl if name is not None else self.missing_ttl
+        self._entries[key] = (time.monotonic() + ttl, name)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def remember(self, member):
+        """Met à jour le cache depuis un membre déjà connu (événements gateway, commandes)."""
+        self._put((member.guild.id, member.id), member.display_name)
+
+    # RÉSOLUTION
+    async def resolve(self, guild, user_ids):
+        """{user_id: display_name | None} pour une liste d'IDs (int)."""
+        result, misses = {}, []
+        for uid in user_ids:
+            hit, name = self._get((guild.id, uid))
+            if hit:
+                result[uid] = name
+                continue
+            member = guild.get_member(uid)
+            if member is not None:
+                self.remember(member)
+                result[uid] = member.display_name
+            else:
+                misses.append(uid)
+
+        if misses:
+            task = asyncio.create_task(self._fetch(guild, misses))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+            await asyncio.wait({task}, timeout=self.budget)
+            for uid in misses:
+                result[uid] = self._get((guild.id, uid))[1]
+        return result
+
+    async def _fetch(self, guild, user_ids):
+        chunks = [user_ids[i:i + QUERY_CHUNK] for i in range(0, len(user_ids), QUERY_CHUNK)]
+        try:
+            await asyncio.gather(*(self._query(guild, chunk) for chunk in chunks))
+        except (discord.ClientException, discord.HTTPException, asyncio.TimeoutError):
+            # Intent members indisponible ou gateway lente : un fetch par ID, en parallèle borné
+            await asyncio.gather(*(self._fetch_one(guild, uid) for uid in user_ids
+                                   if not self._get((guild.id, uid))[0]))
+
+    async def _query(self, guild, user_ids):
+        async with self._semaphore:
+            members = await guild.query_members(user_ids=user_ids, limit=len(user_ids), cache=True)
+        found = set()
+        for member in members:
+            self.remember(member)
+            found.add(member.id)
+        for uid in user_ids:
+            if uid not in found:
+                self._put((guild.id, uid), None)
+
+    async def _fetch_one(self, guild, uid):
+        async with self._semaphore:
+            try:
+                member = await guild.fetch_member(uid)
+            except discord.NotFound:
+                self._put((guild.id, uid), None)
+                return
+            except discord.HTTPException:
+                return
+        self.remember(member)
+
+_directory = None
+
+def get_member_directory():
+    global _directory
+    if _directory is None:
+        # Créé à la première utilisation, dans la boucle du bot (sémaphore asyncio)
+        _directory = MemberDirectory()
+    return _directory
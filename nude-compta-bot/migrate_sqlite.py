@@ -0,0 +1,69 @@
+# migrate_sqlite.py
+# Migration unique data/*.json + events.log -> base SQLite
+# Usage : python migrate_sqlite.py [--force]
+import argparse
+import os
+import sys
+
+import config
+import partitions
+import storage
+import sqlite_backend
+from archive_segments import SegmentArchiveStore
+
+def read_json_ledger():
+    # Lecture via le backend json (snapshot + éventuel journal)
+    previous = config.STORAGE_BACKEND
+    config.STORAGE_BACKEND = "json"
+    try:
+        tickets = storage.load_json("tickets.json")
+        if config.ARCHIVE_LAYOUT == "segments":
+            # archives.json déjà découpé (renommé en .migrated) : les archives sont dans data/archives/
+            store = SegmentArchiveStore(
+                os.path.join(storage.data_dir(), "archives"),
+                legacy_file=os.path.join(storage.data_dir(), "archives.json")
+            )
+            archives = dict(store.items())
+        else:
+            archives = storage.load_json("archives.json")
+    finally:
+        config.STORAGE_BACKEND = previous
+    return tickets, archives
+
+def read_events():
+    # Segments clos (compressés) puis segment actif, comme le backend json les lit
+    previous = config.STORAGE_BACKEND
+    config.STORAGE_BACKEND = "json"
+    try:
+        yield from storage.iter_events()
+    finally:
+        config.STORAGE_BACKEND = previous
+
+def main():
+    parser = argparse.ArgumentParser(description="Migre data/*.json vers SQLite")
+    parser.add_argument("--force", action="store_true", help="écrase une base non vide")
+    parser.add_argument("--guild", type=int, help="registre d'un autre serveur (data/guilds/<id>/)")
+    args = parser.parse_args()
+    partitions.select(args.guild)
+
+    tickets, archives = read_json_ledger()
+
+    with sqlite_backend.transaction() as conn:
+        existing = conn.execute("SELECT (SELECT COUNT(*) FROM tickets) + (SELECT COUNT(*) FROM archives)").fetchone()[0]
+        if existing and not args.force:
+            print(f"❌ La base {sqlite_backend.db_path()} contient déjà {existing} tickets (--force pour écraser)")
+            sys.exit(1)
+
+        sqlite_backend.save_json("tickets.json", tickets)
+        sqlite_backend.save_json("archives.json", archives)
+        conn.execute("DELETE FROM events")
+        nb_events = 0
+        for event in read_events():
+            sqlite_backend.log_event(event)
+            nb_events += 1
+
+    print(f"✅ {len(tickets)} tickets, {len(archives)} archives et {nb_events} événements migrés vers {sqlite_backend.db_path()}")
+    print("   Activer avec COMPTA_STORAGE_BACKEND=sqlite dans var.env")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# partitions.py
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+# Un registre par serveur (COMPTA_PARTITION_BY_GUILD=1) :
+#   data/                  partition racine : serveur principal (GUILD_ID), outils en ligne de commande
+#   data/guilds/<id>/      partition d'un autre serveur, même disposition que data/
+#
+# La partition active suit la tâche asyncio (contextvar posé par l'arbre des commandes) et le
+# thread du registre (ledger_service copie le contexte). Les objets propres à une partition
+# (repository, index, séquence, stats) sont créés à leur premier accès via scoped().
+
+GUILDS_DIR = "guilds"
+
+_current = contextvars.ContextVar("compta_partition", default=None)
+_primary_guild_id = None
+
+class Partition:
+    """État résident d'un registre : objets créés par scoped(), date de dernière utilisation."""
+
+    def __init__(self, key):
+        self.key = key          # None = partition racine, sinon ID du serveur
+        self.opened = False     # préparée par le thread du registre (voir ledger_service)
+        self.last_used = time.monotonic()
+        self._objects = {}      # fabrique -> objet
+        self._lock = threading.RLock()  # une fabrique peut demander un autre objet (index -> repository)
+
+    @property
+    def subdir(self):
+        return None if self.key is None else os.path.join(GUILDS_DIR, str(self.key))
+
+    def get(self, factory):
+        obj = self._objects.get(factory)
+        if obj is None:
+            with self._lock:
+                obj = self._objects.get(factory)
+                if obj is None:
+                    obj = self._objects[factory] = factory()
+        return obj
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+_partitions = {}  # clé -> Partition résidente
+_registry_lock = threading.Lock()
+
+# SÉLECTION
+def configure(primary_guild_id):
+    """Serveur principal : son registre reste dans data/ (pas de migration au passage en multi-serveur)."""
+    global _primary_guild_id
+    _primary_guild_id = primary_guild_id
+
+def key_for(guild_id):
+    if not config.PARTITION_BY_GUILD or guild_id is None or guild_id == _primary_guild_id:
+        return None
+    return int(guild_id)
+
+def use(guild_id):
+    """Active la partition de `guild_id` pour la tâche (ou le contexte) en cours."""
+    return _current.set(key_for(guild_id))
+
+def select(guild_id):
+    """Sélectionne explicitement le registre d'un serveur (outils en ligne de commande, --guild)."""
+    return _current.set(None if guild_id is None or guild_id == _primary_guild_id else int(guild_id))
+
+@contextmanager
+def using(guild_id):
+    token = use(guild_id)
+    try:
+        yield current()
+    finally:
+        _current.reset(token)
+
+def current():
+    key = _current.get()
+    partition = _partitions.get(key)
+    if partition is None:
+        with _registry_lock:
+            partition = _partitions.setdefault(key, Partition(key))
+    return partition
+
+def scoped(factory):
+    """Accesseur get_x() d'un objet propre à chaque partition, créé au premier appel."""
+    def get():
+        return current().get(factory)
+    return get
+
+# RÉSIDENCE
+def resident():
+    return list(_partitions.values())
+
+def idle(idle_seconds, max_resident, keep=()):
+    """Partitions à évincer : inutilisées depuis `idle_seconds`, puis les plus anciennes au-delà
+    de `max_resident` ; jamais celles de `keep` (clés)."""
+    candidates = sorted((p for p in _partitions.values() if p.key not in keep), key=lambda p: p.last_used)
+    limit = time.monotonic() - idle_seconds if idle_seconds else None
+    excess = len(_partitions) - max_resident if max_resident else 0
+    result = []
+    for partition in candidates:
+        if excess > 0 or (limit is not None and partition.last_used < limit):
+            result.append(partition)
+            excess -= 1
+    return result
+
+def drop(key):
+    with _registry_lock:
+        _partitions.pop(key, None)
+
+def summary():
+    now = time.monotonic()
+    return [
+        {"guild_id": p.key, "opened": p.opened, "idle_seconds": round(now - p.last_used)}
+        for p in sorted(_partitions.values(), key=lambda p: p.last_used, reverse=True)
+    ]
@@ -0,0 +1,181 @@
+# reminders.py
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta
+
+import discord
+
+import storage
+from age_index import get_age_index
+from ledger_service import get_ledger
+from repository import get_repository
+from settlement import outstanding_parts
+from user_index import get_user_index
+
+REMINDERS_FILE = "reminders.json"  # user_id -> prochaine relance (timestamp epoch)
+
+# DETTES EN RETARD (exécuté dans le thread du registre)
+def _cutoff(age_days):
+    return (datetime.utcnow() - timedelta(days=age_days)).isoformat()
+
+def overdue_debtors(age_days):
+    """Débiteurs ayant au moins une part impayée sur un ticket créé il y a plus de age_days jours."""
+    debtors = set()
+    for _, ticket in get_age_index().created_before(_cutoff(age_days)):
+        for uid, share in outstanding_parts(ticket):
+            if share > 0 and uid != ticket["crediteur_id"]:
+                debtors.add(uid)
+    return debtors
+
+def overdue_debts(user_id, age_days):
+    """[(ticket_id, ticket, part restante)] des dettes en retard d'un débiteur, plus anciennes d'abord."""
+    cutoff = _cutoff(age_days)
+    tickets = get_repository().tickets
+    debts = []
+    for date, tid in get_user_index().open_entries(user_id):
+        if date >= cutoff:
+            break
+        ticket = tickets[tid]
+        if ticket["crediteur_id"] == user_id:
+            continue
+        share = dict(outstanding_parts(ticket)).get(user_id, 0)
+        if share > 0:
+            debts.append((tid, ticket, share))
+    return debts
+
+def _save(changes, saved):
+    # Une seule écriture par lot de relances (None = plus rien à relancer)
+    puts = {uid: due for uid, due in changes.items() if due is not None}
+    if puts:
+        storage.put_records(REMINDERS_FILE, puts, current=saved)
+        saved.update(puts)
+    for uid, due in changes.items():
+        if due is None and uid in saved:
+            storage.delete_record(REMINDERS_FILE, uid, current=saved)
+            saved.pop(uid, None)
+
+# PLANIFICATION
+class ReminderScheduler:
+    """Relances par DM des débiteurs en retard, une par débiteur et par intervalle.
+
+    Les échéances forment un tas (due, user_id) persisté dans reminders.json et restauré
+    au redémarrage. Les DM passent par une file à débit limité : un envoi toutes les
+    `spacing` secondes, pause de la durée demandée par Discord sur un 429.
+    `send(user_id, debts)` est fourni par le bot (construction et envoi du DM).
+    """
+
+    def __init__(self, send, age_days, interval_days, spacing=1.0, scan_every=3600, batch=50):
+        self.send = send
+        self.age_days = age_days
+        self.interval = interval_days * 86400
+        self.spacing = spacing
+        self.scan_every = scan_every
+        self.batch = batch
+        self._heap = []       # (due, user_id), entrées périmées ignorées au dépilage
+        self._due = {}        # user_id -> échéance courante
+        self._saved = {}      # contenu de reminders.json (écrit dans le thread du registre)
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._next_send = 0.0
+        self.sent = 0
+        self.rate_limited = 0
+
+    async def start(self):
+        if self._tasks:
+            return  # on_ready peut être rappelé après une reconnexion
+        self._saved = await get_ledger().run(storage.load_json, REMINDERS_FILE)
+        for uid, due in self._saved.items():
+            self._schedule(uid, due)
+        self._tasks = [
+            asyncio.create_task(self._timer()),
+            asyncio.create_task(self._sender()),
+        ]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def _schedule(self, user_id, due):
+        self._due[user_id] = due
+        heapq.heappush(self._heap, (due, user_id))
+        self._wakeup.set()
+
+    # MINUTERIE
+    async def _scan(self):
+        debtors = await get_ledger().run(overdue_debtors, self.age_days)
+        now = time.time()
+        for uid in debtors:
+            if uid not in self._due:
+                self._schedule(uid, now)
+
+    async def _timer(self):
+        next_scan = 0.0
+        while True:
+            now = time.time()
+            if now >= next_scan:
+                await self._scan()
+                next_scan = now + self.scan_every
+
+            while self._heap and self._heap[0][0] <= now:
+                due, uid = heapq.heappop(self._heap)
+                if self._due.get(uid) == due:
+                    self._queue.put_nowait(uid)
+
+            wait = next_scan - now
+            if self._heap:
+                wait = min(wait, self._heap[0][0] - now)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    # ENVOI
+    async def _sender(self):
+        changes = {}
+        while True:
+            uid = await self._queue.get()
+            debts = await get_ledger().run(overdue_debts, uid, self.age_days)
+            if debts:
+                if await self._deliver(uid, debts):
+                    due = time.time() + self.interval
+                else:
+                    # 429 persistants : nouvel essai dès la fin de la pause demandée par Discord
+                    due = time.time() + max(self._next_send - time.monotonic(), self.spacing)
+                self._schedule(uid, due)
+                changes[uid] = due
+            else:
+                # Plus de dette en retard : le prochain scan le replanifiera si besoin
+                self._due.pop(uid, None)
+                changes[uid] = None
+
+            if len(changes) >= self.batch or self._queue.empty():
+                await get_ledger().run(_save, changes, self._saved)
+                changes = {}
+
+    async def _deliver(self, user_id, debts):
+        """True si la relance est traitée (envoyée, ou DM impossible), False si abandonnée sur 429."""
+        for _ in range(5):
+            delay = self._next_send - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_send = time.monotonic() + self.spacing
+            try:
+                await self.send(user_id, debts)
+                self.sent += 1
+                return True
+            except discord.RateLimited as e:
+                retry_after = e.retry_after
+            except discord.HTTPException as e:
+                if e.status != 429:
+                    # DM fermés ou utilisateur introuvable : relance suivante à l'intervalle normal
+                    return True
+                headers = getattr(e.response, "headers", None) or {}
+                retry_after = float(headers.get("Retry-After", 5))
+            self.rate_limited += 1
+            # Toute la file attend : le bucket DM est partagé par tous les envois
+            self._next_send = time.monotonic() + retry_after
+        return False
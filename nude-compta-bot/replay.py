@@ -0,0 +1,284 @@
+# replay.py
+# Reconstruction de l'état depuis events.log et contrôle de cohérence
+# Usage : python replay.py verify [--full]
+#         python replay.py rebuild --output data/rebuild [--apply]
+#         python replay.py prune
+import argparse
+import copy
+import json
+import os
+import sys
+
+import config
+import event_segments
+import partitions
+import storage
+from repository import get_repository
+from ticket_model import to_json
+
+CHECKPOINT_FILE = "replay_checkpoint.json"
+# État rejoué jusqu'au premier segment conservé : point de départ des replays complets après une purge
+BASE_FILE = "replay_base.json"
+
+# Champs comparés (les dates manquent dans les anciens événements)
+COMPARED_KEYS = ("type", "createur_id", "debiteurs", "crediteur_id", "motif", "montant_total", "reste_du")
+
+class Replayer:
+    """Rejoue events.log en flux : seuls les tickets ouverts sont gardés en mémoire.
+
+    Chaque ticket clos est passé à `on_close(ticket_id, ticket)` puis oublié.
+    """
+
+    def __init__(self, on_close=None, checkpoint=None):
+        self.on_close = on_close or (lambda tid, ticket: None)
+        checkpoint = checkpoint or {}
+        self.position = checkpoint.get("position", 0)
+        self.open = checkpoint.get("open", {})
+        self.closed = checkpoint.get("closed", 0)
+        self.events = checkpoint.get("events", 0)
+        self.incomplete = checkpoint.get("incomplete", 0)
+        self.divergences = []
+
+    def checkpoint(self):
+        return {
+            "position": self.position,
+            "open": self.open,
+            "closed": self.closed,
+            "events": self.events,
+            "incomplete": self.incomplete,
+        }
+
+    def _stored(self, ticket_id):
+        # Anciens CREATE sans débiteurs : le ticket stocké sert de base
+        repo = get_repository()
+        ticket = repo.tickets.get(ticket_id) or repo.archives.get(ticket_id)
+        if ticket is None:
+            return None
+        ticket = {k: v for k, v in copy.deepcopy(dict(ticket)).items() if k != "date_cloture"}
+        ticket["reste_du"] = ticket["montant_total"]
+        return ticket
+
+    def apply(self, event):
+        kind, tid = event.get("event"), event.get("ticket_id")
+        self.events += 1
+
+        if kind == "CREATE":
+            if tid in self.open:
+                self.divergences.append(f"{tid} : CREATE d'un ticket déjà ouvert")
+            if "debiteurs" in event:
+                self.open[tid] = {
+                    "type": event["type"],
+                    "createur_id": event["auteur_id"],
+                    "debiteurs": event["debiteurs"],
+                    "crediteur_id": event["crediteur_id"],
+                    "motif": event["motif"],
+                    "montant_total": event["montant"],
+                    "reste_du": event["montant"],
+                    "date_creation": event["date_creation"],
+                }
+            else:
+                self.incomplete += 1
+                ticket = self._stored(tid)
+                if ticket is None:
+                    self.divergences.append(f"{tid} : CREATE sans détail et ticket introuvable")
+                else:
+                    self.open[tid] = ticket
+
+        elif kind == "REMBOURSE":
+            ticket = self.open.get(tid)
+            if ticket is None:
+                self.divergences.append(f"{tid} : REMBOURSE sur un ticket non ouvert")
+            else:
+                ticket["reste_du"] -= event["montant"]
+                if ticket["reste_du"] < 0:
+                    self.divergences.append(f"{tid} : reste_du négatif après remboursement")
+
+        elif kind == "CLOSE":
+            ticket = self.open.pop(tid, None)
+            if ticket is None:
+                self.divergences.append(f"{tid} : CLOSE sur un ticket non ouvert")
+            else:
+                ticket["date_cloture"] = event.get("date_cloture", event.get("timestamp"))
+                self.closed += 1
+                self.on_close(tid, ticket)
+
+    def run(self, until=None):
+        """Rejoue jusqu'à la fin du journal (ou jusqu'à la position `until`)."""
+        # Journal tronqué ou remplacé depuis le checkpoint : on repart du début conservé
+        if self.position > storage.events_size():
+            self.__init__(self.on_close, _base())
+        for position, event in storage.iter_events_from(self.position):
+            if until is not None and position > until:
+                break
+            self.apply(event)
+            self.position = position
+        return self
+
+def _base():
+    # Segments purgés : on repart de l'état sauvegardé à la purge, pas de la position 0
+    return storage.load_json(BASE_FILE) or None
+
+# COMPARAISON
+def _diff(tid, replayed, stored, where):
+    if stored is None:
+        return [f"{tid} : absent des {where}"]
+    return [
+        f"{tid} : {key} {stored.get(key)!r} dans les {where}, {replayed.get(key)!r} d'après events.log"
+        for key in COMPARED_KEYS
+        if replayed.get(key) != stored.get(key)
+    ]
+
+def verify(full=False):
+    """Rejoue la queue de events.log depuis le dernier checkpoint et renvoie les écarts."""
+    repo = get_repository()
+    checkpoint = None if full else storage.load_json(CHECKPOINT_FILE) or None
+    if checkpoint is None:
+        checkpoint = _base()
+
+    divergences = []
+
+    def check_archive(tid, ticket):
+        divergences.extend(_diff(tid, ticket, repo.archives.get(tid), "archives"))
+
+    replayer = Replayer(check_archive, checkpoint).run()
+    divergences.extend(replayer.divergences)
+
+    tickets = repo.tickets
+    for tid, ticket in replayer.open.items():
+        divergences.extend(_diff(tid, ticket, tickets.get(tid), "tickets ouverts"))
+    for tid in tickets:
+        if tid not in replayer.open:
+            divergences.append(f"{tid} : ouvert sans CREATE dans events.log")
+
+    if not divergences:
+        # Checkpoint seulement sur un état cohérent : les écarts restent signalés au prochain lancement
+        storage.save_json(CHECKPOINT_FILE, replayer.checkpoint())
+    return replayer, divergences
+
+def startup_check():
+    replayer, divergences = verify()
+    if divergences:
+        print(f"⚠️  events.log diverge de l'état stocké ({len(divergences)} écarts) :")
+        for d in divergences[:20]:
+            print(f"   {d}")
+        if len(divergences) > 20:
+            print(f"   … et {len(divergences) - 20} autres (python replay.py verify)")
+    else:
+        print(f"Registre cohérent avec events.log ({replayer.events} événements, {len(replayer.open)} tickets ouverts)")
+        # Purge seulement sur un état cohérent : le checkpoint qui la borne vient d'être écrit
+        dropped = apply_retention()
+        if dropped:
+            print(f"{dropped} segments de events.log supprimés (rétention)")
+
+# RECONSTRUCTION
+def rebuild(output_dir):
+    """Régénère tickets.json et archives.json dans output_dir, archives écrites au fil de l'eau."""
+    os.makedirs(output_dir, exist_ok=True)
+    archives_path = os.path.join(output_dir, "archives.json")
+
+    with open(archives_path + ".tmp", "w", encoding="utf-8") as out:
+        out.write("{")
+        first = [True]
+
+        def write_archive(tid, ticket):
+            out.write(("\n" if first[0] else ",\n") + f"  {json.dumps(tid)}: " + json.dumps(ticket, ensure_ascii=False, default=to_json))
+            first[0] = False
+
+        closed = set()
+
+        def on_close(tid, ticket):
+            closed.add(tid)
+            write_archive(tid, ticket)
+
+        base = _base()
+        replayer = Replayer(on_close, base).run()
+        if base is not None:
+            # Tickets clos dans les segments purgés : repris tels quels des archives
+            for tid, ticket in get_repository().archives.items():
+                if tid not in closed and tid not in replayer.open:
+                    write_archive(tid, ticket)
+        out.write("\n}\n")
+    os.replace(archives_path + ".tmp", archives_path)
+
+    tickets_path = os.path.join(output_dir, "tickets.json")
+    with open(tickets_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(replayer.open, f, indent=2, ensure_ascii=False)
+    os.replace(tickets_path + ".tmp", tickets_path)
+    return replayer
+
+def apply_rebuild(output_dir):
+    """Remplace l'état courant par celui reconstruit."""
+    for name in ("tickets.json", "archives.json"):
+        with open(os.path.join(output_dir, name), "r", encoding="utf-8") as f:
+            storage.save_json(name, json.load(f))
+    get_repository().invalidate()
+
+# RÉTENTION
+def apply_retention(retention_days=None, retention_segments=None):
+    """Supprime les segments de events.log hors de la politique de rétention.
+
+    Seuls les segments déjà couverts par le checkpoint sont supprimés ; l'état rejoué jusqu'au
+    premier segment conservé est enregistré dans replay_base.json pour les replays complets.
+    Renvoie le nombre de segments supprimés.
+    """
+    if retention_days is None:
+        retention_days = config.EVENTS_RETENTION_DAYS
+    if retention_segments is None:
+        retention_segments = config.EVENTS_RETENTION_SEGMENTS
+    if config.STORAGE_BACKEND == "sqlite" or not (retention_days or retention_segments):
+        return 0
+
+    segments = event_segments.get_segments(storage.data_dir())
+    checkpoint = storage.load_json(CHECKPOINT_FILE)
+    limit = checkpoint.get("position", 0)
+    expired = [
+        s for s in segments.expired(retention_days, retention_segments)
+        if s["start"] + s["size"] <= limit
+    ]
+    if not expired:
+        return 0
+
+    upto = expired[-1]["start"] + expired[-1]["size"]
+    replayer = Replayer(checkpoint=_base()).run(until=upto)
+    storage.save_json(BASE_FILE, replayer.checkpoint())
+    return segments.drop_until(upto)
+
+# CLI
+def main():
+    parser = argparse.ArgumentParser(description="Rejoue events.log : contrôle ou reconstruction du registre")
+    parser.add_argument("--guild", type=int, help="registre d'un autre serveur (data/guilds/<id>/)")
+    sub = parser.add_subparsers(dest="action", required=True)
+    p_verify = sub.add_parser("verify", help="comparer events.log à l'état stocké")
+    p_verify.add_argument("--full", action="store_true", help="ignorer le checkpoint et tout rejouer")
+    p_rebuild = sub.add_parser("rebuild", help="régénérer tickets.json et archives.json")
+    p_rebuild.add_argument("--output", required=True, help="dossier de sortie")
+    p_rebuild.add_argument("--apply", action="store_true", help="remplacer l'état courant par la reconstruction")
+    sub.add_parser("prune", help="appliquer la politique de rétention des segments de events.log")
+    args = parser.parse_args()
+    partitions.select(args.guild)
+
+    if args.action == "prune":
+        print(f"✅ {apply_retention()} segments supprimés")
+        return
+
+    if args.action == "verify":
+        replayer, divergences = verify(full=args.full)
+        print(f"{replayer.events} événements rejoués, {replayer.incomplete} CREATE sans détail")
+        for d in divergences:
+            print(f"   {d}")
+        print("✅ Cohérent" if not divergences else f"❌ {len(divergences)} écarts")
+        sys.exit(1 if divergences else 0)
+
+    replayer = rebuild(args.output)
+    print(f"✅ {len(replayer.open)} tickets ouverts et {replayer.closed} archives régénérés dans {args.output}")
+    for d in replayer.divergences:
+        print(f"   ⚠️  {d}")
+    if args.apply:
+        if config.ARCHIVE_LAYOUT == "segments":
+            print("❌ --apply n'est pas pris en charge avec les archives en segments")
+            sys.exit(1)
+        apply_rebuild(args.output)
+        print("   État courant remplacé")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# repository.py
+import os
+
+import config
+import partitions
+import storage
+from archive_segments import SegmentArchiveStore
+from ticket_model import compact, compact_all
+
+TICKETS_FILE = "tickets.json"
+ARCHIVES_FILE = "archives.json"
+
+class TicketRepository:
+    """Tickets et archives gardés en mémoire, rechargés seulement si le fichier change sur disque"""
+
+    def __init__(self):
+        self._data = {}        # filename -> dict parsé
+        self._signatures = {}  # filename -> signature disque au moment du chargement
+        self._listeners = []   # index maintenus à chaque mutation (voir subscribe)
+        self._segments = None  # SegmentArchiveStore si COMPTA_ARCHIVE_LAYOUT=segments
+
+    def _get(self, filename):
+        signature = storage.file_signature(filename)
+        if filename not in self._data or signature != self._signatures.get(filename):
+            # Premier accès ou modification externe (édition manuelle, autre processus)
+            data = storage.load_json(filename)
+            if filename in (TICKETS_FILE, ARCHIVES_FILE):
+                # Tickets résidents en représentation compacte (ticket_model.py)
+                compact_all(data)
+            self._data[filename] = data
+            self._signatures[filename] = signature
+            for listener in self._listeners:
+                listener.on_reset(filename, self._data[filename])
+        return self._data[filename]
+
+    # INDEX
+    def subscribe(self, listener):
+        """Enregistre un index : on_reset(filename, data) au (re)chargement d'un fichier,
+        on_ticket_changed(ticket_id, old, new) et on_archived(ticket_id, ticket) à chaque mutation."""
+        self._listeners.append(listener)
+        for filename, data in self._data.items():
+            listener.on_reset(filename, data)
+
+    # LECTURE (les dicts renvoyés ne doivent pas être modifiés par l'appelant)
+    @property
+    def tickets(self):
+        return self._get(TICKETS_FILE)
+
+    def _segmented(self):
+        return config.ARCHIVE_LAYOUT == "segments" and config.STORAGE_BACKEND == "json"
+
+    def _segment_store(self):
+        if self._segments is None:
+            self._segments = SegmentArchiveStore(
+                os.path.join(storage.data_dir(), "archives"),
+                legacy_file=os.path.join(storage.data_dir(), ARCHIVES_FILE)
+            )
+        return self._segments
+
+    @property
+    def archives(self):
+        # En segments : objet dict-like chargé paresseusement, jamais l'historique complet
+        if self._segmented():
+            return self._segment_store()
+        return self._get(ARCHIVES_FILE)
+
+    def get_ticket(self, ticket_id):
+        return self.tickets.get(ticket_id)
+
+    # ÉCRITURE (write-through : le dict résident est passé au stockage, qui l'écrit)
+    def _write(self, write):
+        before = {f: storage.file_signature(f) for f in self._data}
+        try:
+            write()
+        except Exception:
+            # Mémoire et disque peuvent diverger : on repartira du disque
+            self.invalidate()
+            raise
+        # Notre propre écriture ne doit pas déclencher de rechargement
+        # (en sqlite tous les "fichiers" partagent la signature de la base)
+        for filename, signature in before.items():
+            if signature == self._signatures.get(filename):
+                self._signatures[filename] = storage.file_signature(filename)
+
+    def put_ticket(self, ticket_id, ticket):
+        tickets = self.tickets
+        old = tickets.get(ticket_id)
+        self._write(lambda: storage.put_record(TICKETS_FILE, ticket_id, ticket, current=tickets))
+        ticket = compact(ticket)
+        tickets[ticket_id] = ticket
+        for listener in self._listeners:
+            listener.on_ticket_changed(ticket_id, old, ticket)
+
+    def put_tickets(self, items):
+        """Ajoute plusieurs tickets en une seule écriture."""
+        tickets = self.tickets
+        olds = {tid: tickets.get(tid) for tid in items}
+        self._write(lambda: storage.put_records(TICKETS_FILE, items, current=tickets))
+        items = {tid: compact(t) for tid, t in items.items()}
+        tickets.update(items)
+        for ticket_id, ticket in items.items():
+            for listener in self._listeners:
+                listener.on_ticket_changed(ticket_id, olds[ticket_id], ticket)
+
+    def delete_ticket(self, ticket_id):
+        tickets = self.tickets
+        old = tickets.get(ticket_id)
+        self._write(lambda: storage.delete_record(TICKETS_FILE, ticket_id, current=tickets))
+        tickets.pop(ticket_id, None)
+        if old is not None:
+            for listener in self._listeners:
+                listener.on_ticket_changed(ticket_id, old, None)
+
+    def delete_tickets(self, ticket_ids):
+        """Retire plusieurs tickets en une seule écriture."""
+        tickets = self.tickets
+        olds = {tid: tickets[tid] for tid in ticket_ids if tid in tickets}
+        self._write(lambda: storage.delete_records(TICKETS_FILE, list(olds), current=tickets))
+        for ticket_id, old in olds.items():
+            tickets.pop(ticket_id, None)
+            for listener in self._listeners:
+                listener.on_ticket_changed(ticket_id, old, None)
+
+    def put_archive(self, ticket_id, ticket):
+        if self._segmented():
+            self._write(lambda: self._segment_store().put(ticket_id, ticket))
+        else:
+            archives = self.archives
+            self._write(lambda: storage.put_record(ARCHIVES_FILE, ticket_id, ticket, current=archives))
+            ticket = compact(ticket)
+            archives[ticket_id] = ticket
+        for listener in self._listeners:
+            listener.on_archived(ticket_id, ticket)
+
+    def put_archives(self, items):
+        """Archive plusieurs tickets en une seule écriture."""
+        if self._segmented():
+            self._write(lambda: self._segment_store().put_many(items))
+        else:
+            archives = self.archives
+            self._write(lambda: storage.put_records(ARCHIVES_FILE, items, current=archives))
+            items = {tid: compact(t) for tid, t in items.items()}
+            archives.update(items)
+        for ticket_id, ticket in items.items():
+            for listener in self._listeners:
+                listener.on_archived(ticket_id, ticket)
+
+    def invalidate(self):
+        """Force un rechargement complet au prochain accès."""
+        self._data.clear()
+        self._signatures.clear()
+        self._segments = None
+
+# Un repository par partition (registre du serveur de l'interaction en cours)
+get_repository = partitions.scoped(TicketRepository)
@@ -0,0 +1,59 @@
+# sequences.py
+import threading
+
+import partitions
+import storage
+from repository import get_repository
+
+SEQUENCES_FILE = "sequences.json"
+
+class TicketSequence:
+    """Dernier numéro attribué par préfixe, persisté dans sequences.json"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = None
+
+    def _load(self):
+        counters = storage.load_json(SEQUENCES_FILE)
+        if not counters:
+            # Premier lancement : amorcé une seule fois depuis les tickets existants
+            counters = self._seed()
+            storage.save_json(SEQUENCES_FILE, counters)
+        return counters
+
+    def _seed(self):
+        repo = get_repository()
+        counters = {}
+        for ids in (repo.tickets.keys(), repo.archives.keys()):
+            for tid in ids:
+                prefix, num = tid[:1], tid[1:]
+                if num.isdigit():
+                    counters[prefix] = max(counters.get(prefix, 0), int(num))
+        return counters
+
+    def next_id(self, prefix):
+        return self.reserve(prefix, 1)[0]
+
+    def reserve(self, prefix, count):
+        """Réserve `count` IDs consécutifs avec une seule écriture du compteur."""
+        # Verrou : deux interactions simultanées ne reçoivent jamais le même numéro
+        with self._lock:
+            if self._counters is None:
+                self._counters = self._load()
+
+            repo = get_repository()
+            ids = []
+            num = self._counters.get(prefix, 0)
+            while len(ids) < count:
+                num += 1
+                # Un ID ajouté à la main au-delà du compteur est sauté
+                tid = f"{prefix}{num:04d}"
+                if tid not in repo.tickets and tid not in repo.archives:
+                    ids.append(tid)
+
+            storage.put_record(SEQUENCES_FILE, prefix, num, current=self._counters)
+            self._counters[prefix] = num
+            return ids
+
+get_sequence = partitions.scoped(TicketSequence)
@@ -0,0 +1,112 @@
+# settlement.py
+import heapq
+
+from repository import get_repository
+from storage import log_events, transaction
+from utils import now_iso
+from ticket_model import debtor_parts
+
+# SOLDES NETS
+def outstanding_parts(ticket):
+    """Reste dû par débiteur : reste_du réparti au prorata des parts (centimes exacts)."""
+    total = ticket["montant_total"]
+    reste = ticket["reste_du"]
+    if total <= 0 or reste <= 0:
+        return []
+
+    shares = [(uid, part * reste // total) for uid, part in debtor_parts(ticket)]
+    # Les centimes perdus à l'arrondi vont aux premiers débiteurs (comme pour /split_ticket)
+    manque = reste - sum(s for _, s in shares)
+    result = []
+    for uid, share in shares:
+        if manque > 0:
+            share += 1
+            manque -= 1
+        result.append((uid, share))
+    return result
+
+def net_balances(tickets):
+    """{user_id: centimes} : positif = on lui doit, négatif = il doit."""
+    net = {}
+    for ticket in tickets.values():
+        crediteur = ticket["crediteur_id"]
+        for uid, share in outstanding_parts(ticket):
+            if uid == crediteur or share == 0:
+                continue
+            net[uid] = net.get(uid, 0) - share
+            net[crediteur] = net.get(crediteur, 0) + share
+    return net
+
+# SIMPLIFICATION
+def simplify(net):
+    """Liste de virements (debiteur, crediteur, centimes) soldant tous les comptes.
+
+    Glouton sur deux tas : le plus gros débiteur paie le plus gros créditeur, le reste
+    repart dans son tas. Au plus n-1 virements, O(n log n).
+    """
+    debiteurs = [(amount, uid) for uid, amount in net.items() if amount < 0]
+    crediteurs = [(-amount, uid) for uid, amount in net.items() if amount > 0]
+    heapq.heapify(debiteurs)
+    heapq.heapify(crediteurs)
+
+    transfers = []
+    while debiteurs and crediteurs:
+        dette, debiteur = heapq.heappop(debiteurs)
+        creance, crediteur = heapq.heappop(crediteurs)
+        montant = min(-dette, -creance)
+        transfers.append((debiteur, crediteur, montant))
+        if dette + montant < 0:
+            heapq.heappush(debiteurs, (dette + montant, debiteur))
+        if creance + montant < 0:
+            heapq.heappush(crediteurs, (creance + montant, crediteur))
+    return transfers
+
+def settlement_plan():
+    return simplify(net_balances(get_repository().tickets))
+
+# APPLICATION
+def apply_settlement(auteur_id):
+    """Solde tous les tickets ouverts une fois le plan payé, renvoie le plan appliqué.
+
+    Tout est calculé en mémoire puis écrit en une fois : archives, tickets, événements
+    (mêmes REMBOURSE et CLOSE que rembourse() ticket par ticket, puis SETTLE).
+    """
+    repo = get_repository()
+    plan = simplify(net_balances(repo.tickets))
+
+    timestamp = now_iso()
+    soldes = {}
+    events = []
+    for ticket_id, ticket in repo.tickets.items():
+        if ticket["reste_du"] <= 0:
+            continue
+        soldes[ticket_id] = dict(ticket, reste_du=0, date_cloture=timestamp)
+        events.append({
+            "timestamp": timestamp,
+            "event": "REMBOURSE",
+            "ticket_id": ticket_id,
+            "montant": ticket["reste_du"],
+            "auteur_id": auteur_id
+        })
+        events.append({
+            "timestamp": timestamp,
+            "event": "CLOSE",
+            "ticket_id": ticket_id,
+            "date_cloture": timestamp,
+            "auteur_id": auteur_id
+        })
+    events.append({
+        "timestamp": timestamp,
+        "event": "SETTLE",
+        "auteur_id": auteur_id,
+        "virements": [{"debiteur_id": d, "crediteur_id": c, "montant": m} for d, c, m in plan]
+    })
+
+    # Archivés avant d'être retirés (comme close_ticket) : un crash entre les deux écritures
+    # laisse des doublons, pas de perte ; en sqlite tout est dans la même transaction
+    with transaction():
+        if soldes:
+            repo.put_archives(soldes)
+            repo.delete_tickets(list(soldes))
+        log_events(events)
+    return plan
@@ -0,0 +1,208 @@
+# snapshot_codecs.py
+import json
+import struct
+from collections.abc import Mapping
+
+from ticket_model import to_json
+
+# Formats des snapshots data/*.json (backend json) ; le nom du fichier ne change pas, le format
+# est reconnu à la lecture : on peut changer COMPTA_STORAGE_CODEC sans migration, chaque fichier
+# passe au nouveau format à sa prochaine réécriture.
+#
+#   json-pretty : JSON indenté, lisible et diffable (comportement historique)
+#   json-compact: même JSON sans espaces
+#   jsonl       : une ligne d'en-tête puis une ligne [clé, valeur] par ticket
+#   binary      : encodage binaire balisé avec table des chaînes (IDs et clés stockés une fois)
+
+JSONL_HEADER = b'{"codec": "jsonl", "version": 1}\n'
+BINARY_MAGIC = b"NCBF\x01"
+
+class CodecError(ValueError):
+    pass
+
+# JSON
+class JsonCodec:
+    def __init__(self, name, **options):
+        self.name = name
+        self.options = options
+
+    def encode(self, data):
+        return json.dumps(data, ensure_ascii=False, default=to_json, **self.options).encode("utf-8")
+
+    def decode(self, raw):
+        return json.loads(raw)
+
+# JSON LINES
+class JsonLinesCodec:
+    name = "jsonl"
+
+    def encode(self, data):
+        lines = [JSONL_HEADER]
+        for key, value in data.items():
+            line = json.dumps([key, value], ensure_ascii=False, separators=(",", ":"), default=to_json)
+            lines.append(line.encode("utf-8") + b"\n")
+        return b"".join(lines)
+
+    def decode(self, raw):
+        data = {}
+        for line in raw[len(JSONL_HEADER):].splitlines():
+            if line.strip():
+                key, value = json.loads(line)
+                data[key] = value
+        return data
+
+# BINAIRE
+# Valeur = une balise d'un octet puis son contenu ; entiers et longueurs en varint (zigzag pour
+# les entiers signés) ; chaque chaîne (clé, ID utilisateur, motif...) n'est écrite qu'une fois
+# dans la table placée avant les valeurs, puis référencée par son numéro.
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _LIST, _DICT = range(8)
+_DOUBLE = struct.Struct("<d")
+
+def _varint(out, n):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _read_varint(raw, pos):
+    n = shift = 0
+    while True:
+        byte = raw[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+class BinaryCodec:
+    name = "binary"
+
+    def encode(self, data):
+        strings = {}
+        body = bytearray()
+
+        def ref(s):
+            index = strings.get(s)
+            if index is None:
+                index = strings[s] = len(strings)
+            _varint(body, index)
+
+        def write(value):
+            kind = type(value)
+            if kind is str:
+                body.append(_STR)
+                ref(value)
+            elif kind is int:
+                body.append(_INT)
+                _varint(body, value << 1 if value >= 0 else (-value << 1) - 1)
+            elif value is None:
+                body.append(_NONE)
+            elif kind is bool:
+                body.append(_TRUE if value else _FALSE)
+            elif kind is float:
+                body.append(_FLOAT)
+                body.extend(_DOUBLE.pack(value))
+            elif isinstance(value, Mapping):
+                body.append(_DICT)
+                _varint(body, len(value))
+                for key, item in value.items():
+                    if type(key) is not str:
+                        raise CodecError(f"clé non textuelle : {key!r}")
+                    ref(key)
+                    write(item)
+            elif isinstance(value, (list, tuple)):
+                body.append(_LIST)
+                _varint(body, len(value))
+                for item in value:
+                    write(item)
+            else:
+                raise CodecError(f"type non encodable : {kind.__name__}")
+
+        write(data)
+        out = bytearray(BINARY_MAGIC)
+        _varint(out, len(strings))
+        for s in strings:
+            encoded = s.encode("utf-8")
+            _varint(out, len(encoded))
+            out += encoded
+        return bytes(out + body)
+
+    def decode(self, raw):
+        raw = memoryview(raw)
+        pos = len(BINARY_MAGIC)
+        count, pos = _read_varint(raw, pos)
+        strings = []
+        for _ in range(count):
+            size, pos = _read_varint(raw, pos)
+            strings.append(str(raw[pos:pos + size], "utf-8"))
+            pos += size
+
+        def read(pos):
+            tag = raw[pos]
+            pos += 1
+            if tag == _STR:
+                index, pos = _read_varint(raw, pos)
+                return strings[index], pos
+            if tag == _INT:
+                n, pos = _read_varint(raw, pos)
+                return (n >> 1) ^ -(n & 1), pos
+            if tag == _DICT:
+                size, pos = _read_varint(raw, pos)
+                value = {}
+                for _ in range(size):
+                    index, pos = _read_varint(raw, pos)
+                    value[strings[index]], pos = read(pos)
+                return value, pos
+            if tag == _LIST:
+                size, pos = _read_varint(raw, pos)
+                value = []
+                for _ in range(size):
+                    item, pos = read(pos)
+                    value.append(item)
+                return value, pos
+            if tag == _NONE:
+                return None, pos
+            if tag in (_FALSE, _TRUE):
+                return tag == _TRUE, pos
+            if tag == _FLOAT:
+                return _DOUBLE.unpack_from(raw, pos)[0], pos + 8
+            raise CodecError(f"balise inconnue {tag} à l'octet {pos - 1}")
+
+        value, pos = read(pos)
+        if pos != len(raw):
+            raise CodecError("octets en trop après la valeur racine")
+        return value
+
+# REGISTRE
+CODECS = {
+    codec.name: codec for codec in (
+        JsonCodec("json-pretty", indent=2),
+        JsonCodec("json-compact", separators=(",", ":")),
+        JsonLinesCodec(),
+        BinaryCodec(),
+    )
+}
+DEFAULT = "json-pretty"
+
+def get_codec(name):
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise CodecError(f"codec inconnu : {name!r} (disponibles : {', '.join(CODECS)})") from None
+
+def detect(raw):
+    """Codec d'un contenu lu sur disque, reconnu à ses premiers octets."""
+    if raw.startswith(BINARY_MAGIC):
+        return CODECS["binary"]
+    if raw.startswith(JSONL_HEADER):
+        return CODECS["jsonl"]
+    # Pretty et compact se lisent pareil
+    return CODECS[DEFAULT]
+
+def encode(data, name=DEFAULT):
+    return get_codec(name).encode(data)
+
+def decode(raw):
+    if not raw or raw.isspace():
+        return {}
+    return detect(raw).decode(raw)
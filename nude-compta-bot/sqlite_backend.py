@@ -0,0 +1,311 @@
+# sqlite_backend.py
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import config
+import storage
+
+# Fichiers de données -> tables (les autres fichiers vont dans la table générique "documents")
+TABLES = {
+    "tickets.json": ("tickets", "ticket_parts"),
+    "archives.json": ("archives", "archive_parts"),
+}
+
+# Colonnes dédiées, dans l'ordre des clés du JSON historique
+COLUMNS = (
+    "type", "createur_id", "crediteur_id", "motif",
+    "montant_total", "reste_du", "date_creation", "date_cloture"
+)
+KEY_ORDER = (
+    "type", "createur_id", "debiteurs", "crediteur_id", "motif",
+    "montant_total", "reste_du", "date_creation", "date_cloture"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    ticket_id TEXT PRIMARY KEY,
+    type TEXT,
+    createur_id TEXT,
+    crediteur_id TEXT,
+    motif TEXT,
+    montant_total INTEGER,
+    reste_du INTEGER,
+    date_creation TEXT,
+    date_cloture TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS {parts} (
+    ticket_id TEXT NOT NULL REFERENCES {table}(ticket_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    part INTEGER NOT NULL,
+    PRIMARY KEY (ticket_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_{table}_crediteur ON {table}(crediteur_id);
+CREATE INDEX IF NOT EXISTS idx_{table}_type ON {table}(type);
+CREATE INDEX IF NOT EXISTS idx_{table}_date ON {table}(date_creation);
+CREATE INDEX IF NOT EXISTS idx_{parts}_user ON {parts}(user_id);
+"""
+
+SCHEMA_COMMON = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    event TEXT,
+    ticket_id TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_ticket ON events(ticket_id);
+CREATE TABLE IF NOT EXISTS documents (
+    filename TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (filename, key)
+);
+CREATE TABLE IF NOT EXISTS versions (
+    filename TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+_conns = {}  # chemin de la base -> connexion (une base par registre / serveur)
+_lock = threading.RLock()
+_depth = 0  # profondeur de transaction() en cours
+
+def db_path():
+    # COMPTA_SQLITE_PATH ne vaut que pour le registre racine : chaque serveur a sa propre base
+    if config.SQLITE_PATH and storage.data_dir() == storage.DATA_DIR:
+        return config.SQLITE_PATH
+    return os.path.join(storage.data_dir(), "compta.db")
+
+def _connect():
+    path = db_path()
+    conn = _conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Partagée entre threads (exécuteur du bot), protégée par _lock
+        conn = _conns[path] = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        script = SCHEMA_COMMON
+        for table, parts in TABLES.values():
+            script += SCHEMA.format(table=table, parts=parts)
+        conn.executescript(script)
+    return conn
+
+def close():
+    """Ferme la base du registre actif."""
+    with _lock:
+        conn = _conns.pop(db_path(), None)
+        if conn is not None:
+            conn.close()
+
+def close_all():
+    with _lock:
+        for conn in _conns.values():
+            conn.close()
+        _conns.clear()
+
+@contextmanager
+def transaction():
+    """Regroupe plusieurs écritures dans une seule transaction (imbrication autorisée)."""
+    global _depth
+    with _lock:
+        conn = _connect()
+        if _depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        _depth += 1
+        try:
+            yield conn
+        except BaseException:
+            _depth -= 1
+            if _depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        _depth -= 1
+        if _depth == 0:
+            conn.execute("COMMIT")
+
+def _bump(conn, filename):
+    """Nouvelle version d'un "fichier", dans la transaction de l'écriture qui le modifie."""
+    conn.execute(
+        "INSERT INTO versions (filename, version) VALUES (?, 1) "
+        "ON CONFLICT(filename) DO UPDATE SET version = version + 1",
+        (filename,)
+    )
+
+# CONVERSION LIGNE <-> TICKET
+def _row_to_ticket(row, parts):
+    ticket = {}
+    values = dict(zip(COLUMNS, row[1:1 + len(COLUMNS)]))
+    values["debiteurs"] = parts
+    for key in KEY_ORDER:
+        if key == "date_cloture" and values[key] is None:
+            continue
+        ticket[key] = values[key]
+    if row[-1]:
+        ticket.update(json.loads(row[-1]))
+    return ticket
+
+def _insert_ticket(conn, filename, ticket_id, ticket):
+    table, parts = TABLES[filename]
+    extra = {k: v for k, v in ticket.items() if k not in KEY_ORDER}
+    # Upsert : la ligne garde son rowid, donc sa place dans l'ordre d'insertion
+    conn.execute(
+        f"INSERT INTO {table} (ticket_id, {', '.join(COLUMNS)}, extra) "
+        f"VALUES (?, {', '.join('?' for _ in COLUMNS)}, ?) "
+        f"ON CONFLICT(ticket_id) DO UPDATE SET "
+        f"{', '.join(f'{c} = excluded.{c}' for c in COLUMNS)}, extra = excluded.extra",
+        (ticket_id, *(ticket.get(c) for c in COLUMNS),
+         json.dumps(extra, ensure_ascii=False) if extra else None)
+    )
+    conn.execute(f"DELETE FROM {parts} WHERE ticket_id = ?", (ticket_id,))
+    conn.executemany(
+        f"INSERT INTO {parts} (ticket_id, position, user_id, part) VALUES (?, ?, ?, ?)",
+        [(ticket_id, i, d["user_id"], d["part"]) for i, d in enumerate(ticket.get("debiteurs", []))]
+    )
+
+def _select(conn, filename, where="", params=()):
+    table, parts = TABLES[filename]
+    rows = conn.execute(
+        f"SELECT ticket_id, {', '.join(COLUMNS)}, extra FROM {table} {where} ORDER BY rowid",
+        params
+    ).fetchall()
+    if not rows:
+        return {}
+
+    debiteurs = {row[0]: [] for row in rows}
+    filtre = f"WHERE ticket_id IN (SELECT ticket_id FROM {table} {where})" if where else ""
+    part_rows = conn.execute(
+        f"SELECT ticket_id, user_id, part FROM {parts} {filtre} ORDER BY ticket_id, position",
+        params
+    )
+    for tid, user_id, part in part_rows:
+        debiteurs[tid].append({"user_id": user_id, "part": part})
+
+    return {row[0]: _row_to_ticket(row, debiteurs[row[0]]) for row in rows}
+
+# API (mêmes signatures que storage.py)
+def load_json(filename):
+    with _lock:
+        conn = _connect()
+        if filename in TABLES:
+            return _select(conn, filename)
+        rows = conn.execute(
+            "SELECT key, value FROM documents WHERE filename = ? ORDER BY rowid", (filename,)
+        )
+        return {key: json.loads(value) for key, value in rows}
+
+def save_json(filename, data):
+    with transaction() as conn:
+        if filename in TABLES:
+            table, _ = TABLES[filename]
+            conn.execute(f"DELETE FROM {table}")
+            for ticket_id, ticket in data.items():
+                _insert_ticket(conn, filename, ticket_id, ticket)
+        else:
+            conn.execute("DELETE FROM documents WHERE filename = ?", (filename,))
+            for key, value in data.items():
+                put_record(filename, key, value)
+        _bump(conn, filename)
+
+def put_record(filename, key, value):
+    with transaction() as conn:
+        _bump(conn, filename)
+        if filename in TABLES:
+            _insert_ticket(conn, filename, key, value)
+        else:
+            conn.execute(
+                "INSERT INTO documents (filename, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(filename, key) DO UPDATE SET value = excluded.value",
+                (filename, key, json.dumps(value, ensure_ascii=False))
+            )
+
+def delete_record(filename, key):
+    with transaction() as conn:
+        _bump(conn, filename)
+        if filename in TABLES:
+            table, _ = TABLES[filename]
+            conn.execute(f"DELETE FROM {table} WHERE ticket_id = ?", (key,))
+        else:
+            conn.execute("DELETE FROM documents WHERE filename = ? AND key = ?", (filename, key))
+
+def log_event(event):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO events (timestamp, event, ticket_id, payload) VALUES (?, ?, ?, ?)",
+            (event.get("timestamp"), event.get("event"), event.get("ticket_id"),
+             json.dumps(event, ensure_ascii=False))
+        )
+
+def iter_events(since=None, until=None, ticket_id=None):
+    clauses, params = [], []
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp <= ?")
+        params.append(until)
+    if ticket_id:
+        clauses.append("ticket_id = ?")
+        params.append(ticket_id)
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    # Connexion dédiée : le curseur reste ouvert pendant le parcours sans bloquer les écritures
+    conn = sqlite3.connect(db_path())
+    try:
+        for (payload,) in conn.execute(f"SELECT payload FROM events {where}ORDER BY id", params):
+            yield json.loads(payload)
+    finally:
+        conn.close()
+
+def iter_events_from(position=0):
+    conn = sqlite3.connect(db_path())
+    try:
+        for event_id, payload in conn.execute(
+            "SELECT id, payload FROM events WHERE id > ? ORDER BY id", (position,)
+        ):
+            yield event_id, json.loads(payload)
+    finally:
+        conn.close()
+
+def events_size():
+    with _lock:
+        return _connect().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+def file_signature(filename):
+    """Version propre au "fichier" (incrémentée par nos écritures, voir _bump), plus data_version
+    qui change à chaque écriture d'une autre connexion (autre processus, édition manuelle) :
+    un événement ou un compteur enregistré ne fait pas recharger les tickets."""
+    with _lock:
+        conn = _connect()
+        external = conn.execute("PRAGMA data_version").fetchone()[0]
+        row = conn.execute("SELECT version FROM versions WHERE filename = ?", (filename,)).fetchone()
+        return (db_path(), external, row[0] if row else 0)
+
+# REQUÊTES INDEXÉES
+def _filters(filename, user_id=None, crediteur_id=None, type_ticket=None, since=None):
+    """Clause WHERE de find_tickets (chaque critère servi par un index du SCHEMA) et ses paramètres."""
+    clauses, params = [], []
+    _, parts = TABLES[filename]
+    if user_id is not None:
+        clauses.append(f"(crediteur_id = ? OR ticket_id IN (SELECT ticket_id FROM {parts} WHERE user_id = ?))")
+        params += [user_id, user_id]
+    if crediteur_id is not None:
+        clauses.append("crediteur_id = ?")
+        params.append(crediteur_id)
+    if type_ticket is not None:
+        clauses.append("type = ?")
+        params.append(type_ticket)
+    if since is not None:
+        clauses.append("date_creation >= ?")
+        params.append(since)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+def find_tickets(filename, user_id=None, crediteur_id=None, type_ticket=None, since=None):
+    where, params = _filters(filename, user_id, crediteur_id, type_ticket, since)
+    with _lock:
+        return _select(_connect(), filename, where, params)
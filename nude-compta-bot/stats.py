@@ -0,0 +1,242 @@
+# stats.py
+from collections import Counter
+from datetime import datetime
+
+import partitions
+import storage
+from repository import get_repository, TICKETS_FILE, ARCHIVES_FILE
+from ticket_model import debtor_parts
+
+STATS_FILE = "stats.json"  # agrégats des archives : {"archives": nombre de tickets inclus, "rollup": {...}}
+
+def _seconds(debut, fin):
+    return (datetime.fromisoformat(fin) - datetime.fromisoformat(debut)).total_seconds()
+
+def _nonzero(value):
+    return any(value) if isinstance(value, list) else value != 0
+
+class Rollup:
+    """Agrégats additifs d'un ensemble de tickets : un ticket s'ajoute (sign=1) ou se retire (sign=-1)"""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.months = data.get("months", {})      # "AAAA-MM" -> [créés, volume créé, clôturés]
+        self.types = data.get("types", {})        # type -> [nombre, volume]
+        self.lent = data.get("lent", {})          # créditeur -> centimes prêtés (hors sa propre part)
+        self.borrowed = data.get("borrowed", {})  # débiteur -> centimes empruntés
+        self.repaid = data.get("repaid", 0)       # centimes remboursés
+        self.closed = data.get("closed", 0)       # tickets clôturés
+        self.close_seconds = data.get("close_seconds", 0.0)
+
+    def to_dict(self):
+        return {
+            "months": self.months, "types": self.types, "lent": self.lent, "borrowed": self.borrowed,
+            "repaid": self.repaid, "closed": self.closed, "close_seconds": self.close_seconds
+        }
+
+    def _month(self, month):
+        if month not in self.months:
+            self.months[month] = [0, 0, 0]
+        return self.months[month]
+
+    def apply(self, ticket, sign):
+        montant = ticket["montant_total"]
+        created = self._month(ticket["date_creation"][:7])
+        created[0] += sign
+        created[1] += sign * montant
+
+        by_type = self.types.setdefault(ticket["type"], [0, 0])
+        by_type[0] += sign
+        by_type[1] += sign * montant
+
+        crediteur = ticket["crediteur_id"]
+        for uid, part in debtor_parts(ticket):
+            if uid != crediteur:
+                self.lent[crediteur] = self.lent.get(crediteur, 0) + sign * part
+                self.borrowed[uid] = self.borrowed.get(uid, 0) + sign * part
+        self.repaid += sign * (montant - ticket["reste_du"])
+
+        if ticket.get("date_cloture"):
+            self._month(ticket["date_cloture"][:7])[2] += sign
+            self.closed += sign
+            self.close_seconds += sign * _seconds(ticket["date_creation"], ticket["date_cloture"])
+
+    @classmethod
+    def recompute(cls, tickets):
+        """Reconstruction complète (rattrapage), colonne par colonne plutôt que ticket par ticket."""
+        tickets = list(tickets)
+        rollup = cls()
+
+        created_months = [t["date_creation"][:7] for t in tickets]
+        montants = [t["montant_total"] for t in tickets]
+        types = [t["type"] for t in tickets]
+        for month, n in Counter(created_months).items():
+            rollup._month(month)[0] = n
+        for month, montant in zip(created_months, montants):
+            rollup.months[month][1] += montant
+        for type_ticket, n in Counter(types).items():
+            rollup.types[type_ticket] = [n, 0]
+        for type_ticket, montant in zip(types, montants):
+            rollup.types[type_ticket][1] += montant
+
+        lent, borrowed = Counter(), Counter()
+        for t in tickets:
+            crediteur = t["crediteur_id"]
+            for uid, part in debtor_parts(t):
+                if uid != crediteur:
+                    lent[crediteur] += part
+                    borrowed[uid] += part
+        rollup.lent, rollup.borrowed = dict(lent), dict(borrowed)
+        rollup.repaid = sum(montants) - sum(t["reste_du"] for t in tickets)
+
+        clos = [(t["date_creation"], t["date_cloture"]) for t in tickets if t.get("date_cloture")]
+        for month, n in Counter(fin[:7] for _, fin in clos).items():
+            rollup._month(month)[2] = n
+        rollup.closed = len(clos)
+        rollup.close_seconds = sum(_seconds(debut, fin) for debut, fin in clos)
+        return rollup
+
+class LedgerStats:
+    """Statistiques du registre : agrégats des archives (persistés dans stats.json) + agrégats
+    des tickets ouverts (en mémoire), tenus à jour à chaque mutation.
+
+    Une lecture fusionne les deux tables (quelques centaines d'entrées) sans relire les tickets ;
+    les archives ne sont reparcourues que si stats.json ne correspond plus au nombre d'archives.
+    """
+
+    def __init__(self):
+        self._open = None      # Rollup des tickets ouverts
+        self._archived = None  # Rollup des archives
+        self._archived_count = 0
+        self._dirty = False    # agrégats des archives plus récents que stats.json
+
+    # CONSTRUCTION
+    def _load_archived(self):
+        archives = get_repository().archives
+        saved = storage.load_json(STATS_FILE)
+        if saved.get("archives") == len(archives) and "rollup" in saved:
+            self._archived = Rollup(saved["rollup"])
+            self._archived_count = saved["archives"]
+        else:
+            self.backfill()
+
+    def _ensure(self):
+        repo = get_repository()
+        tickets = repo.tickets  # recharge (et reconstruit via on_reset) si modifié sur disque
+        if self._open is None:
+            self._open = Rollup.recompute(tickets.values())
+        if self._archived is None:
+            self._load_archived()
+
+    def load(self):
+        """Charge les agrégats au démarrage (sinon au premier /stats)."""
+        self._ensure()
+
+    def backfill(self):
+        """Recalcule les agrégats des archives depuis zéro et les enregistre."""
+        archives = get_repository().archives
+        self._archived = Rollup.recompute(archives.values())
+        self._archived_count = len(archives)
+        self._dirty = True
+        self.flush()
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    def flush(self):
+        if self._dirty:
+            storage.save_json(STATS_FILE, {"archives": self._archived_count, "rollup": self._archived.to_dict()})
+            self._dirty = False
+
+    # ÉCOUTE DU REPOSITORY
+    def on_reset(self, filename, data):
+        if filename == TICKETS_FILE:
+            self._open = Rollup.recompute(data.values())
+        elif filename == ARCHIVES_FILE and len(data) != self._archived_count:
+            # Archives modifiées hors du bot : rattrapage au prochain accès
+            self._archived = None
+
+    def on_ticket_changed(self, ticket_id, old, new):
+        if self._open is None:
+            return
+        if old is not None:
+            self._open.apply(old, -1)
+        if new is not None:
+            self._open.apply(new, 1)
+
+    def on_archived(self, ticket_id, ticket):
+        if self._archived is None:
+            return
+        self._archived.apply(ticket, 1)
+        self._archived_count += 1
+        self._dirty = True
+
+    # LECTURE
+    def summary(self, months=12, top=5):
+        """Totaux mensuels (les `months` derniers mois), volume par type, top créditeurs / débiteurs,
+        délai moyen de clôture. Enregistre au passage les agrégats des archives."""
+        self._ensure()
+        self.flush()
+        rollups = (self._open, self._archived)
+
+        monthly = {}
+        for rollup in rollups:
+            for month, values in rollup.months.items():
+                total = monthly.setdefault(month, [0, 0, 0])
+                for i, value in enumerate(values):
+                    total[i] += value
+        types = {}
+        for rollup in rollups:
+            for type_ticket, (count, volume) in rollup.types.items():
+                total = types.setdefault(type_ticket, [0, 0])
+                total[0] += count
+                total[1] += volume
+        lent, borrowed = Counter(), Counter()
+        for rollup in rollups:
+            lent.update(rollup.lent)
+            borrowed.update(rollup.borrowed)
+
+        closed = self._archived.closed
+        return {
+            "monthly": [
+                {"month": m, "created": v[0], "volume": v[1], "closed": v[2]}
+                for m, v in sorted(monthly.items())[-months:] if any(v)
+            ],
+            "types": {t: {"count": c, "volume": v} for t, (c, v) in sorted(types.items()) if c},
+            "top_creditors": [(uid, c) for uid, c in lent.most_common(top) if c > 0],
+            "top_debtors": [(uid, c) for uid, c in borrowed.most_common(top) if c > 0],
+            "repaid": self._open.repaid + self._archived.repaid,
+            "open": sum(count for count, _ in self._open.types.values()),
+            "closed": closed,
+            "avg_close_seconds": self._archived.close_seconds / closed if closed else None,
+        }
+
+    def verify(self):
+        """Compare les agrégats incrémentaux à une reconstruction complète, renvoie les écarts."""
+        self._ensure()
+        repo = get_repository()
+        ecarts = []
+        for name, rollup, tickets in (
+            ("ouverts", self._open, repo.tickets.values()),
+            ("archives", self._archived, repo.archives.values()),
+        ):
+            fresh = Rollup.recompute(tickets).to_dict()
+            for key, value in rollup.to_dict().items():
+                expected = fresh[key]
+                if isinstance(value, dict):
+                    # Entrées retombées à zéro après retrait : équivalentes à une absence
+                    value = {k: v for k, v in value.items() if _nonzero(v)}
+                    expected = {k: v for k, v in expected.items() if _nonzero(v)}
+                if key == "close_seconds" and abs(value - expected) < 1e-3:
+                    continue
+                if value != expected:
+                    ecarts.append(f"{name}.{key} : {value} != {expected}")
+        return ecarts
+
+def _create():
+    stats = LedgerStats()
+    get_repository().subscribe(stats)
+    return stats
+
+get_stats = partitions.scoped(_create)
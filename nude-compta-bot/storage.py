@@ -1,29 +1,295 @@
 # storage.py
 import json
 import os
+from contextlib import nullcontext
+
+import config
+import sqlite_backend
+import event_log
+import event_segments
+import partitions
+import snapshot_codecs
+from ticket_model import to_json
 
 DATA_DIR = "data"
 
+# Nombre d'enregistrements présents dans chaque journal (évite de relire le fichier), par chemin
+_journal_counts = {}
+_created_dirs = set()  # dossiers de partition déjà créés
+
+def data_dir():
+    """Dossier du registre actif : DATA_DIR, ou DATA_DIR/guilds/<id> pour un autre serveur."""
+    subdir = partitions.current().subdir
+    if not subdir:
+        return DATA_DIR
+    directory = os.path.join(DATA_DIR, subdir)
+    if directory not in _created_dirs:
+        os.makedirs(directory, exist_ok=True)
+        _created_dirs.add(directory)
+    return directory
+
 def _path(filename):
-    return os.path.join(DATA_DIR, filename)
+    return os.path.join(data_dir(), filename)
 
-def load_json(filename):
+def _journal_path(filename):
+    return _path(filename) + ".journal"
+
+def _sqlite():
+    return config.STORAGE_BACKEND == "sqlite"
+
+def _journal_enabled():
+    return config.STORAGE_MODE == "journal"
+
+def _load_snapshot(filename):
     path = _path(filename)
     if not os.path.exists(path):
         return {}
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    # Format reconnu au contenu : un fichier écrit avec un autre codec reste lisible
+    with open(path, "rb") as f:
+        return snapshot_codecs.decode(f.read())
 
-def save_json(filename, data):
+def _write_snapshot(filename, data):
     path = _path(filename)
     tmp_path = path + ".tmp"
 
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    with open(tmp_path, "wb") as f:
+        f.write(snapshot_codecs.encode(data, config.STORAGE_CODEC))
 
     os.replace(tmp_path, path)
 
-def log_event(event):
-    path = _path("events.log")
+# JOURNAL
+def _replay_journal(filename, data):
+    """Applique la queue du journal sur le snapshot, renvoie le nombre d'enregistrements."""
+    path = _journal_path(filename)
+    if not os.path.exists(path):
+        return 0
+
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Dernière ligne tronquée par un crash : on l'ignore
+                break
+            if record["op"] == "put":
+                data[record["key"]] = record["value"]
+            elif record["op"] == "del":
+                data.pop(record["key"], None)
+            count += 1
+    return count
+
+def _append_journal(filename, *records):
+    path = _journal_path(filename)
     with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        f.write("".join(json.dumps(r, ensure_ascii=False, default=to_json) + "\n" for r in records))
+        f.flush()
+        os.fsync(f.fileno())
+
+    if path not in _journal_counts:
+        _journal_counts[path] = _replay_journal(filename, {})
+    else:
+        _journal_counts[path] += len(records)
+
+    if _journal_counts[path] >= config.JOURNAL_COMPACT_EVERY:
+        compact(filename)
+
+def compact(filename):
+    """Réécrit le snapshot avec la queue du journal puis vide le journal."""
+    data = load_json(filename)
+    save_json(filename, data)
+
+def known_guilds():
+    """IDs des serveurs dont le registre existe déjà sur disque (data/guilds/<id>/)."""
+    directory = os.path.join(DATA_DIR, partitions.GUILDS_DIR)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(name) for name in os.listdir(directory) if name.isdigit())
+
+def release():
+    """Libère les ressources ouvertes pour le registre actif (éviction d'une partition)."""
+    if _sqlite():
+        sqlite_backend.close()
+        return
+    directory = data_dir()
+    event_log.release(os.path.join(directory, "events.log"))
+    event_segments.release(directory)
+    for path in [p for p in _journal_counts if os.path.dirname(p) == directory]:
+        del _journal_counts[path]
+
+def recover_journals():
+    """Au démarrage : rejoue les journaux restants dans leurs snapshots."""
+    if _sqlite():
+        return
+    for filename in ("tickets.json", "archives.json"):
+        if os.path.exists(_journal_path(filename)):
+            compact(filename)
+
+# API
+def load_json(filename):
+    if _sqlite():
+        return sqlite_backend.load_json(filename)
+    data = _load_snapshot(filename)
+    # Rejoué même en mode "json" : un journal laissé par l'autre mode n'est jamais perdu
+    _journal_counts[_journal_path(filename)] = _replay_journal(filename, data)
+    return data
+
+def save_json(filename, data):
+    if _sqlite():
+        sqlite_backend.save_json(filename, data)
+        return
+    _write_snapshot(filename, data)
+
+    # Le snapshot contient tout : la queue du journal devient inutile
+    journal = _journal_path(filename)
+    if os.path.exists(journal):
+        os.remove(journal)
+    _journal_counts[_journal_path(filename)] = 0
+
+def put_record(filename, key, value, current=None):
+    """Écrit une seule entrée (ticket) dans un fichier de données.
+
+    `current` : contenu complet déjà à jour en mémoire, évite de relire le fichier en mode "json".
+    """
+    if _sqlite():
+        sqlite_backend.put_record(filename, key, value)
+        return
+    if _journal_enabled():
+        _append_journal(filename, {"op": "put", "key": key, "value": value})
+        return
+    data = load_json(filename) if current is None else current
+    data[key] = value
+    save_json(filename, data)
+
+def put_records(filename, items, current=None):
+    """Écrit plusieurs entrées en une seule écriture (import en masse)."""
+    if _sqlite():
+        with sqlite_backend.transaction():
+            for key, value in items.items():
+                sqlite_backend.put_record(filename, key, value)
+        return
+    if _journal_enabled():
+        _append_journal(filename, *({"op": "put", "key": k, "value": v} for k, v in items.items()))
+        return
+    data = load_json(filename) if current is None else current
+    data.update(items)
+    save_json(filename, data)
+
+def delete_record(filename, key, current=None):
+    """Supprime une seule entrée d'un fichier de données."""
+    if _sqlite():
+        sqlite_backend.delete_record(filename, key)
+        return
+    if _journal_enabled():
+        _append_journal(filename, {"op": "del", "key": key})
+        return
+    data = load_json(filename) if current is None else current
+    data.pop(key, None)
+    save_json(filename, data)
+
+def delete_records(filename, keys, current=None):
+    """Supprime plusieurs entrées en une seule écriture."""
+    if _sqlite():
+        with sqlite_backend.transaction():
+            for key in keys:
+                sqlite_backend.delete_record(filename, key)
+        return
+    if _journal_enabled():
+        _append_journal(filename, *({"op": "del", "key": k} for k in keys))
+        return
+    data = load_json(filename) if current is None else current
+    for key in keys:
+        data.pop(key, None)
+    save_json(filename, data)
+
+def file_signature(filename):
+    """(mtime, taille) du snapshot et du journal : change dès que le fichier est modifié."""
+    if _sqlite():
+        return sqlite_backend.file_signature(filename)
+    signature = []
+    for path in (_path(filename), _journal_path(filename)):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+def transaction():
+    """Rend atomiques plusieurs écritures (sqlite uniquement, sans effet en json)."""
+    if _sqlite():
+        return sqlite_backend.transaction()
+    return nullcontext()
+
+def find_tickets(filename, user_id=None, crediteur_id=None, type_ticket=None, since=None):
+    """Tickets filtrés : requête indexée en sqlite, parcours complet en json."""
+    if _sqlite():
+        return sqlite_backend.find_tickets(filename, user_id, crediteur_id, type_ticket, since)
+
+    result = {}
+    for tid, t in load_json(filename).items():
+        if user_id is not None and t["crediteur_id"] != user_id \
+                and all(d["user_id"] != user_id for d in t["debiteurs"]):
+            continue
+        if crediteur_id is not None and t["crediteur_id"] != crediteur_id:
+            continue
+        if type_ticket is not None and t["type"] != type_ticket:
+            continue
+        if since is not None and t["date_creation"] < since:
+            continue
+        result[tid] = t
+    return result
+
+def _event_segments():
+    return event_segments.get_segments(data_dir())
+
+def iter_events(since=None, until=None, ticket_id=None):
+    """Parcourt events.log (segments clos puis segment actif) ligne par ligne, sans le charger en entier.
+
+    Filtres optionnels : dates ISO [since, until] et ID de ticket ; en json, seuls les segments
+    dont le manifeste recoupe le filtre sont ouverts.
+    """
+    if _sqlite():
+        yield from sqlite_backend.iter_events(since, until, ticket_id)
+        return
+    yield from _event_segments().iter_events(since, until, ticket_id)
+
+def iter_events_from(position=0):
+    """(position suivante, événement) à partir d'une position de reprise.
+
+    json : position = offset global en octets (segments compris) ; sqlite : dernier id lu.
+    """
+    if _sqlite():
+        yield from sqlite_backend.iter_events_from(position)
+        return
+    yield from _event_segments().iter_from(position)
+
+def events_size():
+    """Position de fin du journal d'événements (détection de troncature / rotation)."""
+    if _sqlite():
+        return sqlite_backend.events_size()
+    return _event_segments().size()
+
+def events_start():
+    """Position du plus ancien événement conservé (> 0 si des segments ont été purgés)."""
+    if _sqlite():
+        return 0
+    return _event_segments().start()
+
+def log_event(event):
+    if _sqlite():
+        sqlite_backend.log_event(event)
+        return
+    # Appender longue durée : les événements d'un même tour de boucle partent en une écriture
+    event_log.get_appender(_path("events.log")).append(event)
+    _event_segments().maybe_rotate()
+
+def log_events(events):
+    """Journalise plusieurs événements en une seule écriture."""
+    if _sqlite():
+        with sqlite_backend.transaction():
+            for event in events:
+                sqlite_backend.log_event(event)
+        return
+    event_log.get_appender(_path("events.log")).extend(events)
+    _event_segments().maybe_rotate()
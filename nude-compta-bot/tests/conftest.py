@@ -0,0 +1,31 @@
+# tests/conftest.py
+import os
+import sys
+
+# Modules du bot compta importés à plat, comme au lancement (python main.py depuis nude-compta-bot/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("NUDE_COMPTA_TOKEN", "test")
+os.environ.setdefault("GUILD_ID", "1")
+
+import pytest
+
+import config
+import partitions
+from bench.synthetic import isolated_data_dir
+
+@pytest.fixture
+def ledger_dir(monkeypatch):
+    """Répertoire de données temporaire, backend json en mode "json" par défaut."""
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "json")
+    monkeypatch.setattr(config, "STORAGE_MODE", "json")
+    monkeypatch.setattr(config, "REPLAY_ON_STARTUP", False)
+    with isolated_data_dir() as directory:
+        yield directory
+    for partition in partitions.resident():
+        partitions.drop(partition.key)
+
+@pytest.fixture
+def sqlite_ledger(monkeypatch, ledger_dir):
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(config, "SQLITE_PATH", None)
+    return ledger_dir
@@ -0,0 +1,71 @@
+# tests/test_archive_segments.py
+import gzip
+import json
+
+from archive_segments import MANIFEST, SegmentArchiveStore
+
+def _ticket(month, reste=0):
+    return {"date_creation": "2026-01-01T00:00:00", "date_cloture": f"{month}-15T00:00:00", "reste_du": reste}
+
+def _manifest(directory):
+    with open(directory / MANIFEST, encoding="utf-8") as f:
+        return json.load(f)
+
+def test_sealed_and_open_month_are_merged(tmp_path):
+    store = SegmentArchiveStore(str(tmp_path))
+    store.put("a0001", _ticket("2026-01"))
+    store.put("a0002", _ticket("2026-02"))  # scelle janvier
+    store.put("a0003", _ticket("2026-01"))  # horloge reculée : janvier scellé et ouvert
+
+    for reopened in (store, SegmentArchiveStore(str(tmp_path))):
+        assert sorted(reopened) == ["a0001", "a0002", "a0003"]
+        assert sorted(tid for tid, _ in reopened.items(until="2026-01")) == ["a0001", "a0003"]
+        assert len(reopened) == 3
+
+def test_manifest_stores_ranges_not_ids(tmp_path):
+    store = SegmentArchiveStore(str(tmp_path))
+    store.put_many({f"a{n:04d}": _ticket("2026-01") for n in range(1, 101)})
+    store.put("b0007", _ticket("2026-01"))
+    store.put("a0101", _ticket("2026-02"))
+
+    segment = _manifest(tmp_path)["segments"]["2026-01"]
+    assert segment["count"] == 101
+    assert segment["tickets"] == {"a": [1, 100], "b": [7, 7]}
+    assert "ids" not in segment
+    assert SegmentArchiveStore(str(tmp_path))["a0042"]["date_cloture"].startswith("2026-01")
+    assert "a0200" not in store
+
+def test_ticket_archived_twice_keeps_latest_version(tmp_path):
+    store = SegmentArchiveStore(str(tmp_path))
+    store.put("a0001", _ticket("2026-01", reste=5))
+    store.put("a0002", _ticket("2026-02"))
+    # Crash entre archivage et suppression du ticket ouvert : clôturé de nouveau plus tard
+    store.put("a0001", _ticket("2026-02"))
+    store.put("a0003", _ticket("2026-03"))
+
+    for reopened in (store, SegmentArchiveStore(str(tmp_path))):
+        assert len(reopened) == 3
+        assert reopened["a0001"]["reste_du"] == 0
+        assert [tid for tid, _ in reopened.items()].count("a0001") == 1
+    assert _manifest(tmp_path)["segments"]["2026-01"]["superseded"] == ["a0001"]
+
+def test_old_manifest_is_upgraded(tmp_path):
+    store = SegmentArchiveStore(str(tmp_path))
+    store.put("a0001", _ticket("2026-01", reste=5))
+    store.put("a0001", _ticket("2026-02"))
+    store.put("a0002", _ticket("2026-03"))
+
+    # Ancien format : liste complète des IDs de chaque segment
+    manifest = _manifest(tmp_path)
+    for month, segment in manifest["segments"].items():
+        with gzip.open(tmp_path / f"{month}.jsonl.gz", "rt", encoding="utf-8") as f:
+            segment["ids"] = [json.loads(line)["id"] for line in f]
+        del segment["tickets"]
+        segment.pop("superseded", None)
+    with open(tmp_path / MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    upgraded = SegmentArchiveStore(str(tmp_path))
+    assert len(upgraded) == 2
+    assert upgraded["a0001"]["reste_du"] == 0
+    assert all("ids" not in segment for segment in _manifest(tmp_path)["segments"].values())
@@ -0,0 +1,57 @@
+# tests/test_event_log.py
+import asyncio
+import json
+
+import event_log
+from event_log import EventAppender
+
+def _events(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["n"] for line in f]
+
+async def _append(appender, n):
+    appender.append({"n": n})
+    # Lot soumis au tour de boucle suivant, écrit dans un thread
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+        if not appender._scheduled:
+            break
+    await asyncio.sleep(0.01)
+
+def test_failed_batch_is_reported_and_written_later(tmp_path, capsys):
+    path = tmp_path / "absent" / "events.log"
+    appender = EventAppender(str(path), durability="batch")
+
+    async def scenario():
+        appender.attach_loop(asyncio.get_running_loop())
+        await _append(appender, 1)
+        assert "Erreur d'écriture" in capsys.readouterr().out
+        path.parent.mkdir()
+        await _append(appender, 2)
+
+    asyncio.run(scenario())
+    appender.close()
+    assert _events(path) == [1, 2]
+
+def test_partial_batch_is_not_duplicated(monkeypatch, tmp_path, capsys):
+    path = tmp_path / "events.log"
+    appender = EventAppender(str(path), durability="batch")
+    fsync = event_log.os.fsync
+    failures = [OSError("disque plein")]
+
+    def failing(fd):
+        if failures:
+            raise failures.pop()
+        return fsync(fd)
+
+    monkeypatch.setattr(event_log.os, "fsync", failing)
+
+    async def scenario():
+        appender.attach_loop(asyncio.get_running_loop())
+        await _append(appender, 1)
+        await _append(appender, 2)
+
+    asyncio.run(scenario())
+    appender.close()
+    assert "disque plein" in capsys.readouterr().out
+    assert _events(path) == [1, 2]
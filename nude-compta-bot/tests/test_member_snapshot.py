@@ -0,0 +1,49 @@
+# tests/test_member_snapshot.py
+import asyncio
+import threading
+import time
+
+from bench.fake_discord import FakeGuild
+from shared import member_snapshot
+from shared.member_snapshot import MemberSnapshot, MemberSnapshotWriter, write_snapshot
+
+def _guild(guild_id=1):
+    guild = FakeGuild(guild_id, latency=0)
+    guild.add_member(11, "admin")
+    return guild
+
+def test_snapshot_is_only_trusted_for_its_guild_while_fresh(monkeypatch, tmp_path):
+    path = tmp_path / "members.snapshot"
+    write_snapshot(path, 1, _guild(1).members)
+    reader = MemberSnapshot(path, check_interval=0)
+
+    assert reader.is_fresh(1, max_age=60)
+    assert not reader.is_fresh(2, max_age=60)
+
+    # Annuaire abandonné par l'écrivain : écrit il y a dix minutes
+    stale = tmp_path / "stale.snapshot"
+    monkeypatch.setattr(member_snapshot.time, "time", lambda: 1_000_000)
+    write_snapshot(stale, 1, _guild(1).members)
+    monkeypatch.setattr(member_snapshot.time, "time", lambda: 1_000_600)
+    assert not MemberSnapshot(stale, check_interval=0).is_fresh(1, max_age=60)
+
+def test_writer_flushes_off_the_event_loop(monkeypatch, tmp_path):
+    threads = []
+    write_entries = member_snapshot._write_entries
+
+    def recording(*args):
+        threads.append(threading.current_thread())
+        return write_entries(*args)
+
+    monkeypatch.setattr(member_snapshot, "_write_entries", recording)
+    path = tmp_path / "members.snapshot"
+    writer = MemberSnapshotWriter(path, delay=0, heartbeat=3600)
+
+    async def scenario():
+        writer.attach(_guild(1), asyncio.get_running_loop())
+        await writer.flush()
+        writer._heartbeat.cancel()
+
+    asyncio.run(scenario())
+    assert threads and all(t is not threading.main_thread() for t in threads)
+    assert MemberSnapshot(path).get(11).display_name == "admin"
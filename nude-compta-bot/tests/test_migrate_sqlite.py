@@ -0,0 +1,28 @@
+# tests/test_migrate_sqlite.py
+import sys
+
+import pytest
+
+import config
+import migrate_sqlite
+import sqlite_backend
+from tickets import create_tickets, close_ticket
+
+@pytest.mark.parametrize("layout", ["file", "segments"])
+def test_migration_keeps_archives(monkeypatch, ledger_dir, layout):
+    monkeypatch.setattr(config, "ARCHIVE_LAYOUT", layout)
+    ids = create_tickets([
+        {"type_ticket": "p2p", "createur_id": "1", "debiteurs": [{"user_id": "2", "part": 100}],
+         "crediteur_id": "1", "montant_centimes": 100, "motif": f"test {i}"}
+        for i in range(4)
+    ])
+    for ticket_id in ids[:3]:
+        close_ticket(ticket_id, "1")
+
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(config, "SQLITE_PATH", None)
+    monkeypatch.setattr(sys, "argv", ["migrate_sqlite.py"])
+    migrate_sqlite.main()
+
+    assert sorted(sqlite_backend.load_json("archives.json")) == sorted(ids[:3])
+    assert sorted(sqlite_backend.load_json("tickets.json")) == [ids[3]]
@@ -0,0 +1,46 @@
+# tests/test_outbound.py
+import asyncio
+import time
+
+from shared.outbound import OutboundDispatcher
+
+class _Channel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+def test_interactions_leave_no_bucket():
+    dispatcher = OutboundDispatcher()
+
+    async def reply():
+        return "ok"
+
+    async def scenario():
+        for interaction_id in range(100):
+            assert await dispatcher.call(("interaction", interaction_id), reply) == "ok"
+
+    asyncio.run(scenario())
+    assert dispatcher._buckets == {}
+
+def test_idle_channel_buckets_are_evicted():
+    dispatcher = OutboundDispatcher(route_rate=(5, 1.0))
+    channels = [_Channel(i) for i in range(20)]
+
+    async def scenario():
+        for channel in channels:
+            dispatcher.post(channel, "annonce")
+        while dispatcher._heap or dispatcher._busy:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert all(channel.sent == ["annonce"] for channel in channels)
+    assert len(dispatcher._buckets) == 20
+
+    # Bucket bloqué par un 429 : gardé jusqu'à l'échéance
+    dispatcher._buckets[("channel", 0)].block(60)
+    dispatcher._sweep(time.monotonic() + 2)
+    assert list(dispatcher._buckets) == [("channel", 0)]
+    assert dispatcher.metrics()["blocked_routes"] == 1
@@ -0,0 +1,88 @@
+# tests/test_partitions.py
+import asyncio
+
+import pytest
+
+import config
+import partitions
+from bench.fake_discord import FakeGuild, FakeInteraction, InteractionRecord
+from ledger_service import get_ledger
+from repository import get_repository
+
+@pytest.fixture
+def multi_guild(monkeypatch, ledger_dir):
+    monkeypatch.setattr(config, "PARTITION_BY_GUILD", True)
+    return ledger_dir
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Arguments de chaque réponse envoyée par les fausses interactions (embed, view...)."""
+    messages = []
+    monkeypatch.setattr(InteractionRecord, "message", lambda self, kind, **kwargs: messages.append(kwargs))
+    return messages
+
+async def _seed(guild_id, motif, count):
+    partitions.use(guild_id)
+    for _ in range(count):
+        await get_ledger().create_ticket("p2p", "10", [{"user_id": "11", "part": 100}], "10", 100, motif)
+
+async def _command(guild_id, callback, interaction, *args):
+    # Ce que fait LedgerTree.interaction_check avant chaque commande
+    partitions.use(guild_id)
+    await callback(interaction, *args)
+
+def _only_secondary(embed):
+    return embed.fields and all("secondaire" in f.value and "principal" not in f.value for f in embed.fields)
+
+def test_sequences_and_stores_are_per_guild(multi_guild):
+    async def scenario():
+        await asyncio.create_task(_seed(1, "principal", 2))
+        await asyncio.create_task(_seed(2, "secondaire", 3))
+
+        async def count(guild_id):
+            partitions.use(guild_id)
+            return await get_ledger().run(lambda: sorted(get_repository().tickets))
+
+        return await asyncio.create_task(count(1)), await asyncio.create_task(count(2))
+
+    principal, secondaire = asyncio.run(scenario())
+    assert principal == ["a0001", "a0002"]
+    assert secondaire == ["a0001", "a0002", "a0003"]
+
+@pytest.mark.parametrize("command", ["earliest", "historique"])
+def test_page_buttons_stay_in_guild_partition(multi_guild, sent, command):
+    import main
+
+    guild = FakeGuild(2, latency=0)
+    user = guild.add_member(11, "débiteur")
+
+    async def scenario():
+        await asyncio.create_task(_seed(1, "principal", 12))
+        await asyncio.create_task(_seed(2, "secondaire", 12))
+
+        first = FakeInteraction(command, user, guild, latency=0)
+        if command == "earliest":
+            await asyncio.create_task(_command(2, main.earliest_tickets.callback, first, None, None, 5))
+        else:
+            await asyncio.create_task(_command(2, main.audit.callback, first, user))
+        view = sent[-1]["view"]
+
+        # Clic dispatché par la View, hors de l'arbre des commandes : aucune partition active
+        click = FakeInteraction(command, user, guild, latency=0)
+        await view.suivant.callback(click)
+
+    asyncio.run(scenario())
+    assert len(sent) == 2
+    for message in sent:
+        assert _only_secondary(message["embed"])
+
+def test_commands_are_guild_only(sent):
+    import main
+
+    contexts = main.bot.tree.allowed_contexts
+    assert contexts.guild and not contexts.dm_channel and not contexts.private_channel
+
+    guild = FakeGuild(1, latency=0)
+    dm = FakeInteraction("solde", guild.add_member(11, "membre"), None, latency=0)
+    assert asyncio.run(main.bot.tree.interaction_check(dm)) is False
+    assert dm.response.is_done()
@@ -0,0 +1,38 @@
+# tests/test_reminders.py
+import asyncio
+import time
+
+import discord
+import pytest
+
+from reminders import ReminderScheduler
+from tickets import create_tickets
+
+async def _process(scheduler, user_id):
+    task = asyncio.create_task(scheduler._sender())
+    scheduler._queue.put_nowait(user_id)
+    while user_id not in scheduler._saved:
+        await asyncio.sleep(0.01)
+    task.cancel()
+
+@pytest.mark.parametrize("rate_limited", [False, True])
+def test_rate_limited_reminder_is_retried_soon(ledger_dir, rate_limited):
+    create_tickets([{"type_ticket": "p2p", "createur_id": "1", "debiteurs": [{"user_id": "2", "part": 100}],
+                     "crediteur_id": "1", "montant_centimes": 100, "motif": "test"}])
+    sends = []
+
+    async def send(user_id, debts):
+        sends.append(user_id)
+        if rate_limited:
+            raise discord.RateLimited(0.01)
+
+    scheduler = ReminderScheduler(send, age_days=0, interval_days=7, spacing=0.001)
+    asyncio.run(_process(scheduler, "2"))
+
+    delay = scheduler._due["2"] - time.time()
+    if rate_limited:
+        assert len(sends) == 5 and scheduler.rate_limited == 5
+        assert delay < 1
+    else:
+        assert sends == ["2"]
+        assert delay > 6 * 86400
@@ -0,0 +1,89 @@
+# tests/test_settlement.py
+import asyncio
+
+import pytest
+
+import replay
+import storage
+from bench.fake_discord import FakeGuild, FakeInteraction
+from repository import get_repository, ARCHIVES_FILE, TICKETS_FILE
+from settlement import apply_settlement, net_balances
+from tickets import create_tickets, rembourse
+
+def _seed(n):
+    ids = create_tickets([
+        {"type_ticket": "p2p", "createur_id": str(i % 3), "debiteurs": [{"user_id": str((i + 1) % 3), "part": 100}],
+         "crediteur_id": str(i % 3), "montant_centimes": 1000 + i, "motif": f"test {i}"}
+        for i in range(n)
+    ])
+    # Un ticket partiellement remboursé : seul son reste est soldé
+    rembourse(ids[0], 400, "0")
+    return ids
+
+def _count_writes(monkeypatch):
+    writes = []
+    write_snapshot = storage._write_snapshot
+
+    def counting(filename, data):
+        writes.append(filename)
+        return write_snapshot(filename, data)
+
+    monkeypatch.setattr(storage, "_write_snapshot", counting)
+    return writes
+
+def test_settlement_writes_each_file_once(monkeypatch, ledger_dir):
+    ids = _seed(20)
+    writes = _count_writes(monkeypatch)
+
+    plan = apply_settlement("9")
+
+    assert plan
+    assert writes.count(TICKETS_FILE) == 1
+    assert writes.count(ARCHIVES_FILE) == 1
+    repo = get_repository()
+    assert not repo.tickets
+    assert all(repo.archives[tid]["reste_du"] == 0 for tid in ids)
+    assert net_balances(repo.tickets) == {}
+
+def test_settlement_events_replay(ledger_dir):
+    ids = _seed(5)
+    apply_settlement("9")
+
+    events = [e for e in storage.iter_events() if e["event"] in ("REMBOURSE", "CLOSE", "SETTLE")]
+    assert [e["event"] for e in events].count("CLOSE") == len(ids)
+    assert events[-1]["event"] == "SETTLE"
+    assert next(e["montant"] for e in events if e["ticket_id"] == ids[0] and e["auteur_id"] == "9") == 600
+    _, divergences = replay.verify(full=True)
+    assert divergences == []
+
+def test_settlement_is_atomic_in_sqlite(monkeypatch, sqlite_ledger):
+    ids = _seed(5)
+
+    def fail(*args, **kwargs):
+        raise OSError("disque plein")
+
+    monkeypatch.setattr(storage, "delete_records", fail)
+    with pytest.raises(OSError):
+        apply_settlement("9")
+
+    repo = get_repository()
+    assert sorted(repo.tickets) == sorted(ids)
+    assert not any(tid in repo.archives for tid in ids)
+
+@pytest.mark.parametrize("administrator", [False, True])
+def test_only_administrators_apply_settlement(ledger_dir, administrator):
+    import main
+
+    ids = _seed(3)
+    guild = FakeGuild(1, latency=0)
+    user = guild.add_member(11, "membre", administrator=administrator)
+    interaction = FakeInteraction("settle", user, guild, latency=0)
+
+    asyncio.run(main.settle_cmd.callback(interaction, True))
+
+    remaining = sorted(get_repository().tickets)
+    if administrator:
+        assert remaining == []
+    else:
+        assert remaining == sorted(ids)
+        assert interaction.record.messages == [("send_message", "Commande réservée aux administrateurs.")]
@@ -0,0 +1,67 @@
+# tests/test_sqlite_backend.py
+import storage
+from repository import get_repository, TICKETS_FILE
+from tickets import create_ticket
+from utils import generate_ticket_id
+
+def _count_loads(monkeypatch):
+    loads = []
+    load_json = storage.load_json
+
+    def counting(filename):
+        loads.append(filename)
+        return load_json(filename)
+
+    monkeypatch.setattr(storage, "load_json", counting)
+    return loads
+
+def _create(n):
+    for i in range(n):
+        tid = generate_ticket_id("p2p")
+        create_ticket(tid, "p2p", "1", [{"user_id": "2", "part": 100}], "1", 100, f"test {i}")
+
+def test_writes_to_other_documents_do_not_reload_tickets(monkeypatch, sqlite_ledger):
+    get_repository().tickets
+    loads = _count_loads(monkeypatch)
+    # Séquence (documents), événements et tickets écrits à chaque création
+    _create(5)
+    assert loads.count(TICKETS_FILE) == 0
+    assert len(get_repository().tickets) == 5
+
+def test_external_write_is_detected(sqlite_ledger):
+    import sqlite3
+    import sqlite_backend
+
+    _create(1)
+    tid = next(iter(get_repository().tickets))
+    other = sqlite3.connect(sqlite_backend.db_path())
+    other.execute("UPDATE tickets SET reste_du = 0 WHERE ticket_id = ?", (tid,))
+    other.commit()
+    other.close()
+    assert get_repository().tickets[tid]["reste_du"] == 0
+
+def test_signature_is_per_document(sqlite_ledger):
+    before = storage.file_signature(TICKETS_FILE)
+    storage.put_record("sequences.json", "a", 3)
+    storage.log_event({"event": "TEST", "timestamp": "2026-01-01T00:00:00"})
+    assert storage.file_signature(TICKETS_FILE) == before
+    storage.put_record(TICKETS_FILE, "a0001", {"type": "p2p", "debiteurs": [], "crediteur_id": "1"})
+    assert storage.file_signature(TICKETS_FILE) != before
+
+def test_find_tickets_uses_indexes(sqlite_ledger):
+    import sqlite_backend
+
+    _create(3)
+    conn = sqlite_backend._connect()
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_tickets_crediteur", "idx_tickets_type", "idx_tickets_date", "idx_ticket_parts_user"} <= indexes
+
+    def plan(**filters):
+        where, params = sqlite_backend._filters(TICKETS_FILE, **filters)
+        return " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN SELECT ticket_id FROM tickets {where}", params))
+
+    assert "idx_tickets_crediteur" in plan(crediteur_id="1")
+    assert "idx_tickets_type" in plan(type_ticket="p2p")
+    assert "idx_tickets_date" in plan(since="2026-01-01")
+    assert "idx_ticket_parts_user" in plan(user_id="2")
+    assert sorted(storage.find_tickets(TICKETS_FILE, user_id="2")) == sorted(get_repository().tickets)
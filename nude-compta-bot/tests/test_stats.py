@@ -0,0 +1,35 @@
+# tests/test_stats.py
+import asyncio
+
+import config
+import storage
+from ledger_service import LedgerService
+from stats import STATS_FILE
+
+async def _close_tickets(service, n):
+    for _ in range(n):
+        ticket_id = await service.create_ticket("p2p", "1", [{"user_id": "2", "part": 100}], "1", 100, "test")
+        await service.close_ticket(ticket_id, "1")
+
+def test_stats_are_saved_on_shutdown(monkeypatch, ledger_dir):
+    monkeypatch.setattr(config, "STATS_FLUSH_SECONDS", 3600)
+    service = LedgerService()
+    asyncio.run(_close_tickets(service, 3))
+    assert storage.load_json(STATS_FILE).get("archives", 0) < 3
+
+    service.shutdown()
+    assert storage.load_json(STATS_FILE)["archives"] == 3
+
+def test_stats_are_saved_after_closing_tickets(monkeypatch, ledger_dir):
+    monkeypatch.setattr(config, "STATS_FLUSH_SECONDS", 0.01)
+    service = LedgerService()
+
+    async def scenario():
+        await _close_tickets(service, 3)
+        await asyncio.sleep(0.05)
+        # Attend l'enregistrement soumis au thread du registre
+        await service.run(lambda: None)
+
+    asyncio.run(scenario())
+    assert storage.load_json(STATS_FILE)["archives"] == 3
+    service.shutdown()
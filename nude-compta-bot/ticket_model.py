@@ -0,0 +1,113 @@
+# ticket_model.py
+import sys
+from array import array
+from collections.abc import Mapping
+
+# Ordre des clés du schéma JSON (celui de tickets._new_ticket)
+KEY_ORDER = (
+    "type", "createur_id", "debiteurs", "crediteur_id", "motif",
+    "montant_total", "reste_du", "date_creation", "date_cloture"
+)
+FIELDS = tuple(k for k in KEY_ORDER if k != "debiteurs")
+_FIELD_SET = frozenset(FIELDS)
+_INTERNED = frozenset(("type", "createur_id", "crediteur_id"))
+_INT64 = (-2**63, 2**63 - 1)
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<absent>"
+
+MISSING = _Missing()  # champ absent du ticket d'origine (rendu tel quel par to_dict)
+
+class Ticket(Mapping):
+    """Ticket résident compact : champs en slots, IDs utilisateur internés (une seule chaîne par
+    utilisateur pour tout le registre), parts des débiteurs dans un array d'entiers 64 bits.
+
+    Lecture identique à l'ancien dict (ticket["reste_du"], .get, dict(ticket), json via to_dict) ;
+    en lecture seule : une mutation se fait sur dict(ticket), réenregistré par le repository.
+    Les boucles chaudes lisent les attributs et debtor_parts() sans créer de dicts.
+    """
+
+    __slots__ = FIELDS + ("debtor_ids", "parts", "extra")
+
+    def __getitem__(self, key):
+        if key == "debiteurs":
+            return [{"user_id": uid, "part": part} for uid, part in zip(self.debtor_ids, self.parts)]
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is MISSING:
+                raise KeyError(key)
+            return value
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in KEY_ORDER:
+            if key == "debiteurs" or getattr(self, key) is not MISSING:
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Ticket({self.to_dict()!r})"
+
+    def debtor_parts(self):
+        """(user_id, part) de chaque débiteur, dans l'ordre du ticket."""
+        return zip(self.debtor_ids, self.parts)
+
+    def to_dict(self):
+        return {key: self[key] for key in self}
+
+def _compactable(ticket):
+    debiteurs = ticket.get("debiteurs")
+    if not isinstance(debiteurs, list):
+        return False
+    for d in debiteurs:
+        if not (isinstance(d, dict) and len(d) == 2 and isinstance(d.get("user_id"), str)):
+            return False
+        part = d.get("part")
+        if type(part) is not int or not _INT64[0] <= part <= _INT64[1]:
+            return False
+    return True
+
+def compact(ticket):
+    """Ticket compact équivalent au dict (JSON) `ticket`, ou le dict tel quel si son contenu sort du
+    schéma habituel (débiteurs mal formés) : la conversion ne perd jamais rien."""
+    if isinstance(ticket, Ticket) or not _compactable(ticket):
+        return ticket
+    t = Ticket.__new__(Ticket)
+    for key in FIELDS:
+        value = ticket.get(key, MISSING)
+        if key in _INTERNED and isinstance(value, str):
+            value = sys.intern(value)
+        setattr(t, key, value)
+    debiteurs = ticket["debiteurs"]
+    t.debtor_ids = tuple(sys.intern(d["user_id"]) for d in debiteurs)
+    t.parts = array("q", [d["part"] for d in debiteurs])
+    extra = {k: v for k, v in ticket.items() if k not in _FIELD_SET and k != "debiteurs"}
+    t.extra = extra or None
+    return t
+
+def compact_all(tickets):
+    """Convertit en place les valeurs d'un dict ticket_id -> ticket."""
+    for tid, ticket in tickets.items():
+        tickets[tid] = compact(ticket)
+    return tickets
+
+def debtor_parts(ticket):
+    """(user_id, part) des débiteurs d'un ticket compact ou d'un dict JSON."""
+    if isinstance(ticket, Ticket):
+        return ticket.debtor_parts()
+    return ((d["user_id"], d["part"]) for d in ticket["debiteurs"])
+
+def to_json(obj):
+    """`default=` pour json.dump : tickets compacts écrits selon le schéma JSON habituel."""
+    if isinstance(obj, Ticket):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,26 +1,16 @@
 # tickets.py
-from storage import load_json, save_json, log_event
-from utils import now_iso
+from storage import log_event, transaction
+from repository import get_repository
+from balances import get_balance_index
+from utils import now_iso, ticket_prefix
+from sequences import get_sequence
 
 # CRÉATION DE TICKET
-def create_ticket(
-    ticket_id,
-    type_ticket,
-    createur_id,
-    debiteurs,
-    crediteur_id,
-    montant_centimes,
-    motif
-):
+def _new_ticket(type_ticket, createur_id, debiteurs, crediteur_id, montant_centimes, motif):
     if montant_centimes <= 0:
         raise ValueError("Le montant doit être positif")
 
-    tickets = load_json("tickets.json")
-
-    if ticket_id in tickets:
-        raise ValueError("ID de ticket déjà existant")
-
-    tickets[ticket_id] = {
+    return {
         "type": type_ticket,
         "createur_id": createur_id,
         "debiteurs": debiteurs,
@@ -31,116 +21,128 @@ def create_ticket(
         "date_creation": now_iso()
     }
 
-    save_json("tickets.json", tickets)
-
+def _log_create(ticket_id, ticket):
     log_event({
         "timestamp": now_iso(),
         "event": "CREATE",
         "ticket_id": ticket_id,
-        "montant": montant_centimes,
-        "auteur_id": createur_id
+        "montant": ticket["montant_total"],
+        "auteur_id": ticket["createur_id"],
+        # Ticket complet : permet de reconstruire l'état depuis events.log (replay.py)
+        "type": ticket["type"],
+        "debiteurs": ticket["debiteurs"],
+        "crediteur_id": ticket["crediteur_id"],
+        "motif": ticket["motif"],
+        "date_creation": ticket["date_creation"]
     })
 
+def create_ticket(
+    ticket_id,
+    type_ticket,
+    createur_id,
+    debiteurs,
+    crediteur_id,
+    montant_centimes,
+    motif
+):
+    ticket = _new_ticket(type_ticket, createur_id, debiteurs, crediteur_id, montant_centimes, motif)
+
+    repo = get_repository()
+
+    if ticket_id in repo.tickets:
+        raise ValueError("ID de ticket déjà existant")
+
+    repo.put_ticket(ticket_id, ticket)
+    _log_create(ticket_id, ticket)
+
+# CRÉATION EN MASSE
+def create_tickets(specs):
+    """Crée une liste de tickets (dicts avec les arguments de create_ticket, sans ticket_id).
+
+    Tout est validé avant d'écrire ; IDs réservés d'un bloc et tickets écrits en une fois.
+    Renvoie les IDs attribués, dans l'ordre des specs.
+    """
+    tickets = [
+        _new_ticket(s["type_ticket"], s["createur_id"], s["debiteurs"],
+                    s["crediteur_id"], s["montant_centimes"], s["motif"])
+        for s in specs
+    ]
+
+    by_prefix = {}
+    for idx, ticket in enumerate(tickets):
+        by_prefix.setdefault(ticket_prefix(ticket["type"]), []).append(idx)
+    ids = [None] * len(tickets)
+    for prefix, indexes in by_prefix.items():
+        for idx, ticket_id in zip(indexes, get_sequence().reserve(prefix, len(indexes))):
+            ids[idx] = ticket_id
+
+    items = dict(zip(ids, tickets))
+    with transaction():
+        get_repository().put_tickets(items)
+        for ticket_id, ticket in items.items():
+            _log_create(ticket_id, ticket)
+    return ids
+
 # REMBOURSEMENT
 def rembourse(ticket_id, montant_centimes, auteur_id):
     if montant_centimes <= 0:
         raise ValueError("Montant invalide")
 
-    tickets = load_json("tickets.json")
+    repo = get_repository()
 
-    if ticket_id not in tickets:
+    if ticket_id not in repo.tickets:
         raise ValueError("Ticket introuvable")
 
-    ticket = tickets[ticket_id]
+    # Copie : le ticket résident n'est remplacé qu'une fois l'écriture réussie
+    ticket = dict(repo.tickets[ticket_id])
 
     if montant_centimes > ticket["reste_du"]:
         raise ValueError("Le montant dépasse la dette restante")
 
     ticket["reste_du"] -= montant_centimes
 
-    log_event({
-        "timestamp": now_iso(),
-        "event": "REMBOURSE",
-        "ticket_id": ticket_id,
-        "montant": montant_centimes,
-        "auteur_id": auteur_id
-    })
+    # Sauvegardé avant une éventuelle clôture pour archiver le reste_du à jour
+    with transaction():
+        repo.put_ticket(ticket_id, ticket)
+
+        # Journalisé après l'écriture : events.log ne décrit que des mutations réussies
+        log_event({
+            "timestamp": now_iso(),
+            "event": "REMBOURSE",
+            "ticket_id": ticket_id,
+            "montant": montant_centimes,
+            "auteur_id": auteur_id
+        })
 
-    if ticket["reste_du"] == 0:
-        close_ticket(ticket_id, auteur_id)
-    else:
-        save_json("tickets.json", tickets)
+        if ticket["reste_du"] == 0:
+            close_ticket(ticket_id, auteur_id)
 
 # CLÔTURE & ARCHIVAGE
 def close_ticket(ticket_id, auteur_id):
-    tickets = load_json("tickets.json")
-    archives = load_json("archives.json")
+    repo = get_repository()
 
-    if ticket_id not in tickets:
+    if ticket_id not in repo.tickets:
         raise ValueError("Ticket introuvable")
 
-    ticket = tickets.pop(ticket_id)
+    ticket = dict(repo.tickets[ticket_id])
     ticket["date_cloture"] = now_iso()
 
-    archives[ticket_id] = ticket
-
-    save_json("tickets.json", tickets)
-    save_json("archives.json", archives)
+    # Archivé avant d'être retiré : un crash entre les deux laisse un doublon, pas une perte
+    # (en sqlite les deux écritures sont dans la même transaction)
+    with transaction():
+        repo.put_archive(ticket_id, ticket)
+        repo.delete_ticket(ticket_id)
 
     log_event({
         "timestamp": now_iso(),
         "event": "CLOSE",
         "ticket_id": ticket_id,
+        "date_cloture": ticket["date_cloture"],
         "auteur_id": auteur_id
     })
 
 # CALCUL DU SOLDE
 def calcul_solde(user_id):
-    tickets = load_json("tickets.json")
-
-    detail = {}
-    total_doit = 0
-    total_recoit = 0
-
-    for ticket in tickets.values():
-        for d in ticket["debiteurs"]:
-            uid = d["user_id"]
-            part = d["part"]
-            if uid == user_id:
-                total_doit += part
-                detail.setdefault(ticket["crediteur_id"], {"doit": 0, "recoit": 0})
-                detail[ticket["crediteur_id"]]["doit"] += part
-
-        if ticket["crediteur_id"] == user_id:
-            total_recoit += ticket["reste_du"]
-            for d in ticket["debiteurs"]:
-                uid = d["user_id"]
-                part = d["part"]
-                detail.setdefault(uid, {"doit": 0, "recoit": 0})
-                detail[uid]["recoit"] += part
-
-    return {
-        "detail": detail,  # { user_id: {doit: X, recoit: Y}, ... }
-        "doit": total_doit,
-        "recoit": total_recoit,
-        "solde": total_recoit - total_doit
-    }
-
-    tickets = load_json("tickets.json")
-
-    doit = 0    
-    recoit = 0
-
-    for ticket in tickets.values():
-        for d in ticket["debiteurs"]:
-            if d["user_id"] == user_id:
-                doit += d["part"]
-
-        if ticket["crediteur_id"] == user_id:
-            recoit += ticket["reste_du"]
-
-    return {
-        "doit": doit,
-        "recoit": recoit,
-        "solde": recoit - doit
-    }
+    # Lu dans la matrice des soldes (balances.py), maintenue à chaque mutation
+    # { detail: { user_id: {doit: X, recoit: Y}, ... }, doit, recoit, solde }
+    return get_balance_index().solde(user_id)
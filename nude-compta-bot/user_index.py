@@ -0,0 +1,113 @@
+# user_index.py
+from bisect import bisect_left
+
+import partitions
+from repository import get_repository, TICKETS_FILE, ARCHIVES_FILE
+from ticket_model import debtor_parts
+
+def _users(ticket):
+    """Utilisateurs concernés par un ticket : créditeur et débiteurs."""
+    return {ticket["crediteur_id"]} | {uid for uid, _ in debtor_parts(ticket)}
+
+def _add(entries, key):
+    i = bisect_left(entries, key)
+    if i == len(entries) or entries[i] != key:
+        entries.insert(i, key)
+
+def _remove(entries, key):
+    i = bisect_left(entries, key)
+    if i < len(entries) and entries[i] == key:
+        del entries[i]
+
+class UserTicketIndex:
+    """Tickets ouverts et archivés de chaque utilisateur, triés par date, tenus à jour à chaque mutation"""
+
+    def __init__(self):
+        self._open = None      # user_id -> [(date_creation, ticket_id)] trié
+        self._archived = None  # user_id -> [(date_cloture, ticket_id)] trié
+
+    # CONSTRUCTION
+    def _build(self, items, date_key):
+        index = {}
+        for tid, ticket in items:
+            key = (ticket.get(date_key) or "", tid)
+            for uid in _users(ticket):
+                index.setdefault(uid, []).append(key)
+        for entries in index.values():
+            entries.sort()
+        return index
+
+    def _ensure(self):
+        repo = get_repository()
+        # Accès qui rechargent (et reconstruisent via on_reset) si modifié sur disque
+        tickets = repo.tickets
+        archives = repo.archives
+        if self._open is None:
+            self._open = self._build(tickets.items(), "date_creation")
+        if self._archived is None:
+            # Archives en segments : un seul parcours complet, puis incrémental
+            self._archived = self._build(archives.items(), "date_cloture")
+
+    # ÉCOUTE DU REPOSITORY
+    def on_reset(self, filename, data):
+        if filename == TICKETS_FILE:
+            self._open = self._build(data.items(), "date_creation")
+        elif filename == ARCHIVES_FILE:
+            self._archived = self._build(data.items(), "date_cloture")
+
+    def on_ticket_changed(self, ticket_id, old, new):
+        if self._open is None:
+            return
+        if old is not None:
+            for uid in _users(old):
+                _remove(self._open.get(uid, []), (old.get("date_creation") or "", ticket_id))
+        if new is not None:
+            for uid in _users(new):
+                _add(self._open.setdefault(uid, []), (new.get("date_creation") or "", ticket_id))
+
+    def on_archived(self, ticket_id, ticket):
+        if self._archived is None:
+            return
+        key = (ticket.get("date_cloture") or "", ticket_id)
+        for uid in _users(ticket):
+            _add(self._archived.setdefault(uid, []), key)
+
+    # LECTURE
+    def open_entries(self, user_id):
+        """[(date_creation, ticket_id)] des tickets ouverts de l'utilisateur, du plus ancien au plus récent."""
+        tickets = get_repository().tickets
+        if self._open is None:
+            self._open = self._build(tickets.items(), "date_creation")
+        return self._open.get(user_id, [])
+
+    def count(self, user_id):
+        self._ensure()
+        return len(self._open.get(user_id, [])) + len(self._archived.get(user_id, []))
+
+    def page(self, user_id, page, size):
+        """Tickets ouverts (plus récents d'abord) puis archivés, seulement ceux de la page.
+
+        Renvoie ([(ticket_id, ticket, archive)], total).
+        """
+        self._ensure()
+        repo = get_repository()
+        ouverts = self._open.get(user_id, [])
+        archives = self._archived.get(user_id, [])
+        total = len(ouverts) + len(archives)
+
+        result = []
+        for pos in range(page * size, min((page + 1) * size, total)):
+            if pos < len(ouverts):
+                tid = ouverts[len(ouverts) - 1 - pos][1]
+                result.append((tid, repo.tickets[tid], False))
+            else:
+                tid = archives[len(archives) - 1 - (pos - len(ouverts))][1]
+                result.append((tid, repo.archives[tid], True))
+        return result, total
+
+def _create():
+    index = UserTicketIndex()
+    get_repository().subscribe(index)
+    return index
+
+get_user_index = partitions.scoped(_create)
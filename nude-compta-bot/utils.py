@@ -1,36 +1,17 @@
 from datetime import datetime
-import json
-import os
 import discord
 from discord.ui import View, Button
-
-DATA_DIR = "data"
+from sequences import get_sequence
 
 def now_iso():
     return datetime.utcnow().isoformat()
 
-def _get_all_ids():
-    ids = []
-
-    for name in ("tickets.json", "archives.json"):
-        path = os.path.join(DATA_DIR, name)
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                ids.extend(json.load(f).keys())
-
-    return ids
+def ticket_prefix(type_ticket):
+    return "a" if type_ticket == "p2p" else "b"
 
 def generate_ticket_id(type_ticket):
-    prefix = "a" if type_ticket == "p2p" else "b"
-    ids = _get_all_ids()
-
-    nums = [
-        int(i[1:]) for i in ids
-        if i.startswith(prefix) and i[1:].isdigit()
-    ]
-
-    next_num = max(nums, default=0) + 1
-    return f"{prefix}{next_num:04d}"
+    # Compteur persistant (sequences.py) : O(1), sans relire tickets ni archives
+    return get_sequence().next_id(ticket_prefix(type_ticket))
 
 def euros_to_cents(amount: float) -> int:
     return int(round(amount * 100))
@@ -26,6 +26,11 @@ from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 
+# Modules partagés avec le bot compta (dossier shared/ à la racine du projet)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.member_snapshot import MemberSnapshot
+from shared import outbound
+
 
 # Chemins des fichiers
 BASE_DIR = Path(__file__).parent
@@ -72,6 +77,7 @@ DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "fr")
 ephemeral_env = os.getenv("EPHEMERAL_GLOBAL", "true").lower()
 EPHEMERAL_GLOBAL = ephemeral_env == "true"
 VERSION = os.getenv("VERSION")
+MEMBER_SNAPSHOT_MAX_AGE = int(os.getenv("MEMBER_SNAPSHOT_MAX_AGE", "300"))
 
 if not NUDE_CORE_TOKEN:
     logger.error("❌ NUDE_CORE_TOKEN manquant dans les fichiers .env")
@@ -154,6 +160,8 @@ intents.guilds = True
 
 bot = commands.Bot(command_prefix="/", intents=intents, help_command=None)
 custom_commands = {}
+# Annuaire publié par le bot compta (intent members) : pas de cache de membres ici
+member_directory = MemberSnapshot()
 command_cooldowns = defaultdict(lambda: 0)
 COMMAND_COOLDOWN = 3
 
@@ -170,6 +178,12 @@ def is_admin(interaction: discord.Interaction) -> bool:
         return False
     try:
         admin_role_id = int(ADMIN_ROLE_ID)
+        if not isinstance(interaction.user, discord.Member):
+            # Interaction hors guild (DM) : rôles lus dans l'annuaire partagé, seulement s'il décrit
+            # notre guild et que le bot compta l'a réécrit récemment (sinon rôle peut-être retiré)
+            if not member_directory.is_fresh(GUILD_ID, MEMBER_SNAPSHOT_MAX_AGE):
+                return False
+            return member_directory.has_role(interaction.user.id, admin_role_id)
         if interaction.user.guild_permissions.administrator:
             return True
         return any(role.id == admin_role_id for role in interaction.user.roles)
@@ -181,7 +195,7 @@ async def check_command_cooldown(user_id: int, channel) -> bool:
     now = time.time()
     if now < command_cooldowns[user_id]:
         remaining = int(command_cooldowns[user_id] - now)  # Convertir en int
-        await channel.send(f"⏱️ Cooldown actif ({remaining}s restant)", delete_after=3)
+        outbound.post(channel, f"⏱️ Cooldown actif ({remaining}s restant)", priority=outbound.DIRECT, delete_after=3)
         return False
     command_cooldowns[user_id] = now + COMMAND_COOLDOWN
     return True
@@ -327,8 +341,8 @@ async def on_ready():
                 
                 embed.set_footer(text=lang_manager.get("bot_online_footer", end = time.perf_counter() - start))
 
-                await channel.send(embed=embed)
-                logger.info(f"✅ Message envoyé dans le salon: {channel} | ID: {CHANNEL_ID_NOTIF}")
+                outbound.post(channel, embed=embed)
+                logger.info(f"✅ Message mis en file pour le salon: {channel} | ID: {CHANNEL_ID_NOTIF}")
             else:
                 logger.warning("⚠️ CHANNEL_ID_NOTIF introuvable ou non valide.")
         except Exception as e:
@@ -342,8 +356,8 @@ async def on_ready():
                 description=lang_manager.get("J'espère que vos cadeaux vous plaisent ! 🎁"),
                 color=discord.Color.red()
             )
-            await channel.send(embed=embed)
-            logger.info(f"✅ Message envoyé dans le salon: {channel} | ID: {CHANNEL_ID_NOTIF}")
+            outbound.post(channel, embed=embed)
+            logger.info(f"✅ Message mis en file pour le salon: {channel} | ID: {CHANNEL_ID_NOTIF}")
         else:
             logger.warning("⚠️ CHANNEL_ID_NOTIF introuvable ou non valide.")
     except Exception as e:
@@ -367,18 +381,20 @@ async def on_message(message):
         logger.info("Commande détectée en on_message: %s", command_name)
 
         if command_name in custom_commands:
-            await message.channel.send(custom_commands[command_name])
+            outbound.post(message.channel, custom_commands[command_name], priority=outbound.DIRECT)
             return
 
         # vérifier si c'est une commande slash connue — si non informer en DM
         known = [cmd.name for cmd in bot.tree.walk_commands()]
         if command_name not in known:
-            try:
-                await message.channel.send(t("don_t_understand", command_name=command_name))
-            except Exception as e:
-                logger.error(f"Erreur en envoyant le message: {e}")
-            finally:
-                logger.info(f"Commande inconnue: {command_name}")
+            # Regroupées par salon : une rafale de commandes inconnues donne un seul message
+            outbound.post(
+                message.channel,
+                t("don_t_understand", command_name=command_name),
+                priority=outbound.DIRECT,
+                coalesce="don_t_understand"
+            )
+            logger.info(f"Commande inconnue: {command_name}")
     await bot.process_commands(message)
 
 
@@ -389,7 +405,8 @@ async def on_message(message):
 # --------- Ping / Info / Help ---------
 @bot.tree.command(name="ping", description="Teste la réactivité du bot")
 async def ping(interaction: discord.Interaction):
-    await interaction.response.send_message(
+    await outbound.respond(
+        interaction,
         t(
             "ping_response",
             interaction,
@@ -403,7 +420,8 @@ async def info(interaction: discord.Interaction):
     user = interaction.user
     name = interaction.command.name
     logger.info(f"L'utilisateur {user} a exécuté la commande {name}")
-    await interaction.response.send_message(
+    await outbound.respond(
+        interaction,
         t(
             "info_response",
             interaction,
@@ -433,7 +451,7 @@ async def help_command(interaction: discord.Interaction):
     embed.add_field(name=t("help_lang", interaction),
                     value=f"🟢 `/language`", inline=False)
     embed.set_footer(text=t("help_footer", interaction))
-    await interaction.response.send_message(embed=embed, ephemeral=EPHEMERAL_GLOBAL
+    await outbound.respond(interaction, embed=embed, ephemeral=EPHEMERAL_GLOBAL
 )
 
 # --------- Language ---------
@@ -451,15 +469,15 @@ async def language_command(interaction: discord.Interaction, lang: str = None):
         for lang_code in sorted(lang_manager.available_languages):
             embed.description += f"• `{lang_code}` - {lang_manager.get_language_name(lang_code)}\n"
         embed.set_footer(text=t("language_usage", interaction))
-        await interaction.response.send_message(embed=embed, ephemeral=EPHEMERAL_GLOBAL
+        await outbound.respond(interaction, embed=embed, ephemeral=EPHEMERAL_GLOBAL
 )
     else:
         lang = lang.lower().strip()
         if lang_manager.set_user_language(interaction.user.id, lang):
-            await interaction.response.send_message(t("language_changed", interaction, language=lang_manager.get_language_name(lang)), ephemeral=EPHEMERAL_GLOBAL
+            await outbound.respond(interaction, t("language_changed", interaction, language=lang_manager.get_language_name(lang)), ephemeral=EPHEMERAL_GLOBAL
 )
         else:
-            await interaction.response.send_message(t("language_invalid", interaction, lang=lang), ephemeral=EPHEMERAL_GLOBAL
+            await outbound.respond(interaction, t("language_invalid", interaction, lang=lang), ephemeral=EPHEMERAL_GLOBAL
 )
 
 # --------- CSV Commands ---------
@@ -469,13 +487,13 @@ async def list_commands(interaction: discord.Interaction):
     name = interaction.command.name
     logger.info(f"L'utilisateur {user} a exécuté la commande {name}")
     if not custom_commands:
-        await interaction.response.send_message(t("list_empty", interaction), ephemeral=EPHEMERAL_GLOBAL
+        await outbound.respond(interaction, t("list_empty", interaction), ephemeral=EPHEMERAL_GLOBAL
 )
         return
     embed = discord.Embed(title=t("list_title", interaction), color=discord.Color.green())
     embed.description = "\n".join([f"• `/{name}`" for name in sorted(custom_commands.keys())])
     embed.set_footer(text=t("list_footer", interaction, count=len(custom_commands)))
-    await interaction.response.send_message(embed=embed, ephemeral=EPHEMERAL_GLOBAL
+    await outbound.respond(interaction, embed=embed, ephemeral=EPHEMERAL_GLOBAL
 )
 
 @bot.tree.command(name="create", description="Crée une nouvelle commande personnalisée")
@@ -486,15 +504,15 @@ async def create_command(interaction: discord.Interaction, name: str, response:
     logger.info(f"L'utilisateur {user} a exécuté la commande {name}")
     name_lower = name.lower().strip()
     if name_lower in custom_commands:
-        await interaction.response.send_message(t("create_exists", interaction, name=name_lower), ephemeral=EPHEMERAL_GLOBAL
+        await outbound.respond(interaction, t("create_exists", interaction, name=name_lower), ephemeral=EPHEMERAL_GLOBAL
 )
         return
     custom_commands[name_lower] = response.strip()
     if save_custom_commands():
-        await interaction.response.send_message(t("create_success", interaction, name=name_lower), ephemeral=EPHEMERAL_GLOBAL
+        await outbound.respond(interaction, t("create_success", interaction, name=name_lower), ephemeral=EPHEMERAL_GLOBAL
 )
     else:
-        await interaction.response.send_message(t("create_error", interaction), ephemeral=EPHEMERAL_GLOBAL
+        await outbound.respond(interaction, t("create_error", interaction), ephemeral=EPHEMERAL_GLOBAL
 )
 
 @bot.tree.command(name="modif", description="Modifie le nom et/ou la réponse d'une commande personnalisée")
@@ -516,7 +534,8 @@ async def modify_command(
 
     # Vérifie si la commande existe
     if old_name_lower not in custom_commands:
-        await interaction.response.send_message(
+        await outbound.respond(
+            interaction,
             t("modif_not_found", interaction, name=old_name_lower),
             ephemeral=EPHEMERAL_GLOBAL
         )
@@ -524,7 +543,8 @@ async def modify_command(
 
     # Aucun changement fourni
     if not new_name and not new_response:
-        await interaction.response.send_message(
+        await outbound.respond(
+            interaction,
             t("modif_no_change", interaction, name=old_name_lower),
             ephemeral=EPHEMERAL_GLOBAL
         )
@@ -540,7 +560,8 @@ async def modify_command(
             new_name_lower = new_name.lower().strip()
             # Empêche d'écraser une autre commande existante
             if new_name_lower != old_name_lower and new_name_lower in custom_commands:
-                await interaction.response.send_message(
+                await outbound.respond(
+                    interaction,
                     t("modif_name_exists", interaction, name=new_name_lower),
                     ephemeral=EPHEMERAL_GLOBAL
                 )
@@ -561,12 +582,14 @@ async def modify_command(
         success = False
 
     if success:
-        await interaction.response.send_message(
+        await outbound.respond(
+            interaction,
             t("modif_success", interaction, name=old_name_lower),
             ephemeral=EPHEMERAL_GLOBAL
         )
     else:
-        await interaction.response.send_message(
+        await outbound.respond(
+            interaction,
             t("modif_error", interaction, name=old_name_lower),
             ephemeral=EPHEMERAL_GLOBAL
         )
@@ -581,7 +604,8 @@ async def delete_command(interaction: discord.Interaction, name: str):
 
     # Vérifie si la commande existe
     if name_lower not in custom_commands:
-        await interaction.response.send_message(
+        await outbound.respond(
+            interaction,
             t("delete_not_found", interaction, name=name_lower),
             ephemeral=EPHEMERAL_GLOBAL
         )
@@ -593,19 +617,22 @@ async def delete_command(interaction: discord.Interaction, name: str):
 
         # Sauvegarde les changements
         if save_custom_commands():
-            await interaction.response.send_message(
+            await outbound.respond(
+                interaction,
                 t("delete_success", interaction, name=name_lower),
                 ephemeral=EPHEMERAL_GLOBAL
             )
         else:
-            await interaction.response.send_message(
+            await outbound.respond(
+                interaction,
                 t("delete_error", interaction, name=name_lower),
                 ephemeral=EPHEMERAL_GLOBAL
             )
 
     except Exception as e:
         logger.error(f"Erreur lors de la suppression d'une commande : {e}")
-        await interaction.response.send_message(
+        await outbound.respond(
+            interaction,
             t("delete_exception", interaction, name=name_lower),
             ephemeral=EPHEMERAL_GLOBAL
         )
@@ -619,7 +646,8 @@ async def warn_command(interaction: discord.Interaction, user: discord.Member, r
     logger.info(f"L'utilisateur {cmd_user} a exécuté la commande {cmd_name}")
 
     if not is_admin(interaction):
-        await interaction.response.send_message(
+        await outbound.respond(
+            interaction,
             t("permission_denied", interaction),
             ephemeral=EPHEMERAL_GLOBAL
         )
@@ -631,13 +659,14 @@ async def warn_command(interaction: discord.Interaction, user: discord.Member, r
     warns_data[uid]["reasons"].append(reason)
     save_warns(warns_data)
 
-    await interaction.response.send_message(
+    await outbound.respond(
+        interaction,
         f"{user.mention} reçoit un warn ({reason}). Total: {warns_data[uid]['count']}",
         ephemeral=EPHEMERAL_GLOBAL
     )
 
     if warns_data[uid]["count"] >= WARN_LIMIT:
-        await interaction.channel.send(f"{user.mention} kick temporaire ({KICK_DURATION}s)")
+        outbound.post(interaction.channel, f"{user.mention} kick temporaire ({KICK_DURATION}s)", coalesce="warn")
         try:
             # CORRECTION: Utiliser datetime.now(timezone.utc) au lieu de utcnow()
             timeout_until = datetime.now(timezone.utc) + timedelta(seconds=KICK_DURATION)
@@ -654,13 +683,13 @@ async def warns_check(interaction: discord.Interaction, user: discord.Member):
     uid = user.id
     data = warns_data.get(uid)
     if not data:
-        await interaction.response.send_message(f"{user.mention} n'a aucun warn.", ephemeral=EPHEMERAL_GLOBAL
+        await outbound.respond(interaction, f"{user.mention} n'a aucun warn.", ephemeral=EPHEMERAL_GLOBAL
 )
         return
     msg = f"Warns pour {user.mention} :\n"
     for i, reason in enumerate(data["reasons"], start=1):
         msg += f"{i}. {reason}\n"
-    await interaction.response.send_message(msg, ephemeral=EPHEMERAL_GLOBAL
+    await outbound.respond(interaction, msg, ephemeral=EPHEMERAL_GLOBAL
 )
 
 @bot.tree.command(name="unwarn", description="Supprime un warn d'un utilisateur")
@@ -670,13 +699,13 @@ async def unwarn_command(interaction: discord.Interaction, user: discord.Member,
     name = interaction.command.name
     logger.info(f"L'utilisateur {user} a exécuté la commande {name}")
     if not is_admin(interaction):
-        await interaction.response.send_message("permission_denied", ephemeral=EPHEMERAL_GLOBAL
+        await outbound.respond(interaction, "permission_denied", ephemeral=EPHEMERAL_GLOBAL
 )
         return
     uid = user.id
     data = warns_data.get(uid)
     if not data or data["count"] == 0:
-        await interaction.response.send_message(f"{user.mention} n'a aucun warn.", ephemeral=EPHEMERAL_GLOBAL
+        await outbound.respond(interaction, f"{user.mention} n'a aucun warn.", ephemeral=EPHEMERAL_GLOBAL
 )
         return
     if number is None:
@@ -685,7 +714,7 @@ async def unwarn_command(interaction: discord.Interaction, user: discord.Member,
         action = f"Le dernier warn a été supprimé : {removed_reason}"
     else:
         if number < 1 or number > data["count"]:
-            await interaction.response.send_message(f"Numéro de warn invalide. Total: {data['count']}", ephemeral=EPHEMERAL_GLOBAL
+            await outbound.respond(interaction, f"Numéro de warn invalide. Total: {data['count']}", ephemeral=EPHEMERAL_GLOBAL
 )
             return
         removed_reason = data["reasons"].pop(number - 1)
@@ -696,7 +725,7 @@ async def unwarn_command(interaction: discord.Interaction, user: discord.Member,
     else:
         warns_data[uid] = data
     save_warns(warns_data)
-    await interaction.response.send_message(f"{user.mention} - {action}", ephemeral=EPHEMERAL_GLOBAL
+    await outbound.respond(interaction, f"{user.mention} - {action}", ephemeral=EPHEMERAL_GLOBAL
 )
 #a finir
 
@@ -706,7 +735,8 @@ async def report_command(interaction: discord.Interaction, nombre: int, reason:
     user = interaction.user
     name = interaction.command.name
     logger.info(f"L'utilisateur {user} a exécuté la commande {name}")
-    await interaction.response.send_message(
+    await outbound.respond(
+        interaction,
         "🚧 Fonctionnalité en construction.",
         ephemeral=EPHEMERAL_GLOBAL
     )
@@ -722,7 +752,7 @@ async def logs_command(interaction: discord.Interaction):
     try:
         log_files = sorted(LOGS_DIR.glob("bot_*.log"), reverse=True)
         if not log_files:
-            await interaction.followup.send("❌ Aucun fichier de log trouvé.", ephemeral=EPHEMERAL_GLOBAL
+            await outbound.followup(interaction, "❌ Aucun fichier de log trouvé.", ephemeral=EPHEMERAL_GLOBAL
 )
             return
         latest_file = log_files[0]
@@ -730,10 +760,11 @@ async def logs_command(interaction: discord.Interaction):
         embed = discord.Embed(title=f"📜 Logs Bot ({latest_file.name})",
                               description=f"```{content}```",
                               color=discord.Color.green())
-        await interaction.followup.send(embed=embed, ephemeral=EPHEMERAL_GLOBAL
+        embed.add_field(name="File d'envoi", value=outbound.get_dispatcher().summary(), inline=False)
+        await outbound.followup(interaction, embed=embed, ephemeral=EPHEMERAL_GLOBAL
 )
     except Exception as e:
-        await interaction.followup.send(f"❌ Erreur lecture logs: {e}", ephemeral=EPHEMERAL_GLOBAL
+        await outbound.followup(interaction, f"❌ Erreur lecture logs: {e}", ephemeral=EPHEMERAL_GLOBAL
 )
 
 # --------- Système ---------
@@ -745,14 +776,16 @@ async def reboot_command(interaction: discord.Interaction):
     logger.info(f"L'utilisateur {cmd_user} a exécuté la commande {cmd_name}")
 
     if not is_admin(interaction):
-        await interaction.response.send_message(
+        await outbound.respond(
+            interaction,
             t("permission_denied", interaction),
             ephemeral=EPHEMERAL_GLOBAL
         )
         return  # Ce return est correct ici
 
     # Code exécuté seulement si admin
-    await interaction.response.send_message(
+    await outbound.respond(
+        interaction,
         "🔄 Redémarrage du bot...",
         ephemeral=EPHEMERAL_GLOBAL
     )
@@ -768,14 +801,16 @@ async def upgrade_command(interaction: discord.Interaction):
     logger.info(f"L'utilisateur {cmd_user} a exécuté la commande {cmd_name}")
 
     if not is_admin(interaction):
-        await interaction.response.send_message(
+        await outbound.respond(
+            interaction,
             t("permission_denied", interaction),
             ephemeral=EPHEMERAL_GLOBAL
         )
         return  # Ce return est correct ici
 
     # Code exécuté seulement si admin
-    await interaction.response.send_message(
+    await outbound.respond(
+        interaction,
         "⬆️ Mise à jour du bot en cours...",
         ephemeral=EPHEMERAL_GLOBAL
     )
@@ -789,7 +824,8 @@ async def upgrade_command(interaction: discord.Interaction):
         os.execv(sys.executable, [sys.executable] + sys.argv)
     except Exception as e:
         logger.error(f"Erreur lors de la mise à jour: {e}")
-        await interaction.followup.send(
+        await outbound.followup(
+            interaction,
             f"❌ Erreur mise à jour: {e}",
             ephemeral=EPHEMERAL_GLOBAL
         )
@@ -802,13 +838,13 @@ async def ephemeral_command(interaction: discord.Interaction, option: bool):
     logger.info(f"L'utilisateur {user} a exécuté la commande {name}")
     global EPHEMERAL_GLOBAL
     if not is_admin(interaction):
-        await interaction.response.send_message("permission_denied", ephemeral=True
+        await outbound.respond(interaction, "permission_denied", ephemeral=True
 )
         return
 
     EPHEMERAL_GLOBAL = option
     status = "activés" if EPHEMERAL_GLOBAL else "désactivés"
-    await interaction.response.send_message(f"✅ Les messages éphémères sont maintenant {status}.", ephemeral=EPHEMERAL_GLOBAL
+    await outbound.respond(interaction, f"✅ Les messages éphémères sont maintenant {status}.", ephemeral=EPHEMERAL_GLOBAL
 )
 
 # ----------- Test -----------
@@ -817,7 +853,7 @@ async def test_command(interaction: discord.Interaction):
     user = interaction.user
     name = interaction.command.name
     logger.info(f"L'utilisateur {user} a exécuté la commande {name}")
-    await interaction.response.send_message("✅ Test réussi!", ephemeral=EPHEMERAL_GLOBAL
+    await outbound.respond(interaction, "✅ Test réussi!", ephemeral=EPHEMERAL_GLOBAL
 )
 
 # ========================================
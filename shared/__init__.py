@@ -0,0 +1,2 @@
+# shared/__init__.py
+# Modules communs aux bots core et compta (ajoutés au sys.path par chaque bot)
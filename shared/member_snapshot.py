@@ -0,0 +1,218 @@
+# shared/member_snapshot.py
+# Annuaire des membres partagé entre les deux bots : le bot compta (intent members) l'écrit
+# depuis son cache gateway, le bot core (sans intent members) le lit via mmap quand une
+# interaction arrive sans données de membre.
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "data" / "members.snapshot"
+
+# Format (little-endian) : en-tête, enregistrements de taille fixe triés par user_id, puis blob
+#   en-tête : magic, version, guild_id, date d'écriture (ms), nombre de membres
+#   enregistrement : user_id, offset/longueur du nom, offset/nombre des rôles, offset/longueur de l'avatar
+#   blob : noms et avatars en UTF-8, rôles en uint64
+MAGIC = b"NMDS"
+VERSION = 1
+HEADER = struct.Struct("<4sHQQI")
+RECORD = struct.Struct("<QIHIHIB")
+ROLE = struct.Struct("<Q")
+USER_ID = struct.Struct("<Q")
+
+logger = logging.getLogger("member_snapshot")
+
+MemberInfo = namedtuple("MemberInfo", ["display_name", "roles", "avatar"])
+
+def snapshot_path():
+    return Path(os.getenv("MEMBER_SNAPSHOT_PATH") or DEFAULT_PATH)
+
+# ÉCRITURE
+def _entry(member):
+    # Rôle @everyone (même ID que la guild) inutile : tout le monde l'a
+    roles = tuple(r.id for r in member.roles if r.id != member.guild.id)
+    avatar = member.guild_avatar or member.avatar
+    return member.id, member.display_name, roles, avatar.key if avatar else ""
+
+def write_snapshot(path, guild_id, members):
+    """Écrit l'annuaire de façon atomique (les lecteurs gardent l'ancienne version mappée)."""
+    return _write_entries(path, guild_id, [_entry(m) for m in members])
+
+def _write_entries(path, guild_id, entries):
+    entries = sorted(entries)
+    records, blob = bytearray(), bytearray()
+    base = HEADER.size + RECORD.size * len(entries)
+
+    for user_id, name, roles, avatar in entries:
+        name_b = name.encode("utf-8")[:0xFFFF]
+        avatar_b = avatar.encode("ascii")[:0xFF]
+        name_off = base + len(blob)
+        blob += name_b
+        roles_off = base + len(blob)
+        for role_id in roles[:0xFFFF]:
+            blob += ROLE.pack(role_id)
+        avatar_off = base + len(blob)
+        blob += avatar_b
+        records += RECORD.pack(user_id, name_off, len(name_b), roles_off, min(len(roles), 0xFFFF), avatar_off, len(avatar_b))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, guild_id, int(time.time() * 1000), len(entries)))
+        f.write(records)
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return len(entries)
+
+class MemberSnapshotWriter:
+    """Réécrit l'annuaire à partir du cache de la guild, au plus une fois toutes les `delay` secondes.
+
+    Les événements gateway marquent seulement l'annuaire comme modifié ; les membres sont relevés
+    sur la boucle (cache discord.py) puis l'écriture se fait dans un thread. Réécrit aussi toutes
+    les `heartbeat` secondes : la date d'écriture prouve aux lecteurs que l'annuaire est à jour.
+    """
+
+    def __init__(self, path=None, delay=2.0, heartbeat=60.0):
+        self.path = Path(path) if path else snapshot_path()
+        self.delay = delay
+        self.heartbeat = heartbeat
+        self._guild = None
+        self._loop = None
+        self._handle = None
+        self._heartbeat = None
+        self._lock = threading.Lock()
+        self._generation = 0  # dernière relève des membres
+        self._written = 0     # relève actuellement sur disque
+
+    def attach(self, guild, loop):
+        self._guild = guild
+        self._loop = loop
+        self.flush()
+
+    def touch(self):
+        """À appeler sur on_member_join / update / remove."""
+        if self._guild is None or self._handle is not None:
+            return
+        self._handle = self._loop.call_later(self.delay, self.flush)
+
+    def flush(self):
+        self._handle = None
+        if self._guild is None:
+            return None
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        self._heartbeat = self._loop.call_later(self.heartbeat, self.flush)
+
+        entries = [_entry(m) for m in self._guild.members]
+        self._generation += 1
+        future = self._loop.run_in_executor(None, self._write, self._generation, self._guild.id, entries)
+        future.add_done_callback(self._done)
+        return future
+
+    def _write(self, generation, guild_id, entries):
+        with self._lock:
+            # Deux écritures en vol : la relève la plus récente ne doit pas être écrasée
+            if generation < self._written:
+                return
+            _write_entries(self.path, guild_id, entries)
+            self._written = generation
+
+    def _done(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            # Le prochain touch() ou battement réessaie
+            logger.error(f"Écriture de l'annuaire {self.path} impossible : {future.exception()}")
+
+# LECTURE
+class MemberSnapshot:
+    """Lecture de l'annuaire par recherche dichotomique dans le fichier mappé (rien n'est décodé d'avance).
+
+    Le fichier remplacé par l'écrivain est remappé au plus toutes les `check_interval` secondes.
+    """
+
+    def __init__(self, path=None, check_interval=1.0):
+        self.path = Path(path) if path else snapshot_path()
+        self.check_interval = check_interval
+        self._map = None
+        self._stat = None
+        self._checked = 0.0
+        self.guild_id = None
+        self.written_at = None
+        self._count = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._close()
+            return
+        stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stat == self._stat:
+            return
+        self._close()
+        with open(self.path, "rb") as f:
+            if st.st_size < HEADER.size:
+                return
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, guild_id, written_at, count = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            mapped.close()
+            return
+        self._map, self._stat = mapped, stat
+        self.guild_id, self.written_at, self._count = guild_id, written_at, count
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+        self._map, self._stat, self._count = None, None, 0
+
+    def __len__(self):
+        self._refresh()
+        return self._count
+
+    def _user_id(self, index):
+        return USER_ID.unpack_from(self._map, HEADER.size + index * RECORD.size)[0]
+
+    def _decode(self, index):
+        _, name_off, name_len, roles_off, roles_count, avatar_off, avatar_len = RECORD.unpack_from(
+            self._map, HEADER.size + index * RECORD.size
+        )
+        m = self._map
+        return MemberInfo(
+            m[name_off:name_off + name_len].decode("utf-8"),
+            tuple(ROLE.unpack_from(m, roles_off + i * ROLE.size)[0] for i in range(roles_count)),
+            m[avatar_off:avatar_off + avatar_len].decode("ascii") or None,
+        )
+
+    def get(self, user_id):
+        """MemberInfo(display_name, roles, avatar) ou None si absent (ou annuaire indisponible)."""
+        self._refresh()
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._user_id(mid) < user_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._user_id(lo) == user_id:
+            return self._decode(lo)
+        return None
+
+    def is_fresh(self, guild_id, max_age):
+        """Annuaire de `guild_id` réécrit il y a moins de `max_age` secondes (écrivain en vie)."""
+        self._refresh()
+        if self._map is None or self.guild_id != guild_id:
+            return False
+        return time.time() * 1000 - self.written_at <= max_age * 1000
+
+    def has_role(self, user_id, role_id):
+        info = self.get(user_id)
+        return info is not None and role_id in info.roles
@@ -0,0 +1,301 @@
+# shared/outbound.py
+# File d'envoi commune aux deux bots : buckets par route, priorités, regroupement des messages
+import asyncio
+import heapq
+import logging
+import time
+from itertools import count
+
+import discord
+
+logger = logging.getLogger("outbound")
+
+# PRIORITÉS (plus petit = plus urgent)
+INTERACTION = 0  # réponses et followups d'interaction (délai de 3 s)
+DIRECT = 1       # réponse à un message d'utilisateur, DM
+BROADCAST = 2    # annonces, notifications de démarrage, relances
+
+MESSAGE_LIMIT = 2000
+SWEEP_INTERVAL = 60.0  # secondes entre deux purges des buckets de salon inactifs
+
+class TokenBucket:
+    """`rate` envois par `per` secondes ; bloqué jusqu'à l'échéance d'un 429."""
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+
+    def delay(self, now):
+        """Secondes avant de pouvoir envoyer (0 = tout de suite)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) * self.per / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_idle(self, now):
+        """Plein et non bloqué : identique à un bucket neuf, peut être oublié."""
+        if now < self.blocked_until:
+            return False
+        self._refill(now)
+        return self.tokens >= self.rate
+
+    def block(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class _Job:
+    __slots__ = ("route", "priority", "seq", "factory", "future", "channel", "contents",
+                 "kwargs", "coalesce", "not_before", "queued_at", "retries")
+
+    def __init__(self, route, priority, seq, factory=None, future=None):
+        self.route = route
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.future = future
+        self.channel = None
+        self.contents = []
+        self.kwargs = {}
+        self.coalesce = None
+        self.not_before = 0.0
+        self.queued_at = time.monotonic()
+        self.retries = 0
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+def _render(contents):
+    """Messages regroupés : doublons consécutifs comptés, tronqué à la limite Discord."""
+    lines = []
+    for content in contents:
+        if lines and lines[-1][0] == content:
+            lines[-1][1] += 1
+        else:
+            lines.append([content, 1])
+    text = "\n".join(c if n == 1 else f"{c} (×{n})" for c, n in lines)
+    return text if len(text) <= MESSAGE_LIMIT else text[:MESSAGE_LIMIT - 1] + "…"
+
+class OutboundDispatcher:
+    """Envois Discord ordonnancés hors des handlers.
+
+    Chaque route (salon, DM, interaction) a son bucket et au plus un envoi en cours (ordre
+    conservé) ; un bucket global borne le débit total. Le job prêt le plus prioritaire part
+    en premier. Les messages de salon avec une clé `coalesce` attendent `linger` secondes
+    et fusionnent avec les suivants de même clé tant qu'ils ne sont pas partis.
+    """
+
+    def __init__(self, route_rate=(5, 5.0), global_rate=(50, 1.0), linger=0.5, max_retries=5):
+        self.route_rate = route_rate
+        self.linger = linger
+        self.max_retries = max_retries
+        self._global = TokenBucket(*global_rate)
+        self._buckets = {}     # route de salon -> TokenBucket (purgé quand inactif, voir _sweep)
+        self._swept = time.monotonic()
+        self._busy = set()     # routes avec un envoi en cours
+        self._heap = []        # jobs en attente
+        self._pending = {}     # (route, clé) -> job regroupable pas encore parti
+        self._seq = count()
+        self._wakeup = None
+        self._task = None
+        self._running = set()  # tâches d'envoi (référence gardée jusqu'à la fin)
+        self.stats = {"sent": 0, "coalesced": 0, "rate_limited": 0, "failed": 0, "max_depth": 0}
+
+    # FILE
+    def _bucket(self, route):
+        if route[0] == "interaction":
+            # Webhook propre à chaque interaction : pas de bucket, rien à garder
+            return None
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = self._buckets[route] = TokenBucket(*self.route_rate)
+        return bucket
+
+    def _sweep(self, now):
+        """Oublie les buckets pleins des routes sans envoi en cours ni en attente."""
+        self._swept = now
+        waiting = {job.route for job in self._heap} | self._busy
+        for route in [r for r, b in self._buckets.items() if r not in waiting and b.is_idle(now)]:
+            del self._buckets[route]
+
+    def _push(self, job):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        heapq.heappush(self._heap, job)
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self._heap))
+        self._wakeup.set()
+
+    async def call(self, route, factory, priority=INTERACTION):
+        """Exécute `factory()` (coroutine d'envoi) à son tour et renvoie son résultat."""
+        job = _Job(route, priority, next(self._seq), factory, asyncio.get_running_loop().create_future())
+        self._push(job)
+        return await job.future
+
+    def post(self, channel, content, priority=BROADCAST, coalesce=None, **kwargs):
+        """Envoi sans attente dans un salon (ou DM) ; `coalesce` regroupe les messages de même clé."""
+        route = ("channel", channel.id)
+        if coalesce is not None:
+            job = self._pending.get((route, coalesce))
+            if job is not None:
+                job.contents.append(content)
+                self.stats["coalesced"] += 1
+                return
+        job = _Job(route, priority, next(self._seq))
+        job.channel = channel
+        job.contents = [content] if content is not None else []
+        job.kwargs = kwargs
+        if coalesce is not None:
+            job.coalesce = coalesce
+            job.not_before = time.monotonic() + self.linger
+            self._pending[(route, coalesce)] = job
+        self._push(job)
+
+    # ORDONNANCEMENT
+    def _next_ready(self, now):
+        """Job prêt le plus prioritaire, ou (None, attente avant le prochain)."""
+        skipped, wait, chosen = [], None, None
+        while self._heap:
+            job = heapq.heappop(self._heap)
+            bucket = self._bucket(job.route)
+            # Réponses d'interaction exemptées de la limite globale Discord : jamais retardées
+            delay = job.not_before - now
+            if bucket is not None:
+                delay = max(delay, bucket.delay(now), self._global.delay(now))
+            if job.route in self._busy:
+                skipped.append(job)
+                continue
+            if delay > 0:
+                skipped.append(job)
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            chosen = job
+            break
+        for job in skipped:
+            heapq.heappush(self._heap, job)
+        return chosen, wait
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            if now - self._swept >= SWEEP_INTERVAL:
+                self._sweep(now)
+            job, wait = self._next_ready(now)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            bucket = self._bucket(job.route)
+            if bucket:
+                bucket.take(now)
+                self._global.take(now)
+            if job.coalesce is not None:
+                self._pending.pop((job.route, job.coalesce), None)
+            self._busy.add(job.route)
+            task = asyncio.get_running_loop().create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job):
+        retry_after = None
+        try:
+            if job.factory is not None:
+                result = await job.factory()
+            else:
+                content = _render(job.contents) if job.contents else None
+                result = await job.channel.send(content, **job.kwargs)
+            self.stats["sent"] += 1
+            if job.future is not None and not job.future.done():
+                job.future.set_result(result)
+        except discord.RateLimited as e:
+            retry_after = e.retry_after
+        except Exception as e:
+            if isinstance(e, discord.HTTPException) and e.status == 429:
+                headers = getattr(e.response, "headers", None) or {}
+                retry_after = float(headers.get("Retry-After", 1))
+            else:
+                self._fail(job, e)
+        finally:
+            self._busy.discard(job.route)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+        if retry_after is not None:
+            self.stats["rate_limited"] += 1
+            bucket = self._bucket(job.route)
+            if bucket is not None:
+                bucket.block(retry_after)
+            else:
+                job.not_before = time.monotonic() + retry_after
+            job.retries += 1
+            if job.retries > self.max_retries:
+                self._fail(job, RuntimeError(f"rate limit persistant sur {job.route}"))
+            else:
+                self._push(job)
+
+    def _fail(self, job, error):
+        self.stats["failed"] += 1
+        if job.future is not None and not job.future.done():
+            job.future.set_exception(error)
+        else:
+            logger.error(f"Envoi impossible sur {job.route} : {error}")
+
+    # MÉTRIQUES
+    def metrics(self):
+        now = time.monotonic()
+        by_priority = {}
+        for job in self._heap:
+            by_priority[job.priority] = by_priority.get(job.priority, 0) + 1
+        return {
+            "depth": len(self._heap),
+            "interaction": by_priority.get(INTERACTION, 0),
+            "direct": by_priority.get(DIRECT, 0),
+            "broadcast": by_priority.get(BROADCAST, 0),
+            "in_flight": len(self._busy),
+            "blocked_routes": sum(1 for b in self._buckets.values() if b.blocked_until > now),
+            "oldest_wait_s": round(max((now - j.queued_at for j in self._heap), default=0.0), 3),
+            **self.stats,
+        }
+
+    def summary(self):
+        """Résumé d'une ligne pour les commandes de diagnostic."""
+        m = self.metrics()
+        return (
+            f"en attente : {m['depth']} (interactions {m['interaction']}, directs {m['direct']}, "
+            f"annonces {m['broadcast']}) - envoyés : {m['sent']} - regroupés : {m['coalesced']} - "
+            f"429 : {m['rate_limited']} - échecs : {m['failed']} - pic : {m['max_depth']}"
+        )
+
+_dispatcher = OutboundDispatcher()
+
+def get_dispatcher():
+    return _dispatcher
+
+# RACCOURCIS POUR LES HANDLERS
+async def respond(interaction, *args, **kwargs):
+    return await _dispatcher.call(
+        ("interaction", interaction.id),
+        lambda: interaction.response.send_message(*args, **kwargs)
+    )
+
+async def followup(interaction, *args, **kwargs):
+    return await _dispatcher.call(
+        ("interaction", interaction.id),
+        lambda: interaction.followup.send(*args, **kwargs)
+    )
+
+def post(channel, content=None, priority=BROADCAST, coalesce=None, **kwargs):
+    _dispatcher.post(channel, content, priority=priority, coalesce=coalesce, **kwargs)